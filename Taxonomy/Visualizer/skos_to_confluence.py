@@ -12,6 +12,14 @@ Features
 - Post mode: create or update pages under a parent
 - Parent control via --parent-id or --parent-url (e.g. https://mysite.net/wiki/spaces/APMWG/pages/922025985/Taxonomy+Sub-group)
 - Safe dry-run mode shows what would be posted
+- Concept blocks are reused from the on-disk fragment cache shared with
+  ../skos_md_and_ttl_update.py (--cache-dir, --no-cache)
+- --store compact loads the TTL into the read-optimised compact store and
+  reuses its snapshot on later runs (--snapshot PATH, --no-snapshot)
+- Several --ttl files (core taxonomy, SSR codes, translations) are merged;
+  each keeps its own snapshot and only changed files are parsed again
+- --predicates / --langs load only the triples a run needs, e.g.
+  --langs en --predicates "skos:*,apmwg:linkedSSR" (rdf:type is always kept)
 
 Install:
   pip install rdflib requests
@@ -52,6 +60,16 @@ try:
 except Exception:
     requests = None
 
+# Shared helpers live next to the Markdown exporter in the parent directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fragment_cache import (FragmentCache, subject_fingerprint, namespaces_fingerprint,
+                            DEFAULT_CACHE_DIR, DEFAULT_MAX_ENTRIES)
+from taxonomy_loader import load_graph, Projection, STORES
+from skos_traversal import traverse
+
+# Bump when render_concept_block output changes (invalidates cached blocks)
+CONCEPT_BLOCK_VERSION = "xhtml-block-1"
+
 # -------------------------- Utilities --------------------------
 
 def lang_sorted(labels: List[Literal]) -> List[Tuple[str, str]]:
@@ -173,7 +191,20 @@ def render_concept_block(graph: Graph, c: URIRef) -> str:
 
     return "\n".join(parts)
 
-def render_scheme_page_storage(graph: Graph, scheme_uri: URIRef, narrower: Dict[URIRef, Set[URIRef]], tops: List[URIRef]) -> str:
+def cached_concept_block(graph: Graph, c: URIRef, cache: FragmentCache = None, ns_key: List[str] = None) -> str:
+    """render_concept_block, reused from the fragment cache when the concept's triples are unchanged."""
+    if cache is None:
+        return render_concept_block(graph, c)
+    key = FragmentCache.make_key(CONCEPT_BLOCK_VERSION, str(c), subject_fingerprint(graph, c),
+                                 ns_key if ns_key is not None else namespaces_fingerprint(graph))
+    block = cache.get(key)
+    if block is None:
+        block = render_concept_block(graph, c)
+        cache.put(key, block)
+    return block
+
+def render_scheme_page_storage(graph: Graph, scheme_uri: URIRef, narrower: Dict[URIRef, Set[URIRef]], tops: List[URIRef],
+                               cache: FragmentCache = None) -> str:
     content = []
     scheme_title = qname(graph, scheme_uri)
     content.append(h(1, f"SKOS Concept Scheme: {scheme_title}"))
@@ -189,19 +220,31 @@ def render_scheme_page_storage(graph: Graph, scheme_uri: URIRef, narrower: Dict[
         content.append(h(2, "Description"))
         content.append(literal_lang_table(defs))
 
-    # Hierarchy tree
-    def render_tree(node: URIRef) -> str:
+    # Hierarchy tree (iterative; a concept with several broader terms appears under each)
+    out: List[str] = []
+    opened: List[bool] = []  # per depth: has the current node's <ul> been opened yet
+
+    def enter(node: URIRef, depth: int, parent: URIRef) -> None:
+        if depth and not opened[depth - 1]:
+            out.append("<ul>")
+            opened[depth - 1] = True
+        del opened[depth:]
+        opened.append(False)
         pref = get_text(graph, node, SKOS.prefLabel)
         title = (pref and str(lang_sorted(pref)[0][1])) or qname(graph, node)
-        item = f"{escape(title)} <span style='color:#888'>({escape(qname(graph, node))})</span>"
-        children = sorted(list(narrower.get(node, [])), key=lambda u: (str(get_text(graph, u, SKOS.prefLabel)[0]) if get_text(graph, u, SKOS.prefLabel) else qname(graph,u)).lower())
-        if not children:
-            return f"<li>{item}</li>"
-        inner = "".join(render_tree(ch) for ch in children)
-        return f"<li>{item}<ul>{inner}</ul></li>"
+        out.append(f"<li>{escape(title)} <span style='color:#888'>({escape(qname(graph, node))})</span>")
 
+    def leave(node: URIRef, depth: int, parent: URIRef) -> None:
+        out.append("</ul></li>" if opened[depth] else "</li>")
+
+    def children(node: URIRef) -> List[URIRef]:
+        return sorted(list(narrower.get(node, [])), key=lambda u: (str(get_text(graph, u, SKOS.prefLabel)[0]) if get_text(graph, u, SKOS.prefLabel) else qname(graph,u)).lower())
+
+    cycles = traverse(tops, children, pre=enter, post=leave, unique=False)
+    if cycles:
+        print(cycles.describe(lambda u: qname(graph, u)))
     content.append(h(2, "Hierarchy"))
-    content.append(f"<ul>{''.join(render_tree(t) for t in tops)}</ul>")
+    content.append(f"<ul>{''.join(out)}</ul>")
 
     # All concepts table
     concepts_in_scheme = [c for c in graph.subjects(RDF.type, SKOS.Concept) if (scheme_uri in list(graph.objects(c, SKOS.inScheme)))]
@@ -217,15 +260,16 @@ def render_scheme_page_storage(graph: Graph, scheme_uri: URIRef, narrower: Dict[
 
     # Details
     content.append(h(2, "Concept Details"))
+    ns_key = namespaces_fingerprint(graph)
     for c in concepts_in_scheme:
-        content.append(render_concept_block(graph, c))
+        content.append(cached_concept_block(graph, c, cache, ns_key))
 
     storage = f'<?xml version="1.0" encoding="UTF-8"?><html xmlns="http://www.w3.org/1999/xhtml" ' \
               f'xmlns:ac="http://atlassian.com/content" xmlns:ri="http://atlassian.com/resource">' \
               f'<body>{"".join(content)}</body></html>'
     return storage
 
-def render_all_in_one_storage(graph: Graph) -> str:
+def render_all_in_one_storage(graph: Graph, cache: FragmentCache = None) -> str:
     schemes = set(graph.subjects(RDF.type, SKOS.ConceptScheme))
     if not schemes:
         for s in graph.objects(None, SKOS.inScheme):
@@ -252,7 +296,7 @@ def render_all_in_one_storage(graph: Graph) -> str:
             bs = [b for b in graph.objects(c, SKOS.broader)]
             if all((b not in c_in) for b in bs):
                 tops.append(c)
-        storage = render_scheme_page_storage(graph, sch, narrower, tops)
+        storage = render_scheme_page_storage(graph, sch, narrower, tops, cache)
         inner = storage.split("<body>", 1)[1].rsplit("</body>", 1)[0]
         content.append(inner)
 
@@ -324,7 +368,8 @@ def cf_update_page(base_url: str, page_id: str, current_version: int, title: str
 
 def main():
     ap = argparse.ArgumentParser(description="Generate and (optionally) post Confluence pages from SKOS TTL")
-    ap.add_argument("--ttl", required=True, help="Path to global TTL file")
+    ap.add_argument("--ttl", required=True, nargs="+",
+                    help="Path to global TTL file; several files (e.g. core + SSR.ttl) are merged")
     ap.add_argument("--out", default="skos_confluence_out", help="Output directory for generated files")
     ap.add_argument("--title", default="SKOS Vocabulary", help="Title for the all-in-one entry page")
     ap.add_argument("--base-url", help="Base Confluence URL, e.g. https://mysite.net/wiki")
@@ -337,6 +382,15 @@ def main():
     ap.add_argument("--per-scheme", action="store_true", help="Also create one child page per ConceptScheme under the new/updated entry page")
     ap.add_argument("--update-if-exists", action="store_true", help="If a page with the same title exists, update it instead of creating")
     ap.add_argument("--dry-run", action="store_true", help="Print what would be posted but do not call Confluence")
+    ap.add_argument("--cache-dir", default=os.getenv("SKOS_FRAGMENT_CACHE", DEFAULT_CACHE_DIR),
+                    help="Fragment cache directory shared with skos_md_and_ttl_update.py")
+    ap.add_argument("--cache-max-entries", type=int, default=DEFAULT_MAX_ENTRIES, help="LRU bound on cached fragments")
+    ap.add_argument("--no-cache", action="store_true", help="Render every concept block from scratch")
+    ap.add_argument("--store", choices=STORES, default="rdflib", help="Triple store used while rendering")
+    ap.add_argument("--snapshot", help="Compact store snapshot path (default <ttl>.snapshot; single --ttl only)")
+    ap.add_argument("--no-snapshot", action="store_true", help="Always parse the TTL, never read/write a snapshot")
+    ap.add_argument("--predicates", help="Only load these predicates, comma-separated (e.g. 'skos:*,apmwg:linkedSSR')")
+    ap.add_argument("--langs", help="Only load literals in these languages, comma-separated (e.g. 'en')")
     args = ap.parse_args()
 
     # Parse parent URL if provided
@@ -360,11 +414,13 @@ def main():
     os.makedirs(args.out, exist_ok=True)
 
     # Load TTL
-    g = Graph()
-    g.parse(args.ttl, format="turtle")
+    g = load_graph(args.ttl, store=args.store, snapshot=False if args.no_snapshot else (args.snapshot or True),
+                   projection=Projection.from_args(args.predicates, args.langs))
+
+    cache = None if (args.no_cache or not args.cache_dir) else FragmentCache(args.cache_dir, args.cache_max_entries)
 
     # Generate storage outputs
-    all_in_one = render_all_in_one_storage(g)
+    all_in_one = render_all_in_one_storage(g, cache)
     all_path = os.path.join(args.out, "storage_all_in_one.xhtml")
     with open(all_path, "w", encoding="utf-8") as f:
         f.write(all_in_one)
@@ -389,7 +445,7 @@ def main():
     for sch in sorted(schemes, key=lambda u: qname(g, u)):
         c_in = [c for c in concepts if sch in list(g.objects(c, SKOS.inScheme))]
         tops = [c for c in c_in if all((b not in c_in) for b in broader[c])]
-        storage = render_scheme_page_storage(g, sch, narrower, tops)
+        storage = render_scheme_page_storage(g, sch, narrower, tops, cache)
         fname = qname(g, sch).replace(":", "_").replace("/", "_")
         page_path = os.path.join(pages_dir, f"{fname}.xhtml")
         with open(page_path, "w", encoding="utf-8") as f:
@@ -410,6 +466,9 @@ def main():
     print(f"[OK] Generated all-in-one: {all_path}")
     print(f"[OK] Per-scheme pages dir: {pages_dir}")
     print(f"[OK] Example payload: {os.path.join(args.out, 'example_payload.json')}")
+    if cache is not None:
+        cache.close()
+        print(f"[OK] Fragment cache: {cache.stats()}")
 
     if not args.post:
         print("\n(dry) Generation done. Use --post to publish to Confluence.")
@@ -0,0 +1,351 @@
+# compact_store.py
+"""
+Read-optimised, integer-ID triple store for the Taxonomy scripts.
+
+All exporters here only read after parsing, so they do not need rdflib's
+general-purpose Memory store (dict-of-dict indexes, one Python tuple per
+index entry). CompactGraph instead:
+
+- dictionary-encodes every distinct term once to an int32 ID
+- keeps the triples three times, in SPO, POS and OSP order, each as three
+  parallel array('i') columns (12 bytes per triple per permutation)
+- answers every triple pattern with at most two binary searches on those
+  columns, then a contiguous slice (subject-bound patterns scan the few
+  triples of that subject)
+
+Result order follows rdflib where the exporters' output depends on it: the
+triples of a subject keep their insertion order (prefLabel language order,
+narrower lists, RDF previews), and subjects are numbered in the order they
+first occur as subjects, so subjects(RDF.type, SKOS.Concept) lists concepts
+in rdflib's type-index order too (see subject_order).
+
+It exposes the read API the scripts use on rdflib.Graph: triples, objects,
+subjects, predicates, predicate_objects, subject_objects, subject_predicates,
+value, namespaces/bind/namespace_manager, len, iteration and `in`.
+Use to_graph() when an rdflib.Graph is needed (serialisation, mutation).
+
+A CompactGraph can be saved to / loaded from a snapshot file, which skips
+Turtle parsing entirely on the next run (see taxonomy_loader.load_graph).
+
+Usage:
+  cg = CompactGraph.from_graph(rdflib_graph)
+  cg.save("export12.ttl.snapshot")
+  cg = CompactGraph.load("export12.ttl.snapshot")
+  for child in cg.subjects(SKOS.broader, facet): ...
+"""
+
+import os
+import pickle
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from rdflib import Graph
+from rdflib.exceptions import UniquenessError
+from rdflib.namespace import RDF
+
+SNAPSHOT_FORMAT = "compact-triple-store"
+SNAPSHOT_VERSION = 2  # 2: source header pickled ahead of the payload
+
+# Column order of each permutation, as indexes into (s, p, o)
+PERMUTATIONS = {"spo": (0, 1, 2), "pos": (1, 2, 0), "osp": (2, 0, 1)}
+
+
+def subject_order(graph) -> List:
+    """Subjects of an rdflib graph: typed ones in type-index order, then the rest."""
+    subjects = dict.fromkeys(s for s, _, _ in graph.triples((None, RDF.type, None)))
+    for s in graph.subjects(unique=True):
+        subjects.setdefault(s)
+    return list(subjects)
+
+
+class CompactGraph:
+    """Immutable triple store: int32 term IDs in sorted SPO/POS/OSP columns."""
+
+    def __init__(self, terms: List, perms: dict, namespaces: Iterable[Tuple[str, str]] = ()):
+        self._terms = terms                                  # id -> term
+        self._ids = {t: i for i, t in enumerate(terms)}      # term -> id
+        self._perms = perms                                  # name -> (col0, col1, col2)
+        # Prefix bindings only; an empty rdflib Graph gives us a compatible namespace_manager
+        self._ns_graph = Graph(bind_namespaces="none")
+        for prefix, ns in namespaces:
+            self._ns_graph.bind(prefix, ns, override=True, replace=True)
+        self.namespace_manager = self._ns_graph.namespace_manager
+
+    # ---------------- construction ----------------
+
+    @classmethod
+    def from_triples(cls, triples: Iterable[Tuple], namespaces: Iterable[Tuple[str, str]] = ()) -> "CompactGraph":
+        """Encode triples (duplicates dropped)."""
+        terms: List = []
+        ids = {}
+        encoded = []
+        for triple in triples:
+            row = []
+            for t in triple:
+                i = ids.get(t)
+                if i is None:
+                    i = ids[t] = len(terms)
+                    terms.append(t)
+                row.append(i)
+            encoded.append(tuple(row))
+        return cls.from_encoded(terms, encoded, namespaces)
+
+    @classmethod
+    def from_encoded(cls, terms: List, rows: Iterable[Tuple[int, int, int]],
+                     namespaces: Iterable[Tuple[str, str]] = ()) -> "CompactGraph":
+        """Build from an already encoded term list and (s, p, o) ID rows (duplicates dropped)."""
+        encoded = list(dict.fromkeys(rows))  # dedup, keeps first occurrence order
+        # Renumber: subjects first, in order of first occurrence as subject
+        order = dict.fromkeys(r[0] for r in encoded)
+        for i in range(len(terms)):
+            order.setdefault(i)
+        remap = [0] * len(terms)
+        for new, old in enumerate(order):
+            remap[old] = new
+        terms = [terms[old] for old in order]
+        encoded = [(remap[s], remap[p], remap[o]) for s, p, o in encoded]
+        return cls(terms, cls._build_permutations(encoded, len(terms)), namespaces)
+
+    @classmethod
+    def from_graph(cls, graph) -> "CompactGraph":
+        # Walk subject by subject: predicate_objects() preserves rdflib's insertion order
+        triples = ((s, p, o) for s in subject_order(graph) for p, o in graph.predicate_objects(s))
+        return cls.from_triples(triples, graph.namespaces())
+
+    @classmethod
+    def merge(cls, graphs: Iterable["CompactGraph"]) -> "CompactGraph":
+        """
+        One store holding the union of several (e.g. one per source file).
+        Triples keep source order; prefixes bound by an earlier graph win.
+        """
+        terms: List = []
+        ids = {}
+        rows: List[Tuple[int, int, int]] = []
+        namespaces = {}
+        for graph in graphs:
+            remap = []
+            for t in graph._terms:
+                i = ids.get(t)
+                if i is None:
+                    i = ids[t] = len(terms)
+                    terms.append(t)
+                remap.append(i)
+            c0, c1, c2 = graph._perms["spo"]
+            rows.extend((remap[s], remap[p], remap[o]) for s, p, o in zip(c0, c1, c2))
+            for prefix, ns in graph.namespaces():
+                namespaces.setdefault(prefix, str(ns))
+        return cls.from_encoded(terms, rows, namespaces.items())
+
+    @staticmethod
+    def _build_permutations(encoded: List, n_terms: int) -> dict:
+        """
+        Sort the encoded triples into the three permutations. SPO is sorted on s
+        only, keeping each subject's triples in input order; POS and OSP are
+        fully sorted.
+        """
+        n = len(encoded)
+        bits = max(1, (max(n_terms, n) - 1).bit_length())
+        mask = (1 << bits) - 1
+        perms = {}
+        for name, (a, b, c) in PERMUTATIONS.items():
+            # Pack each row into one int so sorting is a plain int sort
+            if name == "spo":
+                rows = [encoded[k & mask] for k in sorted((r[0] << bits) | seq for seq, r in enumerate(encoded))]
+                perms[name] = tuple(array("i", (r[i] for r in rows)) for i in (0, 1, 2))
+                continue
+            keys = sorted((r[a] << (2 * bits)) | (r[b] << bits) | r[c] for r in encoded)
+            perms[name] = (array("i", (k >> (2 * bits) for k in keys)),
+                           array("i", ((k >> bits) & mask for k in keys)),
+                           array("i", (k & mask for k in keys)))
+        return perms
+
+    # ---------------- snapshots ----------------
+
+    def save(self, path: str, source_info: Optional[dict] = None) -> None:
+        header = {"format": SNAPSHOT_FORMAT, "version": SNAPSHOT_VERSION, "source": source_info or {}}
+        payload = {
+            "namespaces": [(p, str(ns)) for p, ns in self.namespaces()],
+            "terms": self._terms,
+            "perms": {name: tuple(col.tobytes() for col in cols) for name, cols in self._perms.items()},
+        }
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)  # parallel loaders never see a half-written snapshot
+
+    @staticmethod
+    def _read_header(f, path: str) -> dict:
+        header = pickle.load(f)
+        if header.get("format") != SNAPSHOT_FORMAT or header.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"{path} is not a compact store snapshot (version {SNAPSHOT_VERSION})")
+        return header
+
+    @classmethod
+    def load(cls, path: str) -> "CompactGraph":
+        with open(path, "rb") as f:
+            cls._read_header(f, path)
+            payload = pickle.load(f)
+        perms = {}
+        for name, blobs in payload["perms"].items():
+            cols = []
+            for blob in blobs:
+                col = array("i")
+                col.frombytes(blob)
+                cols.append(col)
+            perms[name] = tuple(cols)
+        return cls(payload["terms"], perms, payload["namespaces"])
+
+    @classmethod
+    def snapshot_source(cls, path: str) -> dict:
+        """Source info recorded in a snapshot (used to decide whether it is stale); reads the header only."""
+        with open(path, "rb") as f:
+            return cls._read_header(f, path).get("source", {})
+
+    def __reduce__(self):
+        # Pickled as terms + columns (e.g. when returned from a loader process)
+        return type(self), (self._terms, self._perms, [(p, str(ns)) for p, ns in self.namespaces()])
+
+    def to_graph(self) -> Graph:
+        g = Graph()
+        for prefix, ns in self.namespaces():
+            g.bind(prefix, ns)
+        for t in self:
+            g.add(t)
+        return g
+
+    # ---------------- pattern matching ----------------
+
+    def _id(self, term) -> Optional[int]:
+        return None if term is None else self._ids.get(term, -1)
+
+    def _range(self, perm: str, first: int, second: Optional[int] = None) -> Tuple[int, int]:
+        col0, col1, _ = self._perms[perm]
+        lo = bisect_left(col0, first)
+        hi = bisect_right(col0, first, lo)
+        if second is not None and lo < hi:
+            lo, hi = bisect_left(col1, second, lo, hi), bisect_right(col1, second, lo, hi)
+        return lo, hi
+
+    def _match(self, s, p, o) -> Iterator[Tuple[int, int, int]]:
+        """Yield (s, p, o) ID triples for a pattern; None is a wildcard."""
+        si, pi, oi = self._id(s), self._id(p), self._id(o)
+        if -1 in (si, pi, oi):
+            return  # a bound term that never occurs
+        if si is not None:
+            if oi is not None and pi is None:
+                c0, c1, c2 = self._perms["osp"]
+                lo, hi = self._range("osp", oi, si)
+                for k in range(lo, hi):
+                    yield si, c2[k], oi
+                return
+            # A subject's triples are contiguous and in input order; scan them
+            c0, c1, c2 = self._perms["spo"]
+            lo, hi = self._range("spo", si)
+            for k in range(lo, hi):
+                if (pi is None or c1[k] == pi) and (oi is None or c2[k] == oi):
+                    yield si, c1[k], c2[k]
+        elif pi is not None:
+            c0, c1, c2 = self._perms["pos"]
+            lo, hi = self._range("pos", pi, oi)
+            for k in range(lo, hi):
+                yield c2[k], pi, c1[k]
+        elif oi is not None:
+            c0, c1, c2 = self._perms["osp"]
+            lo, hi = self._range("osp", oi)
+            for k in range(lo, hi):
+                yield c1[k], c2[k], oi
+        else:
+            c0, c1, c2 = self._perms["spo"]
+            for k in range(len(c0)):
+                yield c0[k], c1[k], c2[k]
+
+    # ---------------- rdflib.Graph-compatible read API ----------------
+
+    def triples(self, pattern: Tuple) -> Iterator[Tuple]:
+        s, p, o = pattern
+        terms = self._terms
+        for si, pi, oi in self._match(s, p, o):
+            yield terms[si], terms[pi], terms[oi]
+
+    def objects(self, subject=None, predicate=None, unique: bool = False) -> Iterator:
+        seen = set() if unique else None
+        for _, _, oi in self._match(subject, predicate, None):
+            if seen is not None:
+                if oi in seen:
+                    continue
+                seen.add(oi)
+            yield self._terms[oi]
+
+    def subjects(self, predicate=None, object=None, unique: bool = False) -> Iterator:
+        seen = set() if unique else None
+        for si, _, _ in self._match(None, predicate, object):
+            if seen is not None:
+                if si in seen:
+                    continue
+                seen.add(si)
+            yield self._terms[si]
+
+    def predicates(self, subject=None, object=None, unique: bool = False) -> Iterator:
+        seen = set() if unique else None
+        for _, pi, _ in self._match(subject, None, object):
+            if seen is not None:
+                if pi in seen:
+                    continue
+                seen.add(pi)
+            yield self._terms[pi]
+
+    def predicate_objects(self, subject=None, unique: bool = False) -> Iterator[Tuple]:
+        for _, p, o in self.triples((subject, None, None)):
+            yield p, o
+
+    def subject_objects(self, predicate=None, unique: bool = False) -> Iterator[Tuple]:
+        for s, _, o in self.triples((None, predicate, None)):
+            yield s, o
+
+    def subject_predicates(self, object=None, unique: bool = False) -> Iterator[Tuple]:
+        for s, p, _ in self.triples((None, None, object)):
+            yield s, p
+
+    def value(self, subject=None, predicate=RDF.value, object=None, default=None, any: bool = True):
+        if subject is None and object is None:
+            return default
+        if object is None:
+            values = self.objects(subject, predicate)
+        elif subject is None:
+            values = self.subjects(predicate, object)
+        else:
+            values = self.predicates(subject, object)
+        first = next(values, None)
+        if first is None:
+            return default
+        if not any and next(values, None) is not None:
+            raise UniquenessError([first])
+        return first
+
+    def namespaces(self) -> Iterator[Tuple[str, object]]:
+        return self._ns_graph.namespaces()
+
+    def bind(self, prefix: str, namespace, override: bool = True, replace: bool = False) -> None:
+        # Bindings only affect qnames/serialisation, so they stay mutable
+        self._ns_graph.bind(prefix, namespace, override=override, replace=replace)
+
+    def qname(self, uri) -> str:
+        return self.namespace_manager.qname(uri)
+
+    def __iter__(self) -> Iterator[Tuple]:
+        return self.triples((None, None, None))
+
+    def __contains__(self, triple: Tuple) -> bool:
+        return next(self._match(*triple), None) is not None
+
+    def __len__(self) -> int:
+        return len(self._perms["spo"][0])
+
+    def __repr__(self) -> str:
+        return f"<CompactGraph {len(self)} triples, {len(self._terms)} terms>"
+
+    def memory_bytes(self) -> int:
+        """Bytes held in the triple columns (terms and the term dict not included)."""
+        return sum(col.buffer_info()[1] * col.itemsize for cols in self._perms.values() for col in cols)
@@ -0,0 +1,226 @@
+# concept_registry.py
+"""
+Persistent ConceptID registry (SQLite)
+
+Maps source concept URIs to ConceptIDs so that every export reuses the IDs
+minted by earlier runs instead of drawing fresh random ones:
+
+- Lookups are served from an in-memory dict loaded once per run (O(1)).
+- New IDs are minted in bulk, checked against every ID ever issued
+  (active or retired) and inserted in a single transaction.
+- assign() takes the write lock (BEGIN IMMEDIATE) and re-reads the table
+  before minting, so exports sharing one registry file never mint the same
+  ID or insert the same URI twice.
+- URIs that disappear from a run are marked retired, never deleted; their IDs
+  are not handed out again, and a URI that comes back gets its old ID back.
+- Retirement is scoped to a source: a run names the vocabulary it exports
+  (source_key of its input files) and only drops that source's URIs. A URI is
+  retired once no source holds it any more, so scripts exporting different
+  vocabularies can share one registry without retiring each other's IDs.
+- A URI whose fragment already is a ConceptID (e.g. apmwg:G5K95028 in
+  export12.ttl) adopts that ID, so re-exporting an exported file is a no-op.
+
+Used by skos_md_and_ttl_update.py and ttl2md2ttl.py. The registry file is
+given by SKOS_CONCEPT_REGISTRY (default concept_registry.sqlite).
+
+Usage:
+  with ConceptRegistry("concept_registry.sqlite") as reg:
+      ids = reg.assign(concept_uris, retire_missing=True,
+                       source=source_key(["export12.ttl"]))  # {uri: "K3J9QZ2A", ...}
+
+  python concept_registry.py concept_registry.sqlite          # summary
+  python concept_registry.py concept_registry.sqlite --retired
+"""
+
+import os
+import re
+import sys
+import random
+import string
+import sqlite3
+import argparse
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_REGISTRY = os.getenv("SKOS_CONCEPT_REGISTRY", "concept_registry.sqlite")
+ID_ALPHABET = string.ascii_uppercase + string.digits
+ID_LENGTH = 8
+# Fragments that already look like ConceptIDs (export12.ttl has 8- and 9-char ones)
+ADOPTABLE_ID = re.compile(r"[A-Z0-9]{8,9}")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS concept_ids (
+    uri        TEXT PRIMARY KEY,
+    concept_id TEXT NOT NULL UNIQUE,
+    minted_at  TEXT NOT NULL,
+    retired_at TEXT
+);
+CREATE TABLE IF NOT EXISTS source_members (
+    source TEXT NOT NULL,
+    uri    TEXT NOT NULL,
+    PRIMARY KEY (source, uri)
+);
+"""
+
+_rng = random.SystemRandom()
+
+
+def fragment_of(uri: str) -> str:
+    """Local name after '#' (or the last '/')."""
+    return re.split(r"[#/]", str(uri))[-1]
+
+
+def source_key(paths: Iterable[str]) -> str:
+    """Retirement scope for a run over these input files ("SSR.ttl,export12.ttl")."""
+    return ",".join(sorted(os.path.basename(str(p)) for p in paths))
+
+
+class ConceptRegistry:
+    """URI -> ConceptID map persisted in SQLite, cached in memory."""
+
+    def __init__(self, path: str = DEFAULT_REGISTRY):
+        self.path = path
+        # autocommit mode: assign() opens its own BEGIN IMMEDIATE transaction
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.executescript(SCHEMA)
+        self._load()
+
+    def _load(self) -> None:
+        """(Re)read the whole registry into memory."""
+        self._ids: Dict[str, str] = {}          # uri -> concept_id (active and retired)
+        self._retired: Dict[str, str] = {}      # uri -> retired_at
+        self._issued = set()                    # every concept_id ever minted
+        self._members: Dict[str, set] = {}      # source -> uris it held on its last run
+        for uri, cid, retired_at in self.conn.execute("SELECT uri, concept_id, retired_at FROM concept_ids"):
+            self._ids[uri] = cid
+            self._issued.add(cid)
+            if retired_at:
+                self._retired[uri] = retired_at
+        for source, uri in self.conn.execute("SELECT source, uri FROM source_members"):
+            self._members.setdefault(source, set()).add(uri)
+
+    # ---------------- public API ----------------
+
+    def lookup(self, uri) -> Optional[str]:
+        """ConceptID of an active URI, or None."""
+        key = str(uri)
+        return None if key in self._retired else self._ids.get(key)
+
+    def assign(self, uris: Iterable, retire_missing: bool = False, source: Optional[str] = None) -> Dict:
+        """
+        Return {uri: concept_id} for all given URIs (keys keep their original type),
+        minting IDs for unknown URIs. With retire_missing, active URIs not in this
+        batch are marked retired: with a source, only URIs that source held before
+        and no other source still holds; without one, every other active URI.
+        """
+        uris = list(uris)
+        # Another export may share the file: take the write lock first, then mint against
+        # what is stored now rather than against the snapshot read at open.
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = self._assign(uris, retire_missing, source)
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            self._load()
+            raise
+        return result
+
+    def _assign(self, uris: list, retire_missing: bool, source: Optional[str]) -> Dict:
+        self._load()
+        now = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        wanted = {str(u) for u in uris}
+        new_rows: List[Tuple[str, str, str]] = []
+        revived: List[str] = []
+
+        for key in sorted(wanted):  # sorted: adoption/minting order independent of set order
+            if key in self._ids:
+                if key in self._retired:
+                    revived.append(key)
+                continue
+            cid = self._adopt(key) or self._mint()
+            self._ids[key] = cid
+            self._issued.add(cid)
+            new_rows.append((key, cid, now))
+
+        dropped: List[str] = []
+        if source is None:
+            to_retire = [u for u in self._ids if u not in wanted and u not in self._retired] if retire_missing else []
+        else:
+            previous = self._members.get(source, set())
+            joined = wanted - previous
+            to_retire = []
+            if retire_missing:  # this batch is the source's complete URI set
+                dropped = sorted(previous - wanted)
+                held = set().union(*(m for s, m in self._members.items() if s != source))
+                to_retire = [u for u in dropped if u not in held and u not in self._retired]
+
+        if source is not None:
+            self.conn.executemany("INSERT INTO source_members (source, uri) VALUES (?, ?)",
+                                  [(source, u) for u in sorted(joined)])
+            self.conn.executemany("DELETE FROM source_members WHERE source = ? AND uri = ?",
+                                  [(source, u) for u in dropped])
+        self.conn.executemany("INSERT INTO concept_ids (uri, concept_id, minted_at) VALUES (?, ?, ?)", new_rows)
+        self.conn.executemany("UPDATE concept_ids SET retired_at = NULL WHERE uri = ?", [(u,) for u in revived])
+        self.conn.executemany("UPDATE concept_ids SET retired_at = ? WHERE uri = ?", [(now, u) for u in to_retire])
+        for u in revived:
+            del self._retired[u]
+        for u in to_retire:
+            self._retired[u] = now
+        if source is not None:
+            self._members[source] = (previous | wanted).difference(dropped)
+
+        if new_rows or revived or to_retire:
+            print(f"[registry] {len(new_rows)} minted, {len(revived)} revived, {len(to_retire)} retired "
+                  f"({len(self._ids) - len(self._retired)} active) in {self.path}")
+        return {u: self._ids[str(u)] for u in uris}
+
+    def retired(self) -> List[Tuple[str, str, str]]:
+        """(uri, concept_id, retired_at) of retired entries."""
+        return sorted((u, self._ids[u], at) for u, at in self._retired.items())
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __len__(self) -> int:
+        return len(self._ids) - len(self._retired)
+
+    def __enter__(self) -> "ConceptRegistry":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ---------------- internals ----------------
+
+    def _adopt(self, uri: str) -> Optional[str]:
+        frag = fragment_of(uri)
+        if ADOPTABLE_ID.fullmatch(frag) and frag not in self._issued:
+            return frag
+        return None
+
+    def _mint(self) -> str:
+        """Random 8-char uppercase alphanumeric ID not issued before."""
+        while True:
+            cid = "".join(_rng.choices(ID_ALPHABET, k=ID_LENGTH))
+            if cid not in self._issued:
+                return cid
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Inspect the persistent ConceptID registry")
+    ap.add_argument("registry", nargs="?", default=DEFAULT_REGISTRY, help="Registry SQLite file")
+    ap.add_argument("--retired", action="store_true", help="List retired URIs and their IDs")
+    args = ap.parse_args()
+    if not os.path.exists(args.registry):
+        print(f"ERROR: registry {args.registry} does not exist")
+        sys.exit(2)
+    with ConceptRegistry(args.registry) as reg:
+        print(f"{args.registry}: {len(reg)} active, {len(reg.retired())} retired")
+        if args.retired:
+            for uri, cid, at in reg.retired():
+                print(f"{cid}\t{uri}\tretired {at}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+# fragment_cache.py
+"""
+Content-addressed on-disk cache for rendered concept fragments.
+
+Shared by skos_md_and_ttl_update.py (Markdown sections) and
+Visualizer/skos_to_confluence.py (Confluence storage XHTML blocks).
+
+A fragment is stored under a key that is the SHA-256 of everything that went
+into rendering it: the concept's own triples, the labels of the neighbours it
+links to and a template/renderer version string. If none of those changed
+between two exports, the fragment is reused verbatim instead of re-rendered.
+
+Layout on disk:
+  <root>/index.json          LRU order (oldest first)
+  <root>/ab/abcdef....frag   one UTF-8 file per fragment
+
+Eviction is least-recently-used once more than `max_entries` fragments are
+stored. The index is written on close(); a cache directory left behind by a
+crashed run is still usable, unknown files are simply adopted on next open.
+
+Usage:
+  with FragmentCache(".skos_fragment_cache") as cache:
+      key = FragmentCache.make_key("md-section", TEMPLATE_SRC, triples, labels)
+      text = cache.get(key)
+      if text is None:
+          text = render(...)
+          cache.put(key, text)
+"""
+
+import os
+import json
+import hashlib
+from collections import OrderedDict
+from typing import Iterable, List, Optional
+
+DEFAULT_CACHE_DIR = ".skos_fragment_cache"
+DEFAULT_MAX_ENTRIES = 50000
+INDEX_FILE = "index.json"
+FRAGMENT_SUFFIX = ".frag"
+
+
+def subject_fingerprint(graph, subject) -> List[str]:
+    """Sorted N3 'predicate object' pairs of one subject (order independent)."""
+    return sorted(f"{p.n3()} {o.n3()}" for p, o in graph.predicate_objects(subject))
+
+
+def namespaces_fingerprint(graph) -> List[str]:
+    """Sorted prefix bindings; qnames in rendered output depend on them."""
+    return sorted(f"{prefix}={ns}" for prefix, ns in graph.namespaces())
+
+
+class FragmentCache:
+    """LRU-evicting, content-addressed fragment store on the local filesystem."""
+
+    def __init__(self, root: str = DEFAULT_CACHE_DIR, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.root = root
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lru: "OrderedDict[str, None]" = OrderedDict()
+        self._dirty = False
+        os.makedirs(root, exist_ok=True)
+        self._load_index()
+
+    # ---------------- keys ----------------
+
+    @staticmethod
+    def make_key(kind: str, *parts) -> str:
+        """Hash a fragment kind and its rendering inputs (any JSON-serialisable values)."""
+        payload = json.dumps([kind, *parts], ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    # ---------------- public API ----------------
+
+    def get(self, key: str) -> Optional[str]:
+        if key not in self._lru:
+            self.misses += 1
+            return None
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                text = f.read()
+        except OSError:
+            # File evicted by another process or removed by hand
+            del self._lru[key]
+            self._dirty = True
+            self.misses += 1
+            return None
+        self._lru.move_to_end(key)
+        self._dirty = True
+        self.hits += 1
+        return text
+
+    def put(self, key: str, text: str) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, path)
+        self._lru[key] = None
+        self._lru.move_to_end(key)
+        self._dirty = True
+        self._evict()
+
+    def close(self) -> None:
+        """Persist the LRU order. Safe to call more than once."""
+        if not self._dirty:
+            return
+        tmp = os.path.join(self.root, f"{INDEX_FILE}.{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "lru": list(self._lru)}, f)
+        os.replace(tmp, os.path.join(self.root, INDEX_FILE))
+        self._dirty = False
+
+    def stats(self) -> str:
+        total = self.hits + self.misses
+        rate = (100.0 * self.hits / total) if total else 0.0
+        return f"{self.hits}/{total} fragments from cache ({rate:.0f}%), {len(self._lru)} stored"
+
+    def __len__(self) -> int:
+        return len(self._lru)
+
+    def __enter__(self) -> "FragmentCache":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ---------------- internals ----------------
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key + FRAGMENT_SUFFIX)
+
+    def _load_index(self) -> None:
+        known: List[str] = []
+        try:
+            with open(os.path.join(self.root, INDEX_FILE), "r", encoding="utf-8") as f:
+                known = json.load(f).get("lru", [])
+        except (OSError, ValueError):
+            pass
+        on_disk = set(self._scan())
+        # Files not in the index (e.g. index never written) count as least recently used
+        for key in sorted(on_disk.difference(known)):
+            self._lru[key] = None
+        for key in known:
+            if key in on_disk:
+                self._lru[key] = None
+        self._dirty = len(self._lru) != len(known)
+        self._evict()
+
+    def _scan(self) -> Iterable[str]:
+        for shard in os.listdir(self.root):
+            shard_dir = os.path.join(self.root, shard)
+            if len(shard) != 2 or not os.path.isdir(shard_dir):
+                continue
+            for name in os.listdir(shard_dir):
+                if name.endswith(FRAGMENT_SUFFIX):
+                    yield name[: -len(FRAGMENT_SUFFIX)]
+
+    def _evict(self) -> None:
+        while len(self._lru) > self.max_entries:
+            key, _ = self._lru.popitem(last=False)
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+            self._dirty = True
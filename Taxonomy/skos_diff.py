@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SKOS version diff
+-----------------
+Compare two versions of the taxonomy (e.g. export11.ttl -> export12.ttl) and
+write a reviewer-friendly changelog instead of raw triple differences.
+
+How it works
+- Each version is canonicalised in ONE pass over its triples into a sorted list
+  of per-concept records (labels, broader, definition, linkedSSR, fingerprint).
+- The two sorted lists are walked with a linear merge, so the comparison is
+  O(n) after the sort; no graph isomorphism or triple-set differences.
+
+Change kinds
+- added / removed      concept present in only one version
+- relabelled           skos:prefLabel changed (any language)
+- moved                skos:broader changed
+- redefined            skos:definition changed
+- relinked_ssr         apmwg:linkedSSR changed
+- other                any other triple of the concept changed (altLabel, related, notes, ...)
+
+The --feed output lists every concept whose rendered output can change: the
+changed concepts themselves plus the neighbours that display their labels
+(children, old/new parents, related concepts). Incremental exporters can use
+it as their rebuild set.
+
+Install:
+  pip install rdflib
+
+Examples:
+  python skos_diff.py export11.ttl export12.ttl                       # Markdown to stdout
+  python skos_diff.py export11.ttl export12.ttl --md CHANGELOG.md --json changes.json
+  python skos_diff.py export11.ttl export12.ttl --feed rebuild.json
+"""
+import sys
+import json
+import argparse
+from collections import defaultdict
+from typing import Dict, List, Set, Tuple
+
+from rdflib import Graph, URIRef, Literal
+from rdflib.namespace import RDF, SKOS
+
+CHANGE_KINDS = ("added", "removed", "relabelled", "moved", "redefined", "relinked_ssr", "other")
+
+# -------------------------- Canonicalisation --------------------------
+
+def _local_name(uri) -> str:
+    s = str(uri)
+    return s.rsplit("#", 1)[-1].rsplit("/", 1)[-1]
+
+def canonicalise(graph) -> List[Tuple[str, dict]]:
+    """
+    One pass over all triples -> sorted [(concept_uri, record)].
+
+    record = {label, labels, broader, related, definition, ssr, fingerprint}
+    All collection values are sorted tuples so records compare with ==.
+    linkedSSR is matched by local name so it works whatever the apmwg base is.
+    """
+    concepts: Set = set()
+    labels = defaultdict(list)
+    broader = defaultdict(list)
+    related = defaultdict(list)
+    defs = defaultdict(list)
+    ssr = defaultdict(list)
+    triples = defaultdict(list)
+    concept_cls = SKOS.Concept
+    known = {RDF.type: "type", SKOS.prefLabel: "label", SKOS.definition: "definition",
+             SKOS.broader: "broader", SKOS.related: "related"}
+    kind_of: Dict = {}  # predicate -> slot, decided once per distinct predicate
+
+    for s, p, o in graph.triples((None, None, None)):
+        triples[s].append((p, o))
+        kind = kind_of.get(p, "?")
+        if kind == "?":
+            kind = kind_of[p] = known.get(p) or ("ssr" if _local_name(p) == "linkedSSR" else None)
+        if kind is None:
+            continue
+        if kind == "type":
+            if o == concept_cls:
+                concepts.add(s)
+        elif kind == "label":
+            labels[s].append((o.language or "", str(o)) if isinstance(o, Literal) else ("", str(o)))
+        elif kind == "definition":
+            defs[s].append(str(o).strip())
+        elif kind == "broader":
+            broader[s].append(str(o))
+        elif kind == "related":
+            related[s].append(str(o))
+        else:
+            ssr[s].append(str(o))
+
+    records = []
+    for c in concepts:
+        if not isinstance(c, URIRef):
+            continue
+        lbls = tuple(sorted(labels[c]))
+        en = [t for lang, t in lbls if lang == "en"]
+        records.append((str(c), {
+            "label": en[0] if en else (lbls[0][1] if lbls else _local_name(c)),
+            "labels": lbls,
+            "broader": tuple(sorted(broader[c])),
+            "related": tuple(sorted(related[c])),
+            "definition": tuple(sorted(defs[c])),
+            "ssr": tuple(sorted(ssr[c])),
+            "fingerprint": frozenset(triples[c]),  # compared as a set: a hash could collide
+        }))
+    records.sort(key=lambda r: r[0])
+    return records
+
+# -------------------------- Linear merge --------------------------
+
+def diff_records(old: List[Tuple[str, dict]], new: List[Tuple[str, dict]]) -> Dict[str, list]:
+    """
+    Merge two sorted record lists. Returns {kind: [entry, ...]} where an entry is
+    {"uri", "label", and for changes "old"/"new"}. One concept can appear under
+    several kinds (e.g. relabelled and moved).
+    """
+    changes: Dict[str, list] = {k: [] for k in CHANGE_KINDS}
+    i = j = 0
+    while i < len(old) or j < len(new):
+        if j >= len(new) or (i < len(old) and old[i][0] < new[j][0]):
+            uri, rec = old[i]
+            changes["removed"].append({"uri": uri, "label": rec["label"]})
+            i += 1
+            continue
+        if i >= len(old) or new[j][0] < old[i][0]:
+            uri, rec = new[j]
+            changes["added"].append({"uri": uri, "label": rec["label"], "broader": list(rec["broader"])})
+            j += 1
+            continue
+        uri, a = old[i]
+        _, b = new[j]
+        i += 1
+        j += 1
+        if a["fingerprint"] == b["fingerprint"]:
+            continue
+        specific = False
+        for kind, field in (("relabelled", "labels"), ("moved", "broader"),
+                            ("redefined", "definition"), ("relinked_ssr", "ssr")):
+            if a[field] != b[field]:
+                changes[kind].append({"uri": uri, "label": b["label"],
+                                      "old": _jsonable(a[field]), "new": _jsonable(b[field])})
+                specific = True
+        if not specific or a["related"] != b["related"]:
+            changes["other"].append({"uri": uri, "label": b["label"]})
+    return changes
+
+def _jsonable(value):
+    return [list(v) if isinstance(v, tuple) else v for v in value]
+
+def diff_graphs(old_graph, new_graph) -> Dict[str, list]:
+    return diff_records(canonicalise(old_graph), canonicalise(new_graph))
+
+def affected_concepts(changes: Dict[str, list], old: List[Tuple[str, dict]],
+                      new: List[Tuple[str, dict]]) -> List[str]:
+    """
+    Change feed for incremental rebuilds: every concept (in the new version) whose
+    rendered output may differ. Besides the changed concepts this includes
+    all descendants of relabelled, moved, added or removed concepts, related
+    concepts of relabelled ones, and old/new parents of every changed concept
+    (their NT lists change).
+    """
+    new_map = dict(new)
+    old_map = dict(old)
+    children = defaultdict(set)
+    related_to = defaultdict(set)
+    for uri, rec in new:
+        for b in rec["broader"]:
+            children[b].add(uri)
+        for r in rec["related"]:
+            related_to[r].add(uri)
+
+    out: Set[str] = set()
+    walked: Set[str] = set()
+    for kind in CHANGE_KINDS:
+        for entry in changes[kind]:
+            uri = entry["uri"]
+            out.add(uri)
+            if kind in ("relabelled", "added", "removed", "moved"):
+                # Descendants render the BT ancestor list (and, for a move, heading level and facet)
+                stack = list(children.get(uri, ()))
+                while stack:
+                    d = stack.pop()
+                    if d not in walked:
+                        walked.add(d)
+                        stack.extend(children.get(d, ()))
+            if kind in ("relabelled", "added", "removed"):
+                # Label shown in the RT cells of related concepts
+                out.update(related_to.get(uri, ()))
+            for rec in (old_map.get(uri), new_map.get(uri)):
+                if rec:
+                    out.update(rec["broader"])
+    out |= walked
+    return sorted(u for u in out if u in new_map)
+
+# -------------------------- Output --------------------------
+
+def changelog_markdown(changes: Dict[str, list], old_name: str, new_name: str) -> str:
+    titles = {
+        "added": "Added concepts", "removed": "Removed concepts", "relabelled": "Relabelled concepts",
+        "moved": "Moved concepts (broader changed)", "redefined": "Redefined concepts",
+        "relinked_ssr": "Re-linked SSR codes", "other": "Other changes (alt labels, related, notes)",
+    }
+    lines = [f"# Taxonomy changelog: {old_name} → {new_name}\n", "| Change | Concepts |", "|--------|----------|"]
+    for kind in CHANGE_KINDS:
+        lines.append(f"| {titles[kind]} | {len(changes[kind])} |")
+    lines.append("")
+
+    def cell(values) -> str:
+        out = []
+        for v in values:
+            if isinstance(v, list):  # (lang, label)
+                out.append(f"{v[0]}: {v[1]}" if v[0] else v[1])
+            else:
+                out.append(_local_name(v) if str(v).startswith("http") else str(v))
+        return "<br>".join(x.replace("|", "\\|").replace("\n", " ") for x in out) or "(none)"
+
+    for kind in CHANGE_KINDS:
+        entries = sorted(changes[kind], key=lambda e: e["label"].lower())
+        if not entries:
+            continue
+        lines.append(f"## {titles[kind]}\n")
+        if "old" in entries[0]:
+            lines.append("| Concept | ID | Before | After |")
+            lines.append("|---------|----|--------|-------|")
+            for e in entries:
+                lines.append(f"| {e['label']} | {_local_name(e['uri'])} | {cell(e['old'])} | {cell(e['new'])} |")
+        else:
+            lines.append("| Concept | ID |")
+            lines.append("|---------|----|")
+            for e in entries:
+                lines.append(f"| {e['label']} | {_local_name(e['uri'])} |")
+        lines.append("")
+    return "\n".join(lines)
+
+# -------------------------- Main flow --------------------------
+
+def load(path: str) -> Graph:
+    g = Graph()
+    g.parse(path, format="turtle")
+    return g
+
+def main():
+    ap = argparse.ArgumentParser(description="Concept-level diff/changelog between two SKOS TTL versions")
+    ap.add_argument("old", help="Older TTL version (e.g. export11.ttl)")
+    ap.add_argument("new", help="Newer TTL version (e.g. export12.ttl)")
+    ap.add_argument("--md", help="Write Markdown changelog to this file (default: stdout)")
+    ap.add_argument("--json", help="Write JSON changelog to this file")
+    ap.add_argument("--feed", help="Write the incremental-rebuild change feed (JSON list of concept URIs)")
+    args = ap.parse_args()
+
+    old_records = canonicalise(load(args.old))
+    new_records = canonicalise(load(args.new))
+    changes = diff_records(old_records, new_records)
+
+    md = changelog_markdown(changes, args.old, args.new)
+    if args.md:
+        with open(args.md, "w", encoding="utf-8") as f:
+            f.write(md)
+        print(f"[OK] Markdown changelog: {args.md}")
+    elif not args.json and not args.feed:
+        sys.stdout.write(md)
+
+    if args.json:
+        payload = {"from": args.old, "to": args.new,
+                   "summary": {k: len(v) for k, v in changes.items()}, "changes": changes}
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, indent=2)
+        print(f"[OK] JSON changelog: {args.json}")
+
+    if args.feed:
+        feed = affected_concepts(changes, old_records, new_records)
+        with open(args.feed, "w", encoding="utf-8") as f:
+            json.dump({"from": args.old, "to": args.new, "concepts": feed}, f, indent=2)
+        print(f"[OK] Change feed ({len(feed)} concepts): {args.feed}")
+
+if __name__ == "__main__":
+    main()
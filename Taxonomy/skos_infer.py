@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SKOS inference materialisation
+------------------------------
+Adds the triples that SKOS semantics imply, so downstream consumers (the
+React mockup's parseTtl, partner systems) no longer recompute inverses and
+closures on every load:
+
+- skos:narrower       inverse of skos:broader (and broader from narrower)
+- skos:broaderTransitive / skos:narrowerTransitive
+                      full closure of the hierarchy (direct links included)
+- skos:topConceptOf / skos:hasTopConcept
+                      for concepts without broader, per skos:inScheme, and
+                      each one mirrored from the other
+- skos:related        made symmetric
+
+The closure is computed in ONE topological pass (Kahn) from the top terms
+down: a concept's ancestors are its parents plus their already computed
+ancestors. Concepts on or below a broader cycle get no transitive triples;
+the cycles are reported (see skos_validate.py).
+
+Only triples not already present are produced. Write them next to the
+source (--out: source + inferred) or as a separate file (--inferred).
+
+Install:
+  pip install rdflib
+
+Examples:
+  python skos_infer.py export12.ttl --out export12_enriched.ttl
+  python skos_infer.py export12.ttl SSR.ttl --inferred export12_inferred.ttl
+  python skos_infer.py export12.ttl --inferred inferred.ttl --no-transitive
+"""
+import sys
+import time
+import argparse
+from collections import Counter, defaultdict, deque
+from typing import Dict, List, Optional, Set, Tuple
+
+from rdflib import Graph, URIRef
+from rdflib.namespace import RDF, SKOS
+
+from taxonomy_loader import load_graph
+from skos_traversal import CycleReport, find_cycles
+
+
+def transitive_closure(parents: Dict, report: Optional[CycleReport] = None) -> Dict:
+    """
+    {node: frozenset(ancestors)} in one topological pass over `parents`
+    ({child: set(parents)}). Nodes on or below a cycle are left out.
+    """
+    children = defaultdict(list)
+    pending = {}
+    for child, ps in parents.items():
+        pending[child] = len(ps)
+        for p in ps:
+            children[p].append(child)
+            pending.setdefault(p, len(parents.get(p, ())))
+    queue = deque(n for n, k in pending.items() if k == 0)
+    closure: Dict = {n: frozenset() for n in queue}
+    while queue:
+        node = queue.popleft()
+        for child in children.get(node, ()):
+            pending[child] -= 1
+            if pending[child] == 0:
+                acc: Set = set()
+                for p in parents[child]:
+                    acc.add(p)
+                    acc.update(closure[p])
+                closure[child] = frozenset(acc)
+                queue.append(child)
+    if report is not None and len(closure) < len(pending):
+        for cycle in find_cycles([n for n in pending if n not in closure], lambda n: parents.get(n, ())):
+            report.add(cycle)
+    return closure
+
+
+def infer(graph, transitive: bool = True, report: Optional[CycleReport] = None) -> List[Tuple]:
+    """Triples implied by the SKOS semantics above that are not in `graph` yet (no duplicates)."""
+    out: List[Tuple] = []
+    seen = set()
+
+    def add(triple: Tuple) -> None:
+        if triple not in seen and triple not in graph:
+            seen.add(triple)
+            out.append(triple)
+
+    parents = defaultdict(set)
+    for child, parent in graph.subject_objects(SKOS.broader):
+        parents[child].add(parent)
+    for parent, child in graph.subject_objects(SKOS.narrower):
+        parents[child].add(parent)
+
+    # Inverses
+    for child, ps in parents.items():
+        for parent in ps:
+            add((child, SKOS.broader, parent))
+            add((parent, SKOS.narrower, child))
+    for s, o in graph.subject_objects(SKOS.related):
+        add((o, SKOS.related, s))
+
+    # Top concepts: concepts without broader, in each of their schemes; both directions
+    for c in graph.subjects(RDF.type, SKOS.Concept):
+        if not parents.get(c):
+            for scheme in graph.objects(c, SKOS.inScheme):
+                add((c, SKOS.topConceptOf, scheme))
+                add((scheme, SKOS.hasTopConcept, c))
+    for c, scheme in graph.subject_objects(SKOS.topConceptOf):
+        add((scheme, SKOS.hasTopConcept, c))
+    for scheme, c in graph.subject_objects(SKOS.hasTopConcept):
+        add((c, SKOS.topConceptOf, scheme))
+
+    if transitive:
+        for node, ancestors in transitive_closure(parents, report).items():
+            for a in ancestors:
+                add((node, SKOS.broaderTransitive, a))
+                add((a, SKOS.narrowerTransitive, node))
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Materialise SKOS inverse/transitive/top-concept triples")
+    ap.add_argument("sources", nargs="+", help="Vocabulary file(s); several are merged")
+    ap.add_argument("--out", help="Write source + inferred triples (enriched TTL)")
+    ap.add_argument("--inferred", help="Write only the inferred triples (separate inference TTL)")
+    ap.add_argument("--no-transitive", action="store_true", help="Skip broaderTransitive/narrowerTransitive")
+    args = ap.parse_args()
+    if not args.out and not args.inferred:
+        ap.error("give --out and/or --inferred")
+
+    t0 = time.perf_counter()
+    g = load_graph(args.sources, store="compact")
+    report = CycleReport()
+    added = infer(g, transitive=not args.no_transitive, report=report)
+    elapsed = time.perf_counter() - t0
+    for p, n in sorted(Counter(p for _, p, _ in added).items(), key=lambda kv: str(kv[0])):
+        print(f"  + {n:>8} {g.qname(p)}")
+    if report:
+        print(report.describe(lambda u: g.qname(u) if isinstance(u, URIRef) else str(u)))
+
+    if args.inferred:
+        inferred = Graph()
+        for prefix, ns in g.namespaces():
+            inferred.bind(prefix, ns)
+        for t in added:
+            inferred.add(t)
+        inferred.serialize(args.inferred, format="turtle")
+        print(f"[OK] {len(added)} inferred triples: {args.inferred}")
+    if args.out:
+        enriched = g.to_graph()
+        for t in added:
+            enriched.add(t)
+        enriched.serialize(args.out, format="turtle")
+        print(f"[OK] Enriched TTL ({len(enriched)} triples): {args.out}")
+    print(f"({elapsed:.2f}s to load and infer)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -12,6 +12,7 @@ What this script does in ONE run:
    - Linked SSR entries with label + link + inline comment
    - Multiline skos:definition preserved in a single cell via <br>
    - Optional ChatGPT fallback for missing definitions
+   - Unchanged concept sections are reused from the on-disk fragment cache
 3) Produces a SECOND TTL file where:
    - Every skos:Concept in the APMWG namespace gets its fragment replaced with the ConceptID
    - Missing skos:definition (if any) is added from the Markdown (or AI fallback)
@@ -23,6 +24,29 @@ Configuration:
 - Provide OPENAI_API_KEY via environment variable when fallback is enabled
 - Input/output filenames can be overridden by env vars:
   SKOS_INPUT_TTL, SKOS_OUTPUT_MD, SKOS_OUTPUT_UPDATED_TTL, OPENAI_MODEL
+- SKOS_INPUT_TTL may list several files, comma-separated (e.g.
+  "export12.ttl,SSR.ttl"); they are merged into one graph, each source with
+  its own snapshot, and the updated TTL contains the merged result
+- ConceptIDs are kept in a persistent registry, SKOS_CONCEPT_REGISTRY
+  (default concept_registry.sqlite): IDs minted by earlier runs are reused,
+  concepts no longer present in these input files are marked retired
+- SKOS_STORE=compact loads the TTL into the read-optimised compact store
+  (compact_store.py) and reuses <input>.snapshot on later runs; default rdflib
+- SKOS_PREDICATES / SKOS_LANGS load only matching triples, e.g.
+  SKOS_PREDICATES="skos:*,apmwg:linkedSSR" SKOS_LANGS=en for an English-only
+  Markdown run. The updated TTL is not written then, as it would lack the
+  dropped triples.
+- SKOS_FACET exports only one facet's (or concept's) subtree, e.g.
+  SKOS_FACET="Meal" SKOS_DEPTH=3. The sources are split into per-facet shards
+  in SKOS_SHARD_DIR (default .skos_shards, rebuilt when a source changes) and
+  only the shards the subtree touches are loaded. Markdown only, like above.
+- Rendered sections are cached in SKOS_FRAGMENT_CACHE (default .skos_fragment_cache,
+  shared with Visualizer/skos_to_confluence.py); set it to "" to disable.
+  SKOS_FRAGMENT_CACHE_MAX caps the number of cached fragments (LRU eviction).
+- SKOS_INFER materialises the triples SKOS implies (skos_infer.py: narrower
+  inverses, broader/narrowerTransitive, topConceptOf/hasTopConcept,
+  symmetric related): "inline" adds them to the updated TTL, any other value
+  is the path of a separate inference TTL. Off by default.
 
 Usage:
   pip install rdflib jinja2 openai
@@ -31,22 +55,36 @@ Usage:
 
 import os
 import re
-import random
-import string
 from typing import List, Set, Dict, Tuple, Optional
 
 from rdflib import Graph, Namespace, URIRef, Literal
 from rdflib.namespace import RDF
 from jinja2 import Template
 
+from fragment_cache import FragmentCache, subject_fingerprint, DEFAULT_CACHE_DIR, DEFAULT_MAX_ENTRIES
+from concept_registry import ConceptRegistry, DEFAULT_REGISTRY, source_key
+from taxonomy_loader import load_graph, Projection
+from taxonomy_shards import open_shards, DEFAULT_SHARD_DIR
+from skos_traversal import CycleReport, traverse, ancestors, descendants, top_ancestor
+from skos_infer import infer
+
 # ---------------- CONFIG ----------------
-INPUT_TTL = os.getenv("SKOS_INPUT_TTL", "taxonomy.ttl")
+INPUT_TTL = os.getenv("SKOS_INPUT_TTL", "taxonomy.ttl")  # comma-separated for several sources
 OUTPUT_MD = os.getenv("SKOS_OUTPUT_MD", "taxonomy_iso25964_facets_indented.md")
 OUTPUT_TTL = os.getenv("SKOS_OUTPUT_UPDATED_TTL", "taxonomy_updated.ttl")
+CONCEPT_REGISTRY = DEFAULT_REGISTRY  # env SKOS_CONCEPT_REGISTRY
+STORE = os.getenv("SKOS_STORE", "rdflib")  # "rdflib" or "compact" (read-only, snapshot-cached)
+PROJECTION = Projection.from_args(os.getenv("SKOS_PREDICATES"), os.getenv("SKOS_LANGS"))  # None = load everything
+FACET = os.getenv("SKOS_FACET")  # label, qname or URI of the subtree root; None = whole taxonomy
+DEPTH = int(os.getenv("SKOS_DEPTH", "0")) or None  # levels below the facet; None = all
+SHARD_DIR = os.getenv("SKOS_SHARD_DIR", DEFAULT_SHARD_DIR)
+INFER = os.getenv("SKOS_INFER", "")  # "" = off, "inline" = into the updated TTL, else inference TTL path
 
 USE_CHATGPT_FALLBACK = True  # Set True to enable AI definitions for missing entries
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")  # Required if fallback enabled
+FRAGMENT_CACHE_DIR = os.getenv("SKOS_FRAGMENT_CACHE", DEFAULT_CACHE_DIR)
+FRAGMENT_CACHE_MAX = int(os.getenv("SKOS_FRAGMENT_CACHE_MAX", str(DEFAULT_MAX_ENTRIES)))
 # ----------------------------------------
 
 # Optional import only if fallback is enabled
@@ -66,19 +104,18 @@ SKOS = Namespace("http://www.w3.org/2004/02/skos/core#")
 RDFS = Namespace("http://www.w3.org/2000/01/rdf-schema#")
 APMWG = Namespace("http://example.org/apmwg#")  # change to your real base
 
-# Load graph
-g = Graph()
-g.parse(INPUT_TTL, format="turtle")
+# Load graph (lazily, facet by facet, for a subtree export)
+SOURCES = [p.strip() for p in INPUT_TTL.split(",") if p.strip()]
+if FACET:
+    g = open_shards(SOURCES, SHARD_DIR, projection=PROJECTION)
+else:
+    g = load_graph(SOURCES, store=STORE, projection=PROJECTION)
 
 # Bind prefixes (helps keep TTL readable on output)
 g.bind("skos", SKOS)
 g.bind("rdfs", RDFS)
 g.bind("apmwg", APMWG)
 
-def generate_concept_id() -> str:
-    """Random 8-char uppercase alphanumeric ID."""
-    return ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
-
 def make_anchor(label: str) -> str:
     """Make a GitHub/MkDocs-style anchor from a label."""
     return re.sub(r'[^a-z0-9]+', '-', label.lower()).strip('-')
@@ -107,17 +144,12 @@ def clickable_if_concept(uri: URIRef, concept_uris: Set[URIRef]) -> str:
     label = get_label(uri)
     return f"[{label}](#{make_anchor(label)})" if uri in concept_uris else label
 
+# broader cycles met while walking the hierarchy; reported after the export
+hierarchy_cycles = CycleReport()
+
 def get_ancestors(uri: URIRef) -> List[URIRef]:
-    """All broader ancestors (recursive), nearest first."""
-    out, seen = [], set()
-    def dfs(u):
-        for b in g.objects(u, SKOS.broader):
-            if b not in seen:
-                seen.add(b)
-                out.append(b)
-                dfs(b)
-    dfs(uri)
-    return out
+    """All broader ancestors (depth-first, each once), nearest first."""
+    return ancestors(uri, lambda u: g.objects(u, SKOS.broader))
 
 def get_children(uri: URIRef) -> List[URIRef]:
     """Immediate children via inverse of skos:broader (handles graphs without skos:narrower)."""
@@ -126,12 +158,8 @@ def get_children(uri: URIRef) -> List[URIRef]:
     return kids
 
 def get_all_descendants(uri: URIRef) -> List[URIRef]:
-    """All descendants (recursive) using inverse broader; sorted per level by label."""
-    result = []
-    for child in get_children(uri):
-        result.append(child)
-        result.extend(get_all_descendants(child))
-    return result
+    """All descendants (depth-first, each once) using inverse broader; sorted per level by label."""
+    return descendants(uri, get_children)
 
 def linked_ssr_pretty(uri: Optional[URIRef]) -> str:
     """Return '[Label](URI) — comment' or empty string."""
@@ -146,16 +174,11 @@ def linked_ssr_pretty(uri: Optional[URIRef]) -> str:
 def get_facet_label(uri: URIRef):
     """
     Walks up the skos:broader chain to find the top-level term (facet)
-    Returns its prefLabel as string.
+    Returns its prefLabel as string. A broader cycle stops the walk.
     """
-    current = uri
-    while True:
-        broader_terms = list(g.objects(current, SKOS.broader))
-        if not broader_terms:
-            # No broader term → top term
-            labels = list(g.objects(current, SKOS.prefLabel))
-            return str(labels[0]) if labels else "Unknown Facet"
-        current = broader_terms[0]
+    top = top_ancestor(uri, lambda u: g.value(u, SKOS.broader), hierarchy_cycles)
+    labels = list(g.objects(top, SKOS.prefLabel))
+    return str(labels[0]) if labels else "Unknown Facet"
 
 def get_definition(uri: URIRef) -> str:
     """Collects all skos:definition literals; preserves line breaks as <br>. Optional API fallback."""
@@ -191,7 +214,7 @@ def get_definition(uri: URIRef) -> str:
     return ""
 
 # Three-table template for each concept
-concept_tmpl = Template("""{{ heading_prefix }} {{ pref_label }}
+CONCEPT_TMPL_SRC = """{{ heading_prefix }} {{ pref_label }}
 
 | PT | Definition | Concept ID |
 |----|------------|------------|
@@ -205,26 +228,81 @@ concept_tmpl = Template("""{{ heading_prefix }} {{ pref_label }}
 |----------|----------|
 | {{ languages }} | (empty) |
 
-""")
+"""
+concept_tmpl = Template(CONCEPT_TMPL_SRC)
+# Bump when render_concept changes how template inputs are derived (invalidates cached sections)
+CONCEPT_RENDER_VERSION = "md-section-1"
 
-def render_concept(uri: URIRef, level: int, concept_uris: Set[URIRef], concept_ids: Dict[URIRef, str],
-                   collected_defs: Dict[URIRef, str], visited: Set[URIRef]) -> str:
-    """Render one concept and recursively render its children with increasing heading level."""
-    if uri in visited:
-        return ""  # Avoid cycles/duplicates within the facet
-    visited.add(uri)
+fragment_cache = FragmentCache(FRAGMENT_CACHE_DIR, FRAGMENT_CACHE_MAX) if FRAGMENT_CACHE_DIR else None
 
+def render_concept(uri: URIRef, level: int, concept_uris: Set[URIRef], concept_ids: Dict[URIRef, str],
+                   collected_defs: Dict[URIRef, str], visited: Set[URIRef], max_level: Optional[int] = None) -> str:
+    """Render one concept and its descendants (down to max_level), depth-first, with increasing heading level."""
+    sections: List[str] = []
+    children_of: Dict[URIRef, List[URIRef]] = {}  # computed once per node, handed to the traversal
+
+    def visit(node: URIRef, depth: int, parent: Optional[URIRef]) -> None:
+        section, children_of[node] = render_concept_node(node, level + depth, concept_uris, concept_ids,
+                                                         collected_defs)
+        sections.append(section)
+
+    # visited: each concept once per facet (polyhierarchy, cycles)
+    traverse([uri], lambda node: children_of.pop(node), pre=visit,
+             max_depth=None if max_level is None else max_level - level,
+             visited=visited, report=hierarchy_cycles)
+    return "".join(sections)
+
+def render_concept_node(uri: URIRef, level: int, concept_uris: Set[URIRef], concept_ids: Dict[URIRef, str],
+                        collected_defs: Dict[URIRef, str]) -> Tuple[str, List[URIRef]]:
+    """Section of one concept (from the fragment cache when unchanged) and its children."""
     pref_label = get_label(uri)
     heading_prefix = "#" * min(6, 2 + level)  # Facet content starts at '##', then deeper
+    ancestor_uris = get_ancestors(uri)
+    children = get_children(uri)
+    related_uris = list(g.objects(uri, SKOS.related))
+    linked_ssr = linked_ssr_pretty(g.value(uri, APMWG["linkedSSR"]))
+
+    # Cache key = everything the section depends on: own triples, neighbour labels, template
+    section, cache_key = None, None
+    if fragment_cache is not None:
+        neighbours = lambda uris: [(str(u), get_label(u), u in concept_uris) for u in uris]
+        cache_key = FragmentCache.make_key(
+            CONCEPT_RENDER_VERSION, CONCEPT_TMPL_SRC, level, concept_ids[uri],
+            subject_fingerprint(g, uri), neighbours(ancestor_uris), neighbours(children),
+            neighbours(related_uris), linked_ssr,
+            OPENAI_MODEL if USE_CHATGPT_FALLBACK else None,
+        )
+        section = fragment_cache.get(cache_key)
+
+    # Definitions only need patching into the TTL when the graph has none (AI fallback text)
+    has_definition = any(True for _ in g.objects(uri, SKOS.definition))
+    if section is not None:
+        if has_definition:
+            collected_defs[uri] = get_definition(uri)
+        else:
+            collected_defs[uri] = fragment_cache.get(FragmentCache.make_key("md-definition", cache_key)) or ""
+    else:
+        section = render_concept_section(uri, level, pref_label, heading_prefix, ancestor_uris, children,
+                                         related_uris, linked_ssr, concept_uris, concept_ids, collected_defs)
+        if cache_key is not None:
+            fragment_cache.put(cache_key, section)
+            if not has_definition:
+                fragment_cache.put(FragmentCache.make_key("md-definition", cache_key), collected_defs[uri])
+
+    return section, children
+
+def render_concept_section(uri: URIRef, level: int, pref_label: str, heading_prefix: str,
+                           ancestors: List[URIRef], children: List[URIRef], related_uris: List[URIRef],
+                           linked_ssr: str, concept_uris: Set[URIRef], concept_ids: Dict[URIRef, str],
+                           collected_defs: Dict[URIRef, str]) -> str:
+    """Render the three tables of one concept (no descendants)."""
     definition = get_definition(uri)
     collected_defs[uri] = definition  # store for TTL patching
 
     # BT = ancestors (nearest first), clickable
-    ancestors = get_ancestors(uri)
     bt = ", ".join([clickable_if_concept(a, concept_uris) for a in ancestors])
 
     # NT = immediate children, clickable
-    children = get_children(uri)
     nt = ", ".join([clickable_if_concept(c, concept_uris) for c in children])
 
     # UF = altLabels; link to this concept
@@ -232,18 +310,15 @@ def render_concept(uri: URIRef, level: int, concept_uris: Set[URIRef], concept_i
     uf = ", ".join([f"[{txt}](#{make_anchor(pref_label)})" for txt in uf_labels]) if uf_labels else ""
 
     # RT = related concepts, clickable if present
-    related_uris = list(g.objects(uri, SKOS.related))
     rt = ", ".join([clickable_if_concept(r, concept_uris) for r in related_uris])
 
-    linked_ssr = linked_ssr_pretty(g.value(uri, APMWG["linkedSSR"]))
-
     # Languages list (e.g., "en: Vegan; fr: Végétalien")
     langs = [f"{lbl.language}: {lbl}" for lbl in g.objects(uri, SKOS.prefLabel) if isinstance(lbl, Literal)]
     languages_str = "; ".join(langs) if langs else "(none)"
 
     is_top_term = "Yes" if not list(g.objects(uri, SKOS.broader)) else "No"
 
-    section = concept_tmpl.render(
+    return concept_tmpl.render(
         heading_prefix=heading_prefix,
         pref_label=pref_label,
         definition=definition,
@@ -254,36 +329,37 @@ def render_concept(uri: URIRef, level: int, concept_uris: Set[URIRef], concept_i
         languages=languages_str
     )
 
-    # Recurse for children
-    for child in children:
-        section += render_concept(child, level + 1, concept_uris, concept_ids, collected_defs, visited)
-    return section
-
-def build_index_page(top_terms: List[URIRef]) -> str:
-    """Build a recursive, sorted index with all descendants under each facet."""
+def build_index_page(top_terms: List[URIRef], max_level: Optional[int] = None) -> str:
+    """Build a sorted index with all descendants (down to max_level) under each facet."""
     lines = ["# Taxonomy Index\n"]
 
-    def traverse(node: URIRef, level: int):
+    def visit(node: URIRef, level: int, parent: Optional[URIRef]) -> None:
         label = get_label(node)
         lines.append(f'{"  " * level}- [{label}](#{make_anchor(label)})')
-        for child in get_children(node):
-            traverse(child, level + 1)
 
-    for facet in top_terms:
-        traverse(facet, 0)
+    # unique=False: a concept with several broader terms is listed under each of them
+    traverse(top_terms, get_children, pre=visit, max_depth=max_level, unique=False, report=hierarchy_cycles)
     lines.append("\n---\n")
     return "\n".join(lines)
 
-# Collect all SKOS concepts & concept IDs (stable per run)
+# Collect all SKOS concepts & concept IDs (stable across runs via the registry)
 concept_uris: Set[URIRef] = set(g.subjects(RDF.type, SKOS.Concept))
-concept_ids: Dict[URIRef, str] = {u: generate_concept_id() for u in concept_uris}
-
-# Identify facets (Top Terms = no broader)
-top_terms = sorted([u for u in concept_uris if not list(g.objects(u, SKOS.broader))],
-                   key=lambda u: get_label(u).lower())
+with ConceptRegistry(CONCEPT_REGISTRY) as registry:
+    concept_ids: Dict[URIRef, str] = registry.assign(concept_uris, retire_missing=True,
+                                                       source=source_key(SOURCES))
+
+# Identify facets (Top Terms = no broader), or the requested subtree root
+if FACET:
+    root = g.find_concept(FACET)
+    if root is None:
+        raise SystemExit(f"ERROR: no facet or concept '{FACET}' in {INPUT_TTL}")
+    top_terms = [root]
+else:
+    top_terms = sorted([u for u in concept_uris if not list(g.objects(u, SKOS.broader))],
+                       key=lambda u: get_label(u).lower())
 
 # Assemble Markdown
-md_parts: List[str] = [build_index_page(top_terms)]
+md_parts: List[str] = [build_index_page(top_terms, DEPTH)]
 collected_defs: Dict[URIRef, str] = {}
 for top in top_terms:
     facet_label = get_label(top)
@@ -293,23 +369,38 @@ for top in top_terms:
                                    concept_uris=concept_uris,
                                    concept_ids=concept_ids,
                                    collected_defs=collected_defs,
-                                   visited=visited_within_facet))
+                                   visited=visited_within_facet,
+                                   max_level=DEPTH))
 
 # Save Markdown
 with open(OUTPUT_MD, "w", encoding="utf-8") as f:
     f.write("".join(md_parts))
 print(f"✅ Markdown export saved to {OUTPUT_MD}")
+if fragment_cache is not None:
+    fragment_cache.close()
+    print(f"   Fragment cache: {fragment_cache.stats()}")
+if FACET:
+    print(f"   Shards loaded: {', '.join(g.loaded_shards())} of {len(g.manifest['shards'])}")
+if hierarchy_cycles:
+    print(hierarchy_cycles.describe(get_label))
+
+# A projected or subtree load does not hold the whole taxonomy: no updated TTL
+if PROJECTION is not None or FACET:
+    print("ℹ️ Projection/subtree export: updated TTL not written")
+    raise SystemExit(0)
 
 
 
 # ---------------- PATCH ORIGINAL GRAPH -> UPDATED TTL ----------------
 
-# Step 1: Add missing definitions (only for concepts missing them)
+# Step 1: Collect missing definitions (only for concepts missing them);
+#         they are added to the rewritten graph in Step 3 so g itself stays read-only
+missing_defs: List[Tuple[URIRef, str]] = []
 for uri, definition in collected_defs.items():
     if definition:
         had_def = any(True for _ in g.objects(uri, SKOS.definition))
         if not had_def:
-            g.add((uri, SKOS.definition, Literal(definition, lang="en")))
+            missing_defs.append((uri, definition))
 
 # Step 2: Build mapping from old concept URIs to new URIs (ConceptID),
 #         but ONLY for resources typed as skos:Concept and within APMWG namespace.
@@ -332,18 +423,24 @@ for s, p, o in g:
     new_s = uri_map.get(s, s)
     new_o = uri_map.get(o, o) if isinstance(o, URIRef) else o
     g2.add((new_s, p, new_o))
-
-# Step 4: Ensure skos:narrower consistency (optional: not strictly necessary if original had either)
-# Here we don't add/remove semantics, just kept existing ones rewritten by uri_map.
-# If you want to regenerate skos:narrower as inverse of broader, uncomment below:
-
-# for c in uri_map.values():
-#     # remove all explicit narrower (optional cleanup)
-#     for _, _, child in list(g2.triples((c, SKOS.narrower, None))):
-#         g2.remove((c, SKOS.narrower, child))
-# # regenerate from broader
-# for child, _, parent in g2.triples((None, SKOS.broader, None)):
-#     g2.add((parent, SKOS.narrower, child))
+for uri, definition in missing_defs:
+    g2.add((uri_map.get(uri, uri), SKOS.definition, Literal(definition, lang="en")))
+
+# Step 4: Optionally materialise inverses, transitive closure and top concepts (skos_infer.py)
+if INFER:
+    inferred = infer(g2)
+    if INFER == "inline":
+        for t in inferred:
+            g2.add(t)
+        print(f"✅ {len(inferred)} inferred triples added to the updated TTL")
+    else:
+        g_inf = Graph()
+        for prefix, ns in g2.namespaces():
+            g_inf.bind(prefix, ns)
+        for t in inferred:
+            g_inf.add(t)
+        g_inf.serialize(INFER, format="turtle")
+        print(f"✅ {len(inferred)} inferred triples written to {INFER}")
 
 # Step 5: Serialize updated TTL
 g2.serialize(OUTPUT_TTL, format="turtle")
@@ -0,0 +1,163 @@
+# skos_traversal.py
+"""
+Iterative hierarchy traversal shared by the exporters.
+
+Python recursion stops at ~1000 levels, and generated partner hierarchies
+go deeper; a skos:broader cycle made the recursive walkers loop forever.
+Everything here uses explicit stacks instead:
+
+- traverse()   depth-first walk from one or more roots with pre-/post-order
+               visitors, optional depth limit, cycle detection
+- ancestors()  all broader ancestors, nearest first
+- top_ancestor() first top term reached by following the first broader
+- find_cycles() cycles of a parent/child relation, e.g. skos:broader
+
+With unique=True (the default) every node is visited once, so a walk over a
+polyhierarchy is linear in nodes + edges. With unique=False a node is
+visited under each of its parents (tree rendering), but never twice on the
+same path: an edge back to a node on the current path is a cycle, it is
+recorded in the CycleReport and not followed.
+
+Usage:
+  from skos_traversal import traverse
+
+  lines = []
+  report = traverse(top_terms, get_children,
+                    pre=lambda node, depth, parent: lines.append("  " * depth + get_label(node)))
+  if report:
+      print(report.describe(get_label))
+"""
+
+from typing import Callable, Hashable, Iterable, Iterator, List, Optional, Set
+
+Visitor = Callable[[Hashable, int, Optional[Hashable]], Optional[bool]]
+
+
+class CycleReport:
+    """Cycles found during a traversal; each cycle is [n0, n1, ..., n0] along the walked edges."""
+
+    def __init__(self):
+        self.cycles: List[List] = []
+        self._seen: Set[frozenset] = set()
+
+    def add(self, cycle: List) -> None:
+        key = frozenset(cycle)
+        if key not in self._seen:  # the same cycle entered from another node
+            self._seen.add(key)
+            self.cycles.append(cycle)
+
+    def describe(self, label: Callable = str) -> str:
+        lines = [f"⚠️ {len(self.cycles)} hierarchy cycle(s) skipped:"]
+        for cycle in self.cycles:
+            lines.append("   " + " → ".join(label(n) for n in cycle))
+        return "\n".join(lines)
+
+    def __bool__(self) -> bool:
+        return bool(self.cycles)
+
+    def __len__(self) -> int:
+        return len(self.cycles)
+
+    def __iter__(self) -> Iterator[List]:
+        return iter(self.cycles)
+
+
+def traverse(roots: Iterable, children: Callable[[Hashable], Iterable],
+             pre: Optional[Visitor] = None, post: Optional[Visitor] = None,
+             max_depth: Optional[int] = None, unique: bool = True,
+             visited: Optional[Set] = None, report: Optional[CycleReport] = None) -> CycleReport:
+    """
+    Depth-first walk from each root, in order. `children(node)` gives the next
+    level in the order it should be visited.
+
+    pre(node, depth, parent) is called when a node is entered; returning False
+    prunes its children. post(node, depth, parent) is called when it is left,
+    after all its children. Nodes at max_depth are visited but not expanded.
+    `visited` (with unique=True) can be shared between calls to skip nodes an
+    earlier walk already covered.
+    """
+    report = report if report is not None else CycleReport()
+    if unique and visited is None:
+        visited = set()
+    for root in roots:
+        if unique:
+            if root in visited:
+                continue
+            visited.add(root)
+        path = [root]
+        on_path = {root: 0}  # node -> index in path
+        stack = [(root, None, _expand(root, 0, None, children, pre, max_depth))]
+        while stack:
+            node, parent, kids = stack[-1]
+            for child in kids:
+                if child in on_path:
+                    report.add(path[on_path[child]:] + [child])
+                    continue
+                if unique:
+                    if child in visited:
+                        continue
+                    visited.add(child)
+                on_path[child] = len(path)
+                path.append(child)
+                stack.append((child, node, _expand(child, len(path) - 1, node, children, pre, max_depth)))
+                break
+            else:
+                stack.pop()
+                path.pop()
+                del on_path[node]
+                if post is not None:
+                    post(node, len(path), parent)
+    return report
+
+
+def _expand(node, depth: int, parent, children, pre, max_depth) -> Iterator:
+    if pre is not None and pre(node, depth, parent) is False:
+        return iter(())
+    if max_depth is not None and depth >= max_depth:
+        return iter(())
+    return iter(children(node))
+
+
+def ancestors(node, parents: Callable[[Hashable], Iterable]) -> List:
+    """All ancestors, nearest first (depth-first along `parents`, each once, node itself excluded)."""
+    out = []
+    traverse([node], parents, pre=lambda n, depth, parent: out.append(n) if depth else None)
+    return out
+
+
+def descendants(node, children: Callable[[Hashable], Iterable], max_depth: Optional[int] = None) -> List:
+    """All descendants in depth-first pre-order, each once, node itself excluded."""
+    out = []
+    traverse([node], children, pre=lambda n, depth, parent: out.append(n) if depth else None,
+             max_depth=max_depth)
+    return out
+
+
+def top_ancestor(node, first_parent: Callable[[Hashable], Optional[Hashable]],
+                 report: Optional[CycleReport] = None):
+    """
+    Follow `first_parent` until a node without parent. On a cycle, stop at the
+    node that closes it (and record the cycle in `report`).
+    """
+    seen = {node: 0}
+    path = [node]
+    current = node
+    while True:
+        parent = first_parent(current)
+        if parent is None:
+            return current
+        if parent in seen:
+            if report is not None:
+                report.add(path[seen[parent]:] + [parent])
+            return current
+        seen[parent] = len(path)
+        path.append(parent)
+        current = parent
+
+
+def find_cycles(nodes: Iterable, children: Callable[[Hashable], Iterable]) -> CycleReport:
+    """
+    Cycles reachable from `nodes`, at least one per tangle of nodes that reach
+    each other (one linear walk; the back edges found are reported).
+    """
+    return traverse(nodes, children)
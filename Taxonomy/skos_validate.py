@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SKOS integrity validator
+------------------------
+Checks a vocabulary before it is published. The exporters hide most of these
+problems (render_concept's `visited` set swallows broader cycles, a dangling
+skos:broader renders as a bare fragment), so run this as a gate first.
+
+How it works
+- ONE pass over the triples collects types, labels, hierarchy, related,
+  scheme membership and linkedSSR links (dispatch on predicate, decided once
+  per distinct predicate)
+- every check is then a linear pass over what was collected; cycles come
+  from one iterative walk over the broader relation (skos_traversal.py)
+
+Errors
+- cycle                 broader cycles (skos:broader and inverse skos:narrower)
+- dangling_broader      broader/narrower target with no triples of its own
+- dangling_related      related target with no triples of its own
+- missing_pref_label    no prefLabel in a required language (--langs)
+- multiple_pref_labels  several prefLabels in one language
+- anchor_collision      different labels, same Markdown anchor (make_anchor)
+- ssr_not_ssr           linkedSSR target not typed apmwg:SSR
+Warnings
+- non_concept_target    broader/related target is not a skos:Concept
+- duplicate_label       same prefLabel on several concepts
+- outside_scheme        concept in no scheme (inScheme/topConceptOf)
+- orphan                no broader and not a declared top concept
+
+Exit status: 0 when there are no errors (no warnings either with --strict),
+1 otherwise, so it can gate a publishing job.
+
+Install:
+  pip install rdflib
+
+Examples:
+  python skos_validate.py export12.ttl
+  python skos_validate.py export12.ttl SSR.ttl --langs en,fr --json report.json
+  python skos_validate.py big.nt.gz --store compact --strict --max-items 50
+"""
+import re
+import sys
+import json
+import time
+import argparse
+from collections import defaultdict
+from typing import Dict, List, Sequence
+
+from rdflib import URIRef, Literal
+from rdflib.namespace import RDF, RDFS, SKOS
+
+from taxonomy_loader import load_graph, STORES
+from skos_traversal import find_cycles
+
+# name -> (severity, title)
+CHECKS = {
+    "cycle": ("error", "Broader cycles"),
+    "dangling_broader": ("error", "Dangling broader/narrower targets"),
+    "dangling_related": ("error", "Dangling related targets"),
+    "missing_pref_label": ("error", "Missing prefLabel in a required language"),
+    "multiple_pref_labels": ("error", "Several prefLabels in one language"),
+    "anchor_collision": ("error", "Markdown anchor collisions"),
+    "ssr_not_ssr": ("error", "linkedSSR targets not typed apmwg:SSR"),
+    "non_concept_target": ("warning", "Broader/related targets that are not skos:Concept"),
+    "duplicate_label": ("warning", "Same prefLabel on several concepts"),
+    "outside_scheme": ("warning", "Concepts outside any scheme"),
+    "orphan": ("warning", "Orphans (no broader, not a declared top concept)"),
+}
+
+
+def _local_name(uri) -> str:
+    s = str(uri)
+    return s.rsplit("#", 1)[-1].rsplit("/", 1)[-1]
+
+
+def make_anchor(label: str) -> str:
+    """Same anchor rule as skos_md_and_ttl_update.make_anchor."""
+    return re.sub(r'[^a-z0-9]+', '-', label.lower()).strip('-')
+
+
+def validate(graph, langs: Sequence[str] = ("en",)) -> Dict[str, List[dict]]:
+    """Run every check; returns {check: [finding, ...]}, a finding being {"uri", "label", "detail"}."""
+    subjects = set()
+    types = defaultdict(set)
+    pref = defaultdict(list)          # concept -> [(lang, text)]
+    rdfs_label = {}
+    broader = defaultdict(list)       # child -> [parent] (skos:broader and inverse skos:narrower)
+    related = defaultdict(list)
+    schemes = set()                   # concepts with inScheme / topConceptOf
+    top_concepts = set()
+    ssr_links = []                    # (concept, target, predicate)
+    known = {RDF.type: "type", SKOS.prefLabel: "pref", RDFS.label: "label", SKOS.broader: "broader",
+             SKOS.narrower: "narrower", SKOS.related: "related", SKOS.inScheme: "scheme",
+             SKOS.topConceptOf: "top", SKOS.hasTopConcept: "has_top"}
+    kind_of: Dict = {}  # predicate -> slot, decided once per distinct predicate
+
+    for s, p, o in graph.triples((None, None, None)):
+        subjects.add(s)
+        kind = kind_of.get(p, "?")
+        if kind == "?":
+            kind = kind_of[p] = known.get(p) or ("ssr" if _local_name(p) == "linkedSSR" else None)
+        if kind is None:
+            continue
+        if kind == "type":
+            types[s].add(o)
+        elif kind == "pref":
+            pref[s].append((o.language or "", str(o)) if isinstance(o, Literal) else ("", str(o)))
+        elif kind == "label":
+            rdfs_label.setdefault(s, str(o))
+        elif kind == "broader":
+            broader[s].append(o)
+        elif kind == "narrower":
+            broader[o].append(s)
+        elif kind == "related":
+            related[s].append(o)
+        elif kind == "scheme":
+            schemes.add(s)
+        elif kind == "top":
+            schemes.add(s)
+            top_concepts.add(s)
+        elif kind == "has_top":
+            top_concepts.add(o)
+        else:
+            ssr_links.append((s, o, p))
+
+    concepts = [s for s, t in types.items() if SKOS.Concept in t and isinstance(s, URIRef)]
+    concept_set = set(concepts)
+    concepts.sort(key=str)
+
+    def label_of(uri) -> str:
+        pairs = pref.get(uri)
+        if pairs:
+            en = [t for lang, t in pairs if lang == "en"]
+            return en[0] if en else pairs[0][1]
+        return rdfs_label.get(uri) or _local_name(uri)
+
+    findings: Dict[str, List[dict]] = {name: [] for name in CHECKS}
+
+    def report(check: str, uri, detail: str = "") -> None:
+        findings[check].append({"uri": str(uri), "label": label_of(uri), "detail": detail})
+
+    # Hierarchy and related targets
+    for check, relation in (("dangling_broader", broader), ("dangling_related", related)):
+        for c in concepts:
+            for target in dict.fromkeys(relation.get(c, ())):
+                if target not in subjects:
+                    report(check, c, f"→ {target}")
+                elif target not in concept_set:
+                    report("non_concept_target", c, f"{'broader' if relation is broader else 'related'} → {target}")
+
+    cycles = find_cycles(concepts, lambda c: broader.get(c, ()))
+    for cycle in cycles:
+        report("cycle", cycle[0], " → ".join(label_of(n) for n in cycle))
+
+    # Labels
+    required = [lang.lower() for lang in langs]
+    label_owners = defaultdict(list)   # (lang, folded label) -> concepts
+    anchors = defaultdict(dict)        # anchor -> {label: concept}
+    for c in concepts:
+        pairs = pref.get(c, [])
+        per_lang = defaultdict(list)
+        for lang, text in pairs:
+            per_lang[lang.lower()].append(text)
+            label_owners[(lang.lower(), text.strip().lower())].append(c)
+        for lang in required:
+            if lang not in per_lang:
+                report("missing_pref_label", c, lang)
+        for lang, texts in per_lang.items():
+            if len(texts) > 1:
+                report("multiple_pref_labels", c, f"{lang or '-'}: " + " | ".join(texts))
+        label = label_of(c)
+        anchors[make_anchor(label)].setdefault(label, c)
+    for (lang, _), owners in label_owners.items():
+        if len(owners) > 1:
+            for c in owners:
+                report("duplicate_label", c, f"{lang or '-'}, shared with {len(owners) - 1} other(s)")
+    for anchor, by_label in anchors.items():
+        if len(by_label) > 1:
+            for label, c in by_label.items():
+                report("anchor_collision", c, f"#{anchor} ← " + " | ".join(sorted(by_label)))
+
+    # Schemes and top concepts
+    for c in concepts:
+        if c not in schemes:
+            report("outside_scheme", c)
+        if not broader.get(c) and top_concepts and c not in top_concepts:
+            report("orphan", c)
+
+    # linkedSSR targets must be typed with the SSR class of the linkedSSR namespace
+    for c, target, p in ssr_links:
+        ssr_class = URIRef(str(p)[: -len("linkedSSR")] + "SSR")
+        if ssr_class not in types.get(target, ()):
+            report("ssr_not_ssr", c, f"→ {target}")
+
+    return findings
+
+
+def summary(findings: Dict[str, List[dict]]) -> Dict[str, int]:
+    errors = sum(len(findings[c]) for c, (sev, _) in CHECKS.items() if sev == "error")
+    warnings = sum(len(findings[c]) for c, (sev, _) in CHECKS.items() if sev == "warning")
+    return {"errors": errors, "warnings": warnings}
+
+
+def format_report(findings: Dict[str, List[dict]], max_items: int = 20) -> str:
+    lines = []
+    for severity in ("error", "warning"):
+        for check, (sev, title) in CHECKS.items():
+            items = findings[check]
+            if sev != severity or not items:
+                continue
+            lines.append(f"{'❌' if sev == 'error' else '⚠️'} {title} ({len(items)})")
+            for f in items[:max_items]:
+                detail = f"  {f['detail']}" if f["detail"] else ""
+                lines.append(f"   - {f['label']} <{f['uri']}>{detail}")
+            if len(items) > max_items:
+                lines.append(f"   ... {len(items) - max_items} more")
+    return "\n".join(lines)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Validate SKOS integrity before publishing")
+    ap.add_argument("sources", nargs="+", help="Vocabulary file(s); several are merged")
+    ap.add_argument("--langs", default="en", help="Languages every concept needs a prefLabel in (comma-separated)")
+    ap.add_argument("--store", choices=STORES, default="compact", help="Triple store used for the check")
+    ap.add_argument("--json", help="Write all findings as JSON to this file")
+    ap.add_argument("--max-items", type=int, default=20, help="Findings listed per check in the text report")
+    ap.add_argument("--strict", action="store_true", help="Fail on warnings too")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    g = load_graph(args.sources, store=args.store)
+    t1 = time.perf_counter()
+    findings = validate(g, [l.strip() for l in args.langs.split(",") if l.strip()])
+    t2 = time.perf_counter()
+    stats = {"concepts": len(set(g.subjects(RDF.type, SKOS.Concept))), "triples": len(g)}
+    counts = summary(findings)
+
+    report = format_report(findings, args.max_items)
+    if report:
+        print(report)
+    print(f"{'✅' if not counts['errors'] else '❌'} {', '.join(args.sources)}: {stats['concepts']} concepts, "
+          f"{counts['errors']} errors, {counts['warnings']} warnings "
+          f"(load {t1 - t0:.2f}s, checks {t2 - t1:.2f}s)")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"sources": args.sources, "summary": counts, "stats": stats, "findings": findings},
+                      f, ensure_ascii=False, indent=2)
+        print(f"[OK] JSON report: {args.json}")
+    return 1 if counts["errors"] or (args.strict and counts["warnings"]) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CSR array export of the concept graph
+-------------------------------------
+Writes the concept graph as plain NumPy arrays so analytics jobs can
+memory-map it (np.load(..., mmap_mode="r"), zero-copy) and compute depth,
+subtree sizes or facet membership with vectorised operations instead of
+rdflib loops.
+
+Bundle layout (a directory of .npy files plus manifest.json; --npz also
+writes a single uncompressed .npz, which np.load reads lazily but cannot
+memory-map)
+- node i = concept i, concepts sorted by URI (as in taxonomy_closure.py)
+- concept_ids       fixed-width bytes (S<n>), ConceptID of node i
+- id_order          argsort of concept_ids
+- concept_ids_sorted
+                    concept_ids[id_order]: np.searchsorted lookups run on
+                    the mapped file, no per-call gather
+- uri_ptr/uri_data, label_ptr/label_data
+                    UTF-8 strings as offsets + bytes (English prefLabel,
+                    else the first one)
+- broader_ptr/broader_idx, narrower_ptr/narrower_idx, related_ptr/related_idx
+                    CSR adjacency (int64 offsets, int32 node ids, sorted
+                    per row); related is symmetrised
+- ancestor_ptr/ancestor_idx
+                    strict ancestors (the closure of taxonomy_closure.py)
+- tops, facet (first facet of every node, -1 if none),
+  facet_ptr/facet_idx (all facets)
+- depth             shortest distance from a top concept (-1: only
+                    reachable through a cycle)
+- pre, post         DFS order numbers over narrower from the tops (first
+                    visit wins in the polyhierarchy): in that spanning tree
+                    a is an ancestor of b iff pre[a] <= pre[b] and
+                    post[b] <= post[a]
+- subtree_size      descendants (DAG, not counting the node itself)
+
+Install:
+  pip install rdflib numpy
+
+Examples:
+  python taxonomy_arrays.py export export12.ttl --out export12.arrays
+  python taxonomy_arrays.py export big.ttl --out big.arrays --npz big.npz
+  python taxonomy_arrays.py stats export12.arrays
+
+  from taxonomy_arrays import ConceptArrays
+  arrays = ConceptArrays.open("export12.arrays")        # memory-mapped
+  i = arrays.lookup("E7Y63352")
+  arrays.label(i), arrays.depth[i], arrays.children(i)
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from rdflib import Literal
+from rdflib.namespace import SKOS
+
+from taxonomy_loader import load_graph
+from taxonomy_closure import AncestorClosure
+
+BUNDLE_FORMAT = "skos-csr-arrays"
+BUNDLE_VERSION = 2
+MANIFEST = "manifest.json"
+
+
+def _adjacency(src: np.ndarray, dst: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """CSR rows src -> sorted, deduplicated dst."""
+    keys = src.astype(np.int64) * n + dst
+    keys.sort()
+    if len(keys):
+        keys = keys[np.concatenate([[True], keys[1:] != keys[:-1]])]
+    ptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys // n, minlength=n), out=ptr[1:])
+    return ptr, (keys % n).astype(np.int32)
+
+
+def _strings(values: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """UTF-8 offsets + bytes."""
+    encoded = [v.encode("utf-8") for v in values]
+    ptr = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(e) for e in encoded], out=ptr[1:])
+    return ptr, np.frombuffer(b"".join(encoded), dtype=np.uint8).copy()
+
+
+def _gather_rows(ptr: np.ndarray, idx: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    """Concatenation of the CSR rows `rows`."""
+    counts = ptr[rows + 1] - ptr[rows]
+    starts = np.repeat(ptr[rows] - np.concatenate([[0], np.cumsum(counts)[:-1]]), counts)
+    return idx[starts + np.arange(int(counts.sum()))]
+
+
+def depths(narrower_ptr: np.ndarray, narrower_idx: np.ndarray, tops: np.ndarray) -> np.ndarray:
+    """Breadth-first levels from the tops, one vectorised step per level."""
+    depth = np.full(len(narrower_ptr) - 1, -1, dtype=np.int32)
+    frontier = np.asarray(tops, dtype=np.int64)
+    depth[frontier] = 0
+    level = 0
+    while len(frontier):
+        level += 1
+        nxt = _gather_rows(narrower_ptr, narrower_idx, frontier)
+        nxt = nxt[depth[nxt] < 0]
+        frontier = np.unique(nxt).astype(np.int64)
+        depth[frontier] = level
+    return depth
+
+
+def dfs_order(narrower_ptr: np.ndarray, narrower_idx: np.ndarray, tops: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Pre/post order numbers of the DFS spanning tree (-1 for nodes not reachable from a top)."""
+    n = len(narrower_ptr) - 1
+    pre, post = [-1] * n, [-1] * n
+    ptr, idx = narrower_ptr.tolist(), narrower_idx.tolist()
+    clock_pre = clock_post = 0
+    for top in tops.tolist():
+        if pre[top] >= 0:
+            continue
+        pre[top] = clock_pre
+        clock_pre += 1
+        stack = [[top, ptr[top]]]
+        while stack:
+            frame = stack[-1]
+            node, pos = frame
+            if pos < ptr[node + 1]:
+                frame[1] = pos + 1
+                child = idx[pos]
+                if pre[child] < 0:
+                    pre[child] = clock_pre
+                    clock_pre += 1
+                    stack.append([child, ptr[child]])
+            else:
+                post[node] = clock_post
+                clock_post += 1
+                stack.pop()
+    pre, post = np.array(pre, dtype=np.int32), np.array(post, dtype=np.int32)
+    return pre, post
+
+
+def build_arrays(graph) -> Dict[str, np.ndarray]:
+    closure = AncestorClosure(graph)
+    n = len(closure.uris)
+    index = {u: i for i, u in enumerate(closure.uris)}
+    labels: Dict = {}
+    related_src, related_dst = [], []
+    broader_src, broader_dst = [], []
+    kind_of = {SKOS.prefLabel: "label", SKOS.broader: "broader", SKOS.narrower: "narrower", SKOS.related: "related"}
+    for s, p, o in graph.triples((None, None, None)):
+        kind = kind_of.get(p)
+        if kind is None:
+            continue
+        if kind == "label":
+            # the first label, replaced by the first English one
+            if s in index and isinstance(o, Literal) and labels.get(s, (None,))[0] != "en" \
+                    and (s not in labels or o.language == "en"):
+                labels[s] = (o.language, str(o))
+        elif kind == "related":
+            if s in index and o in index:
+                related_src += [index[s], index[o]]
+                related_dst += [index[o], index[s]]
+        else:
+            child, parent = (s, o) if kind == "broader" else (o, s)
+            if child in index and parent in index:
+                broader_src.append(index[child])
+                broader_dst.append(index[parent])
+
+    src, dst = np.array(broader_src, dtype=np.int64), np.array(broader_dst, dtype=np.int64)
+    broader_ptr, broader_idx = _adjacency(src, dst, n)
+    narrower_ptr, narrower_idx = _adjacency(dst, src, n)
+    related_ptr, related_idx = _adjacency(np.array(related_src, dtype=np.int64),
+                                          np.array(related_dst, dtype=np.int64), n)
+    ids = np.array([cid.encode("utf-8") for cid in closure.ids], dtype=f"S{max([len(c) for c in closure.ids] + [1])}")
+    uri_ptr, uri_data = _strings([str(u) for u in closure.uris])
+    label_ptr, label_data = _strings([labels[u][1] if u in labels else closure.ids[i]
+                                      for i, u in enumerate(closure.uris)])
+    facet = np.full(n, -1, dtype=np.int32)
+    has_facet = np.diff(closure.facet_ptr) > 0
+    facet[has_facet] = closure.facet_ids[closure.facet_ptr[:-1][has_facet]]
+    pre, post = dfs_order(narrower_ptr, narrower_idx, closure.tops)
+    id_order = np.argsort(ids, kind="stable").astype(np.int32)
+    return {
+        "concept_ids": ids,
+        "id_order": id_order,
+        "concept_ids_sorted": ids[id_order],
+        "uri_ptr": uri_ptr, "uri_data": uri_data,
+        "label_ptr": label_ptr, "label_data": label_data,
+        "broader_ptr": broader_ptr, "broader_idx": broader_idx,
+        "narrower_ptr": narrower_ptr, "narrower_idx": narrower_idx,
+        "related_ptr": related_ptr, "related_idx": related_idx,
+        "ancestor_ptr": closure.anc_ptr, "ancestor_idx": closure.anc_ids.astype(np.int32),
+        "tops": closure.tops.astype(np.int32),
+        "facet": facet,
+        "facet_ptr": closure.facet_ptr, "facet_idx": closure.facet_ids.astype(np.int32),
+        "depth": depths(narrower_ptr, narrower_idx, closure.tops),
+        "pre": pre, "post": post,
+        "subtree_size": np.bincount(closure.anc_ids, minlength=n).astype(np.int32),
+    }
+
+
+def write_bundle(arrays: Dict[str, np.ndarray], path: str, sources: Sequence[str] = (),
+                 npz: Optional[str] = None) -> None:
+    """Write the .npy directory next to the target, then swap it into place."""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp, name + ".npy"), array)
+    manifest = {"format": BUNDLE_FORMAT, "version": BUNDLE_VERSION, "nodes": len(arrays["concept_ids"]),
+                "sources": list(sources), "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "arrays": {name: {"dtype": str(a.dtype), "shape": list(a.shape)} for name, a in arrays.items()}}
+    with open(os.path.join(tmp, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    old = f"{path}.{os.getpid()}.old"
+    if os.path.exists(path):
+        os.replace(path, old)
+    os.replace(tmp, path)
+    shutil.rmtree(old, ignore_errors=True)
+    if npz:
+        np.savez(npz, **arrays)
+
+
+class ConceptArrays:
+    """A bundle opened for reading; every array is an attribute (memory-mapped by default)."""
+
+    def __init__(self, arrays: Dict[str, np.ndarray], manifest: Optional[dict] = None):
+        self.manifest = manifest or {}
+        self.names = list(arrays)
+        for name, array in arrays.items():
+            setattr(self, name, array)
+
+    @classmethod
+    def open(cls, path: str, mmap: bool = True) -> "ConceptArrays":
+        if path.endswith(".npz"):
+            with np.load(path) as data:
+                return cls({name: data[name] for name in data.files})
+        with open(os.path.join(path, MANIFEST), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("format") != BUNDLE_FORMAT:
+            raise ValueError(f"{path} is not a concept array bundle")
+        if manifest.get("version") != BUNDLE_VERSION:
+            raise ValueError(f"{path}: bundle version {manifest.get('version')}, expected {BUNDLE_VERSION}")
+        mode = "r" if mmap else None
+        return cls({name: np.load(os.path.join(path, name + ".npy"), mmap_mode=mode)
+                    for name in manifest["arrays"]}, manifest)
+
+    def __len__(self) -> int:
+        return len(self.concept_ids)
+
+    def lookup(self, concept: str) -> Optional[int]:
+        """Node of a ConceptID (binary search), or None."""
+        raw = concept.encode("utf-8")
+        if len(raw) > self.concept_ids.dtype.itemsize:  # the S<n> cast would truncate it into a match
+            return None
+        key = np.array(raw, dtype=self.concept_ids.dtype)
+        pos = int(np.searchsorted(self.concept_ids_sorted, key))
+        if pos < len(self) and self.concept_ids_sorted[pos] == key:
+            return int(self.id_order[pos])
+        return None
+
+    def lookup_many(self, concepts: Sequence[str]) -> np.ndarray:
+        """Nodes of many ConceptIDs at once (-1 where unknown)."""
+        raw = [c.encode("utf-8") for c in concepts]
+        fits = np.array([len(r) <= self.concept_ids.dtype.itemsize for r in raw], dtype=bool)
+        keys = np.array(raw, dtype=self.concept_ids.dtype)  # too long ones are truncated, masked out by `fits`
+        pos = np.minimum(np.searchsorted(self.concept_ids_sorted, keys), len(self) - 1)
+        return np.where(fits & (self.concept_ids_sorted[pos] == keys), self.id_order[pos], -1).astype(np.int32)
+
+    def concept_id(self, i: int) -> str:
+        return self.concept_ids[i].decode("utf-8")
+
+    def _string(self, ptr: np.ndarray, data: np.ndarray, i: int) -> str:
+        return bytes(data[ptr[i]:ptr[i + 1]]).decode("utf-8")
+
+    def label(self, i: int) -> str:
+        return self._string(self.label_ptr, self.label_data, i)
+
+    def uri(self, i: int) -> str:
+        return self._string(self.uri_ptr, self.uri_data, i)
+
+    def parents(self, i: int) -> np.ndarray:
+        return self.broader_idx[self.broader_ptr[i]:self.broader_ptr[i + 1]]
+
+    def children(self, i: int) -> np.ndarray:
+        return self.narrower_idx[self.narrower_ptr[i]:self.narrower_ptr[i + 1]]
+
+    def ancestors(self, i: int) -> np.ndarray:
+        return self.ancestor_idx[self.ancestor_ptr[i]:self.ancestor_ptr[i + 1]]
+
+    def descendants_mask(self, i: int) -> np.ndarray:
+        """bool[nodes]: i and everything below it (vectorised over the ancestor CSR)."""
+        rows = np.repeat(np.arange(len(self), dtype=np.int32), np.diff(self.ancestor_ptr))
+        mask = np.zeros(len(self), dtype=bool)
+        mask[rows[self.ancestor_idx == i]] = True
+        mask[i] = True
+        return mask
+
+
+def stats(arrays: ConceptArrays, top: int = 10) -> List[str]:
+    """Hierarchy metrics computed on the arrays only."""
+    n = len(arrays)
+    reachable = arrays.depth >= 0
+    hist = np.bincount(arrays.depth[reachable]) if reachable.any() else np.zeros(0, dtype=np.int64)
+    per_facet = np.bincount(arrays.facet_idx, minlength=n)
+    leaves = int((np.diff(arrays.narrower_ptr) == 0).sum())
+    poly = int((np.diff(arrays.broader_ptr) > 1).sum())
+    lines = [f"{n} concepts, {len(arrays.tops)} facets, {leaves} leaves, {poly} with several broader, "
+             f"{int((~reachable).sum())} outside any facet tree",
+             "depth histogram: " + ", ".join(f"{d}: {c}" for d, c in enumerate(hist.tolist())),
+             f"mean depth {arrays.depth[reachable].mean():.2f}" if reachable.any() else "mean depth -",
+             "largest facets:"]
+    for t in arrays.tops[np.argsort(-per_facet[arrays.tops], kind="stable")][:top].tolist():
+        lines.append(f"  {arrays.label(t)} ({arrays.concept_id(t)}): {per_facet[t]} concepts, "
+                     f"{arrays.subtree_size[t]} below")
+    biggest = np.argsort(-arrays.subtree_size, kind="stable")[:top]
+    lines.append("largest subtrees: " + ", ".join(f"{arrays.label(i)} {arrays.subtree_size[i]}"
+                                                  for i in biggest.tolist()))
+    return lines
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Export the concept graph as memory-mappable CSR arrays")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p_export = sub.add_parser("export", help="Write the array bundle")
+    p_export.add_argument("sources", nargs="+", help="TTL/RDF sources")
+    p_export.add_argument("--out", required=True, help="Bundle directory")
+    p_export.add_argument("--npz", help="Also write a single .npz file")
+    p_stats = sub.add_parser("stats", help="Hierarchy metrics from a bundle (directory or .npz)")
+    p_stats.add_argument("bundle")
+    p_stats.add_argument("--top", type=int, default=10)
+    args = ap.parse_args()
+
+    if args.cmd == "stats":
+        t0 = time.perf_counter()
+        arrays = ConceptArrays.open(args.bundle)
+        t1 = time.perf_counter()
+        lines = stats(arrays, args.top)
+        t2 = time.perf_counter()
+        print("\n".join(lines))
+        print(f"[OK] open {(t1 - t0) * 1000:.1f} ms, metrics {(t2 - t1) * 1000:.1f} ms")
+        return 0
+
+    t0 = time.perf_counter()
+    g = load_graph(args.sources, store="compact")
+    t1 = time.perf_counter()
+    arrays = build_arrays(g)
+    write_bundle(arrays, args.out, args.sources, args.npz)
+    size = sum(a.nbytes for a in arrays.values())
+    print(f"[OK] {len(arrays['concept_ids'])} concepts, {len(arrays['broader_idx'])} broader edges, "
+          f"{size / 1e6:.1f} MB -> {args.out}{' and ' + args.npz if args.npz else ''} "
+          f"(load {t1 - t0:.2f}s, build {time.perf_counter() - t1:.2f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Precompiled JSON taxonomy bundle for the product-exchange front end
+-------------------------------------------------------------------
+The React mockup (Mockup/code/product-exchange-demo/src/taxonomy.ts) fetches
+export12.ttl and parses Turtle in the browser on every page load. This
+exporter resolves everything once and writes a versioned JSON bundle whose
+records match the front end's types in domain.ts:
+
+  <out>/manifest.json                  entry point (fetch with no-cache)
+  <out>/facet-<anchor>.<hash>.json     Concept[] of one top-term facet
+  <out>/unassigned.<hash>.json         concepts under no facet (cycles), if any
+
+The facet files are named after the SHA-256 of their content, so they can be
+served with long-lived immutable caching; a new export only changes the names
+of the facets whose content changed. The manifest carries:
+
+- format, version (hash over all facet files), generated, sources, languages
+- schemes: ConceptScheme[]   {id, label, topConcepts}
+- collections: Collection[]  {id, label, members}
+- facets: [{id, label, anchor, file, concepts}] in label order
+- directory: {conceptId: [facet index, label]} to resolve any reference
+  (and show its label) before its facet is loaded
+
+Concept records are pre-resolved: ids are the URI local names (as parseTtl
+produces them), label follows the exporters (prefLabel@en, any prefLabel,
+rdfs:label, id), `labels` has the prefLabel per language, narrower includes
+the inverse of broader (and vice versa), and `anchor` is the Markdown anchor
+of the label (skos_md_and_ttl_update.make_anchor). Optional fields are left
+out when empty, as in parseTtl.
+
+A concept belongs to the first facet (by label) it can be reached from, as in
+taxonomy_shards.py.
+
+Install:
+  pip install rdflib
+
+Examples:
+  python taxonomy_bundle.py export12.ttl --out ../Mockup/code/product-exchange-demo/public/taxonomy
+  python taxonomy_bundle.py export12.ttl SSR.ttl --out bundle --langs en,fr --prune
+"""
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import argparse
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from rdflib import URIRef, Literal
+from rdflib.namespace import RDF, RDFS, SKOS
+
+from taxonomy_loader import load_graph, source_info
+from skos_traversal import traverse
+
+BUNDLE_FORMAT = "skos-json-bundle"
+BUNDLE_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+HASH_LENGTH = 12
+BUNDLE_FILE = re.compile(r"^(facet-.+|unassigned)\.[0-9a-f]{%d}\.json$" % HASH_LENGTH)
+
+
+def make_anchor(label: str) -> str:
+    """Same anchor rule as skos_md_and_ttl_update.make_anchor."""
+    return re.sub(r'[^a-z0-9]+', '-', label.lower()).strip('-')
+
+
+def concept_id(uri) -> str:
+    """Local name of the URI, as taxonomy.ts normalizeToken() derives ids."""
+    s = str(uri)
+    return s[max(s.rfind("#"), s.rfind("/")) + 1:] or s
+
+
+def _pick(literals: List[Tuple[str, str]], lang: str = "en") -> Optional[str]:
+    """Text in `lang`, else the first one (taxonomy.ts pickLiteralValue)."""
+    for l, text in literals:
+        if l == lang:
+            return text
+    return literals[0][1] if literals else None
+
+
+def _encode(obj) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def build_bundle(graph, langs: Optional[Sequence[str]] = None) -> Tuple[dict, Dict[str, bytes]]:
+    """Resolve the graph into (manifest, {file name: JSON bytes}); nothing is written."""
+    wanted = {l.lower() for l in langs} if langs else None
+    types = defaultdict(set)
+    pref = defaultdict(list)     # uri -> [(lang, text)]
+    rdfs_label = defaultdict(list)
+    alt = defaultdict(list)
+    definition = defaultdict(list)
+    parents = defaultdict(list)  # child -> [parent] (skos:broader and inverse skos:narrower)
+    children = defaultdict(list)
+    related = defaultdict(list)
+    in_scheme = defaultdict(list)
+    top_of = defaultdict(list)   # concept -> [scheme]
+    members = defaultdict(list)
+
+    def literal(o) -> Optional[Tuple[str, str]]:
+        if not isinstance(o, Literal):
+            return None
+        lang = (o.language or "").lower()
+        if wanted is not None and lang and lang not in wanted:
+            return None
+        return lang, str(o).strip()
+
+    literals = {SKOS.prefLabel: pref, RDFS.label: rdfs_label, SKOS.altLabel: alt, SKOS.definition: definition}
+    dispatch = {RDF.type: "type", SKOS.broader: "broader", SKOS.narrower: "narrower", SKOS.related: "related",
+                SKOS.inScheme: "scheme", SKOS.topConceptOf: "top", SKOS.hasTopConcept: "has_top",
+                SKOS.member: "member", **{pred: "literal" for pred in literals}}
+    for s, p, o in graph.triples((None, None, None)):
+        kind = dispatch.get(p)
+        if kind is None:
+            continue
+        if kind == "type":
+            types[s].add(o)
+        elif kind == "literal":
+            lit = literal(o)
+            if lit is not None:
+                literals[p][s].append(lit)
+        elif kind == "broader":
+            parents[s].append(o)
+            children[o].append(s)
+        elif kind == "narrower":
+            parents[o].append(s)
+            children[s].append(o)
+        elif kind == "related":
+            related[s].append(o)
+            related[o].append(s)
+        elif kind == "scheme":
+            in_scheme[s].append(o)
+        elif kind == "top":
+            top_of[s].append(o)
+        elif kind == "has_top":
+            top_of[o].append(s)
+        else:
+            members[s].append(o)
+
+    def label_of(uri) -> str:
+        return _pick(pref.get(uri, [])) or _pick(rdfs_label.get(uri, [])) or concept_id(uri)
+
+    def ids(uris) -> List[str]:
+        return list(dict.fromkeys(concept_id(u) for u in uris))
+
+    concepts = [s for s, t in types.items() if SKOS.Concept in t and isinstance(s, URIRef)]
+    concepts.sort(key=lambda u: (label_of(u).lower(), str(u)))
+    known = set(concepts)
+    seen_ids: Dict[str, URIRef] = {}
+    for c in concepts:
+        other = seen_ids.setdefault(concept_id(c), c)
+        if other != c:
+            print(f"⚠️ Concept id '{concept_id(c)}' used by {other} and {c}; the front end cannot tell them apart")
+
+    def record(c) -> dict:
+        rec = {"id": concept_id(c), "label": label_of(c)}
+        labels = {lang or "und": text for lang, text in reversed(pref.get(c, []))}
+        if labels:
+            rec["labels"] = dict(sorted(labels.items()))
+        if alt.get(c):
+            rec["altLabels"] = list(dict.fromkeys(t for _, t in alt[c]))
+        if definition.get(c):
+            rec["definition"] = _pick(definition[c])
+        for key, values in (("broader", parents.get(c)), ("narrower", children.get(c)),
+                            ("related", related.get(c)), ("topConceptOf", top_of.get(c)),
+                            ("inSchemes", in_scheme.get(c))):
+            if values:
+                rec[key] = ids(values)
+        rec["anchor"] = make_anchor(rec["label"])
+        return rec
+
+    # Facets: concepts without broader, each concept in the first one that reaches it
+    facets = [c for c in concepts if not parents.get(c)]
+    ordered_children = lambda c: sorted((k for k in children.get(c, ()) if k in known),
+                                        key=lambda u: (label_of(u).lower(), str(u)))
+    visited = set()
+    files: Dict[str, bytes] = {}
+    facet_entries = []
+    directory: Dict[str, list] = {}
+    for n, facet in enumerate(facets):
+        members_of = []
+        traverse([facet], ordered_children, pre=lambda node, depth, parent: members_of.append(node),
+                 visited=visited)
+        payload = _encode({"facet": concept_id(facet), "concepts": [record(c) for c in members_of]})
+        anchor = make_anchor(label_of(facet)) or f"f{n:04d}"
+        file = f"facet-{anchor}.{hashlib.sha256(payload).hexdigest()[:HASH_LENGTH]}.json"
+        files[file] = payload
+        facet_entries.append({"id": concept_id(facet), "label": label_of(facet), "anchor": anchor,
+                              "file": file, "concepts": len(members_of)})
+        for c in members_of:
+            directory[concept_id(c)] = [n, label_of(c)]
+    rest = [c for c in concepts if c not in visited]
+    if rest:
+        payload = _encode({"facet": None, "concepts": [record(c) for c in rest]})
+        file = f"unassigned.{hashlib.sha256(payload).hexdigest()[:HASH_LENGTH]}.json"
+        files[file] = payload
+        facet_entries.append({"id": None, "label": "Unassigned", "anchor": "unassigned",
+                              "file": file, "concepts": len(rest)})
+        for c in rest:
+            directory[concept_id(c)] = [len(facet_entries) - 1, label_of(c)]
+
+    schemes = []
+    for s in sorted((s for s, t in types.items() if SKOS.ConceptScheme in t), key=str):
+        tops = [c for c in concepts if s in top_of.get(c, ())]
+        schemes.append({"id": concept_id(s), "label": label_of(s), "topConcepts": ids(tops)})
+    collections = []
+    for s in sorted((s for s, t in types.items() if SKOS.Collection in t), key=str):
+        collections.append({"id": concept_id(s), "label": label_of(s), "members": ids(members.get(s, []))})
+
+    version = hashlib.sha256("\n".join(sorted(files)).encode("utf-8")).hexdigest()[:HASH_LENGTH]
+    manifest = {
+        "format": BUNDLE_FORMAT,
+        "formatVersion": BUNDLE_VERSION,
+        "version": version,
+        "languages": sorted({lang for pairs in pref.values() for lang, _ in pairs if lang}),
+        "concepts": len(concepts),
+        "schemes": schemes,
+        "collections": collections,
+        "facets": facet_entries,
+        "directory": directory,
+    }
+    return manifest, files
+
+
+def write_bundle(out_dir: str, manifest: dict, files: Dict[str, bytes], prune: bool = False) -> List[str]:
+    """Write facet files (existing ones are content-identical and skipped), then the manifest; returns files written."""
+    os.makedirs(out_dir, exist_ok=True)
+    written = []
+    for name, payload in files.items():
+        path = os.path.join(out_dir, name)
+        if not os.path.exists(path):
+            with open(path, "wb") as f:
+                f.write(payload)
+            written.append(name)
+    # Manifest last and atomically: clients never see it before the files it names
+    tmp = os.path.join(out_dir, f"{MANIFEST_FILE}.{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, os.path.join(out_dir, MANIFEST_FILE))
+    if prune:
+        for name in os.listdir(out_dir):
+            if BUNDLE_FILE.match(name) and name not in files:
+                os.remove(os.path.join(out_dir, name))
+    return written
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Export the taxonomy as a per-facet JSON bundle for the front end")
+    ap.add_argument("sources", nargs="+", help="Vocabulary file(s); several are merged")
+    ap.add_argument("--out", default="taxonomy_bundle", help="Output directory (default taxonomy_bundle)")
+    ap.add_argument("--langs", help="Keep only labels/definitions in these languages (comma-separated)")
+    ap.add_argument("--prune", action="store_true",
+                    help="Delete facet files of earlier exports (keep them while old manifests may be cached)")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    g = load_graph(args.sources, store="compact")
+    langs = [l.strip() for l in args.langs.split(",") if l.strip()] if args.langs else None
+    manifest, files = build_bundle(g, langs)
+    manifest["generated"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    manifest["sources"] = [{k: v for k, v in source_info(p).items() if k in ("path", "size")}
+                           for p in args.sources]
+    written = write_bundle(args.out, manifest, files, args.prune)
+    total = sum(len(b) for b in files.values())
+    print(f"[OK] {manifest['concepts']} concepts in {len(files)} facet files ({total / 1024:.0f} KiB, "
+          f"{len(written)} new) -> {args.out}/{MANIFEST_FILE} version {manifest['version']} "
+          f"({time.perf_counter() - t0:.2f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
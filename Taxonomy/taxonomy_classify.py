@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Product text -> taxonomy concept classifier
+-------------------------------------------
+Ranks taxonomy concepts for supplier products that come without concept
+tags (domain.ts Product: name, type, features with name/description,
+additionalInfo).
+
+Model
+- the BM25 inverted index of taxonomy_search.py (prefLabel, altLabel and
+  definition in every language, accent-folded). Its posting lists are used
+  as a sparse terms x concepts matrix, so a batch of products is scored
+  with one sparse product: (products x terms) @ (terms x concepts)
+- each term keeps its POSTINGS highest-impact concepts, which bounds the
+  work per product on vocabularies where common words match everything
+- product fields are weighted: name 2, type 1.5, feature names 1.5,
+  feature descriptions 1, additionalInfo values 0.5
+- facet prior: the scores are summed per facet (top concept, from
+  taxonomy_closure.py); a concept's score is multiplied by
+  1 + FACET_BOOST * (its facet's share of the best facet's total), so
+  "vegetarian" ranks the Meal concepts above a stray Transport match
+- the top-k concepts per product are kept
+
+Products are read as JSONL (Product or ProductInstance records, one per
+line) and written back with "suggestedConcepts" added; chunks of lines are
+classified on a process pool and written in input order.
+
+eval measures throughput and recall@k on a labelled sample: JSONL products
+whose tags (product and feature tags) hold the expected concepts. sample
+writes such a sample from the taxonomy itself (a label of a concept, in any
+language, as product name, part of its definition as feature description).
+
+Install:
+  pip install rdflib numpy scipy
+
+Examples:
+  python taxonomy_classify.py classify export12.ttl --input products.jsonl --out tagged.jsonl --top 5
+  python taxonomy_classify.py classify export12.ttl --index export12.search --input products.jsonl --workers 8
+  python taxonomy_classify.py sample export12.ttl --count 1000 --out sample.jsonl
+  python taxonomy_classify.py eval export12.ttl --sample sample.jsonl --top 5
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, List, Optional, Sequence, TextIO, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+
+from taxonomy_loader import load_graph
+from taxonomy_closure import AncestorClosure, concept_id
+from taxonomy_search import SearchIndex, open_index, tokenize
+from taxonomy_match import Vocabulary
+
+TOP = 5
+FACET_BOOST = 0.5
+POSTINGS = 1000              # best postings kept per term (common words only add noise)
+CHUNK = 512                  # products per batch (and per worker task)
+OUTPUT_KEY = "suggestedConcepts"
+FIELD_WEIGHTS = {"name": 2.0, "type": 1.5, "feature": 1.5, "description": 1.0, "info": 0.5}
+
+Suggestion = Tuple[str, str, float]  # (uri, label, score)
+
+
+def product_fields(record: dict) -> Iterator[Tuple[str, str]]:
+    """(field, text) of a Product, or of the product of a ProductInstance."""
+    product = record.get("product") if isinstance(record.get("product"), dict) else record
+    for field in ("name", "type"):
+        if isinstance(product.get(field), str):
+            yield field, product[field]
+    for feature in product.get("features") or ():
+        if isinstance(feature, dict):
+            if isinstance(feature.get("name"), str):
+                yield "feature", feature["name"]
+            if isinstance(feature.get("description"), str):
+                yield "description", feature["description"]
+    info = product.get("additionalInfo")
+    if isinstance(info, dict):
+        for value in info.values():
+            if isinstance(value, str):
+                yield "info", value
+
+
+def product_tags(record: dict) -> List[str]:
+    """Product and feature tags of a record (the expected concepts of a labelled sample)."""
+    product = record.get("product") if isinstance(record.get("product"), dict) else record
+    tags = list(product.get("tags") or ())
+    for feature in product.get("features") or ():
+        if isinstance(feature, dict):
+            tags.extend(feature.get("tags") or ())
+    return [t for t in tags if isinstance(t, str)]
+
+
+class Classifier:
+    """Batch BM25 + facet prior scoring of product texts against every concept."""
+
+    def __init__(self, index: SearchIndex, closure: AncestorClosure, facet_boost: float = FACET_BOOST,
+                 postings: int = POSTINGS):
+        self.uris = index.uris
+        self.labels = index.labels
+        self.ids = [concept_id(u) for u in index.uris]
+        self.facet_boost = facet_boost
+        self._term_ids = {t: i for i, t in enumerate(index.terms)}
+        # each posting list is sorted by impact: keep its best `postings` entries
+        lengths = np.minimum(np.diff(index.offsets), postings)
+        indptr = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        take = np.arange(indptr[-1]) - np.repeat(indptr[:-1] - index.offsets[:-1], lengths)
+        self.weights = sp.csr_matrix((index.post_scores[take], index.post_docs[take], indptr),
+                                     shape=(len(index.terms), len(index.uris)))
+        # first facet of every indexed concept (-1: not in the hierarchy)
+        column = {int(t): c for c, t in enumerate(closure.tops)}
+        facet = np.full(len(index.uris), -1, dtype=np.int32)
+        for doc, uri in enumerate(index.uris):
+            idx = closure.lookup(uri)
+            if idx is not None and closure.facet_ptr[idx] < closure.facet_ptr[idx + 1]:
+                facet[doc] = column[int(closure.facet_ids[closure.facet_ptr[idx]])]
+        self.facet = facet
+        placed = np.flatnonzero(facet >= 0)
+        self._facets = sp.csr_matrix((np.ones(len(placed)), (placed, facet[placed])),
+                                     shape=(len(index.uris), max(1, len(column))))
+
+    def _queries(self, records: Sequence[dict]) -> sp.csr_matrix:
+        rows, cols, vals = [], [], []
+        for row, record in enumerate(records):
+            for field, text in product_fields(record):
+                weight = FIELD_WEIGHTS[field]
+                for term in tokenize(text):
+                    col = self._term_ids.get(term)
+                    if col is not None:
+                        rows.append(row)
+                        cols.append(col)
+                        vals.append(weight)
+        # duplicates are summed: a repeated word counts more
+        return sp.csr_matrix((vals, (rows, cols)), shape=(len(records), len(self._term_ids)))
+
+    def rank(self, records: Sequence[dict], top: int = TOP) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(indptr, concepts, scores): the top concepts of every record, best first (CSR)."""
+        scores = self._queries(records) @ self.weights
+        scores.sort_indices()
+        counts = np.diff(scores.indptr)
+        rows = np.repeat(np.arange(len(records)), counts)
+        cols, vals = scores.indices, scores.data
+        if self.facet_boost and len(vals):
+            per_facet = (scores @ self._facets).toarray()
+            best = per_facet.max(axis=1, keepdims=True)
+            share = np.divide(per_facet, best, out=np.zeros_like(per_facet), where=best > 0)
+            facet = self.facet[cols]
+            vals = vals * (1 + self.facet_boost * np.where(facet >= 0, share[rows, np.maximum(facet, 0)], 0))
+        if not len(vals):
+            return np.zeros(len(records) + 1, dtype=np.int64), cols, vals
+        # rows are contiguous already: one stable sort on row + (1 - score / row max) in [row, row + 1)
+        row_max = np.maximum.reduceat(vals, scores.indptr[:-1][counts > 0])
+        key = rows + (1 - vals / np.repeat(row_max, counts[counts > 0]) * 0.5)
+        order = np.argsort(key, kind="stable")
+        keep = order[np.arange(len(order)) - np.repeat(scores.indptr[:-1], counts) < top]
+        indptr = np.zeros(len(records) + 1, dtype=np.int64)
+        np.cumsum(np.minimum(counts, top), out=indptr[1:])
+        return indptr, cols[keep], vals[keep]
+
+    def classify(self, records: Sequence[dict], top: int = TOP) -> List[List[Suggestion]]:
+        indptr, concepts, scores = self.rank(records, top)
+        return [[(self.uris[c], self.labels[c], round(s, 4))
+                 for c, s in zip(concepts[lo:hi].tolist(), scores[lo:hi].tolist())]
+                for lo, hi in zip(indptr[:-1].tolist(), indptr[1:].tolist())]
+
+    def tag_lines(self, lines: Sequence[str], top: int = TOP) -> str:
+        """JSONL lines -> the same records with OUTPUT_KEY added (one string)."""
+        texts = [t for t in (line.strip() for line in lines) if t]
+        records = [json.loads(t) for t in texts]
+        out = []
+        for text, record, found in zip(texts, records, self.classify(records, top)):
+            if not isinstance(record, dict):
+                raise ValueError("JSONL records must be objects")
+            value = json.dumps([{"id": concept_id(u), "uri": u, "label": l, "score": s} for u, l, s in found],
+                               ensure_ascii=False)
+            # splice into the original text instead of re-serialising the record
+            sep = ", " if record else ""
+            out.append(f'{text[:-1]}{sep}"{OUTPUT_KEY}": {value}}}\n')
+        return "".join(out)
+
+
+# ---------------- streaming on a process pool ----------------
+
+_worker: Optional[Classifier] = None
+
+
+def _init_worker(classifier: Classifier) -> None:
+    global _worker
+    _worker = classifier
+
+
+def _tag_task(task: Tuple[List[str], int]) -> str:
+    lines, top = task
+    return _worker.tag_lines(lines, top)
+
+
+def _chunks(lines: Iterable[str], size: int) -> Iterator[List[str]]:
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def stream_jsonl(classifier: Classifier, lines: Iterable[str], out: TextIO, top: int = TOP,
+                 workers: Optional[int] = None, chunk: int = CHUNK) -> None:
+    """Tag a JSONL stream; chunks are classified in parallel and written in input order."""
+    workers = workers or os.cpu_count() or 1
+    tasks = ((c, top) for c in _chunks(lines, chunk))
+    if workers == 1:
+        for task in tasks:
+            out.write(classifier.tag_lines(*task))
+        return
+    # Bounded window of in-flight chunks, as in taxonomy_loader.parse_ntriples_parallel
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(classifier,)) as pool:
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.submit(_tag_task, task))
+            if len(pending) >= 2 * workers:
+                out.write(pending.popleft().result())
+        while pending:
+            out.write(pending.popleft().result())
+
+
+# ---------------- evaluation ----------------
+
+def evaluate(classifier: Classifier, closure: AncestorClosure, records: Sequence[dict], top: int = TOP,
+             chunk: int = CHUNK) -> dict:
+    """Throughput and recall@1/@top against the records' tags (tags outside the taxonomy are ignored)."""
+    gold = [{closure.ids[i] for i in map(closure.lookup, product_tags(r)) if i is not None} for r in records]
+    hits_1 = hits_k = expected = labelled = 0
+    t0 = time.perf_counter()
+    for start in range(0, len(records), chunk):
+        indptr, concepts, _ = classifier.rank(records[start:start + chunk], top)
+        for row, wanted in enumerate(gold[start:start + chunk]):
+            if not wanted:
+                continue
+            found = [classifier.ids[c] for c in concepts[indptr[row]:indptr[row + 1]].tolist()]
+            labelled += 1
+            expected += len(wanted)
+            hits_k += len(wanted.intersection(found))
+            hits_1 += bool(found) and found[0] in wanted
+    elapsed = time.perf_counter() - t0
+    return {"products": len(records), "labelled": labelled, "seconds": round(elapsed, 3),
+            "products_per_s": round(len(records) / elapsed) if elapsed else None,
+            "precision_at_1": round(hits_1 / labelled, 4) if labelled else None,
+            f"recall_at_{top}": round(hits_k / expected, 4) if expected else None}
+
+
+def make_sample(vocab: Vocabulary, count: int, seed: int = 0) -> List[dict]:
+    """Labelled Product records: a label of a concept (any language) as name, part of its definition as feature."""
+    rnd = random.Random(seed)
+    usable = [k for k, ls in enumerate(vocab.labels) if ls]
+    out = []
+    picks = rnd.sample(usable, count) if 0 < count < len(usable) else usable
+    for n, k in enumerate(picks):
+        words = vocab.definitions[k].split()
+        rnd.shuffle(words)
+        features = [{"id": f"F{n}", "name": "Description", "description": " ".join(words[:max(1, len(words) // 2)]),
+                     "values": [], "tags": []}] if words else []
+        out.append({"id": f"P{n}", "name": rnd.choice(vocab.labels[k]), "lifecycleStatus": "Draft",
+                    "features": features, "tags": [concept_id(vocab.uris[k])]})
+    return out
+
+
+def _open_lines(path: str) -> TextIO:
+    return sys.stdin if path == "-" else open(path, "r", encoding="utf-8")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Rank taxonomy concepts for product texts")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p_classify = sub.add_parser("classify", help="Tag a JSONL stream of products")
+    p_classify.add_argument("--input", default="-", help="JSONL products (default: stdin)")
+    p_classify.add_argument("--out", default="-", help="Output JSONL (default: stdout)")
+    p_classify.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    p_classify.add_argument("--chunk", type=int, default=CHUNK, help="Products per task")
+    p_eval = sub.add_parser("eval", help="Throughput and recall@k on a labelled sample")
+    p_eval.add_argument("--sample", required=True, help="JSONL products whose tags are the expected concepts")
+    p_sample = sub.add_parser("sample", help="Write a labelled sample built from the taxonomy")
+    p_sample.add_argument("--count", type=int, default=1000, help="Products (0: one per concept)")
+    p_sample.add_argument("--out", required=True)
+    p_sample.add_argument("--seed", type=int, default=0)
+    for p in (p_classify, p_eval, p_sample):
+        p.add_argument("sources", nargs="+", help="TTL/RDF sources")
+    for p in (p_classify, p_eval):
+        p.add_argument("--index", help="Search index file (built from the sources when missing or stale)")
+        p.add_argument("--top", type=int, default=TOP, help="Concepts per product")
+        p.add_argument("--facet-boost", type=float, default=FACET_BOOST, help="Facet prior weight (0: off)")
+    args = ap.parse_args()
+
+    g = load_graph(args.sources, store="compact")
+    if args.cmd == "sample":
+        records = make_sample(Vocabulary.from_graph(g), args.count, args.seed)
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(r, ensure_ascii=False) + "\n" for r in records)
+        print(f"[OK] {len(records)} labelled products -> {args.out}")
+        return 0
+
+    t0 = time.perf_counter()
+    index = open_index(args.sources, args.index, graph=g) if args.index else SearchIndex.from_graph(g)
+    closure = AncestorClosure(g)
+    classifier = Classifier(index, closure, args.facet_boost)
+    print(f"[OK] model: {len(index)} concepts, {len(index.terms)} terms ({time.perf_counter() - t0:.2f}s)",
+          file=sys.stderr)
+
+    if args.cmd == "eval":
+        with open(args.sample, "r", encoding="utf-8") as f:
+            records = [json.loads(line) for line in f if line.strip()]
+        print(json.dumps(evaluate(classifier, closure, records, args.top), indent=2))
+        return 0
+
+    src = _open_lines(args.input)
+    out = sys.stdout if args.out == "-" else open(args.out, "w", encoding="utf-8")
+    try:
+        stream_jsonl(classifier, src, out, args.top, args.workers, args.chunk)
+    finally:
+        if src is not sys.stdin:
+            src.close()
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Vectorised ancestor expansion for bulk product tagging
+------------------------------------------------------
+Products are tagged with leaf ConceptIDs; a rule such as the mockup's
+TaxonomyCondition { kind: "HasConcept" } needs to know whether a tag sits
+under a given concept. Instead of a get_ancestors() walk per product, the
+hierarchy's closure is precomputed once and whole batches of products are
+expanded with NumPy.
+
+Representation
+- the closure is a sparse boolean matrix in CSR form: row i lists the
+  ancestors of concept i (int32 ids, sorted). A dense bitset is n*n/8 bytes
+  (1.25 GB at 100k concepts), and Euler-tour intervals cannot express the
+  polyhierarchy (several broader per concept); CSR is n * mean depth.
+  It is computed in one topological pass (skos_infer.transitive_closure);
+  concepts on a broader cycle get their cycle-safe walk (skos_traversal)
+- the facets of a concept are its top-term ancestors (or itself if top)
+- a batch of products is CSR too: product p has tags[indptr[p]:indptr[p+1]]
+
+Batch API (all vectorised, no per-product Python)
+- encode(tag_lists)            ConceptID lists -> (indptr, tags)
+- expand(indptr, tags)         -> (indptr, ids): tags + all ancestors, per product
+- facets(indptr, tags)         -> (indptr, ids): facets per product
+- has_concept(indptr, tags, c) -> bool[products]: any tag at or under c
+
+Install:
+  pip install rdflib numpy
+
+Examples:
+  python taxonomy_closure.py expand export12.ttl --products products.json --out expanded.json
+  python taxonomy_closure.py bench export12.ttl --products 1000000 --tags 5
+"""
+import sys
+import json
+import time
+import argparse
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from rdflib import URIRef
+from rdflib.namespace import RDF, SKOS
+
+from taxonomy_loader import load_graph
+from skos_infer import transitive_closure
+from skos_traversal import ancestors
+
+Batch = Tuple[np.ndarray, np.ndarray]  # (indptr int64[P+1], ids int32[...])
+
+
+def concept_id(uri) -> str:
+    """Local name of the URI (the ConceptID for apmwg concepts)."""
+    s = str(uri)
+    return s[max(s.rfind("#"), s.rfind("/")) + 1:] or s
+
+
+def _csr(rows: Sequence[Iterable[int]]) -> Batch:
+    lists = [sorted(set(r)) for r in rows]
+    indptr = np.zeros(len(lists) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(r) for r in lists])
+    ids = np.fromiter((i for r in lists for i in r), dtype=np.int32, count=int(indptr[-1]))
+    return indptr, ids
+
+
+def _gather(indptr: np.ndarray, tags: np.ndarray, row_ptr: np.ndarray, row_ids: np.ndarray) -> Batch:
+    """Concatenate rows row_ids[row_ptr[t]:row_ptr[t+1]] of every tag, deduplicated per product."""
+    products = len(indptr) - 1
+    tag_product = np.repeat(np.arange(products, dtype=np.int64), np.diff(indptr))
+    counts = row_ptr[tags + 1] - row_ptr[tags]
+    total = int(counts.sum())
+    # index of every gathered element: row start + position within the row
+    ends = np.cumsum(counts)
+    within = np.arange(total, dtype=np.int64) - np.repeat(ends - counts, counts)
+    gathered = row_ids[np.repeat(row_ptr[tags], counts) + within]
+    product_of = np.repeat(tag_product, counts)
+    n = np.int64(max(int(row_ids.max()) + 1 if len(row_ids) else 1, 1))
+    keys = product_of * n + gathered
+    keys.sort()  # sort + adjacent compare: several times faster than np.unique here
+    if len(keys):
+        keep = np.empty(len(keys), dtype=bool)
+        keep[0] = True
+        np.not_equal(keys[1:], keys[:-1], out=keep[1:])
+        keys = keys[keep]
+    out_indptr = np.zeros(products + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys // n, minlength=products), out=out_indptr[1:])
+    return out_indptr, (keys % n).astype(np.int32)
+
+
+class AncestorClosure:
+    """Ancestor/facet closure of the skos:broader hierarchy, with batch expansion."""
+
+    def __init__(self, graph):
+        parents = defaultdict(set)
+        for child, parent in graph.subject_objects(SKOS.broader):
+            parents[child].add(parent)
+        for parent, child in graph.subject_objects(SKOS.narrower):
+            parents[child].add(parent)
+        concepts = dict.fromkeys(s for s in graph.subjects(RDF.type, SKOS.Concept) if isinstance(s, URIRef))
+        for child, ps in parents.items():
+            concepts.setdefault(child)
+            for p in ps:
+                concepts.setdefault(p)
+        self.uris: List = sorted(concepts, key=str)
+        self.ids: List[str] = [concept_id(u) for u in self.uris]
+        self.index: Dict[str, int] = {}
+        for i, (uri, cid) in enumerate(zip(self.uris, self.ids)):
+            self.index[cid] = i
+            self.index[str(uri)] = i
+
+        closure = transitive_closure(parents)
+        rows = []
+        for uri in self.uris:
+            found = closure.get(uri)
+            if found is None:  # on or below a cycle
+                found = ancestors(uri, lambda n: parents.get(n, ()))
+            rows.append([self.index[str(a)] for a in found if str(a) in self.index])
+        self.anc_ptr, self.anc_ids = _csr(rows)
+        # ancestors-or-self, the row used by expand()
+        self.up_ptr, self.up_ids = _csr([r + [i] for i, r in enumerate(rows)])
+        is_top = np.array([not parents.get(u) for u in self.uris], dtype=bool)
+        self.tops = np.flatnonzero(is_top).astype(np.int32)
+        self.facet_ptr, self.facet_ids = _csr([[a for a in r + [i] if is_top[a]] for i, r in enumerate(rows)])
+        # descendants-or-self (transpose of up) for has_concept masks
+        self.down_ptr, self.down_ids = self._transpose(self.up_ptr, self.up_ids, len(self.uris))
+
+    @staticmethod
+    def _transpose(ptr: np.ndarray, ids: np.ndarray, n: int) -> Batch:
+        rows = np.repeat(np.arange(n, dtype=np.int32), np.diff(ptr))
+        order = np.argsort(ids, kind="stable")
+        t_ptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(ids, minlength=n), out=t_ptr[1:])
+        return t_ptr, rows[order]
+
+    def __len__(self) -> int:
+        return len(self.uris)
+
+    def lookup(self, key: str) -> Optional[int]:
+        """Concept index by ConceptID or URI."""
+        return self.index.get(key)
+
+    # ---------------- batch API ----------------
+
+    def encode(self, tag_lists: Iterable[Iterable[str]]) -> Tuple[np.ndarray, np.ndarray, int]:
+        """ConceptID/URI lists -> (indptr, tags, unknown tag count); unknown tags are dropped."""
+        indptr = [0]
+        tags: List[int] = []
+        unknown = 0
+        index = self.index
+        for tag_list in tag_lists:
+            for tag in tag_list:
+                i = index.get(tag)
+                if i is None:
+                    unknown += 1
+                else:
+                    tags.append(i)
+            indptr.append(len(tags))
+        return np.asarray(indptr, dtype=np.int64), np.asarray(tags, dtype=np.int32), unknown
+
+    def expand(self, indptr: np.ndarray, tags: np.ndarray) -> Batch:
+        """Per product: its tags and all their ancestors (sorted, each once)."""
+        return _gather(indptr, tags, self.up_ptr, self.up_ids)
+
+    def facets(self, indptr: np.ndarray, tags: np.ndarray) -> Batch:
+        """Per product: the top-term facets its tags belong to."""
+        return _gather(indptr, tags, self.facet_ptr, self.facet_ids)
+
+    def descendants_mask(self, concept: int) -> np.ndarray:
+        """bool[n]: the concept and everything under it."""
+        mask = np.zeros(len(self.uris), dtype=bool)
+        mask[self.down_ids[self.down_ptr[concept]:self.down_ptr[concept + 1]]] = True
+        return mask
+
+    def has_concept(self, indptr: np.ndarray, tags: np.ndarray, concept: int) -> np.ndarray:
+        """bool[products]: TaxonomyCondition HasConcept, i.e. some tag is the concept or under it."""
+        hits = self.descendants_mask(concept)[tags]
+        products = len(indptr) - 1
+        tag_product = np.repeat(np.arange(products, dtype=np.int64), np.diff(indptr))
+        return np.bincount(tag_product[hits], minlength=products) > 0
+
+    def decode(self, indptr: np.ndarray, ids: np.ndarray) -> List[List[str]]:
+        names = self.ids
+        flat = [names[i] for i in ids.tolist()]
+        bounds = indptr.tolist()
+        return [flat[bounds[p]:bounds[p + 1]] for p in range(len(bounds) - 1)]
+
+
+def _product_tags(item: dict) -> Tuple[str, List[str]]:
+    """(id, tags) of a domain.ts Product or ProductInstance."""
+    product = item.get("product", item)
+    return str(item.get("id", product.get("id", ""))), list(product.get("tags", []))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Expand product tags to ancestors/facets in bulk")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p_expand = sub.add_parser("expand", help="Expand the tags of a JSON list of Product/ProductInstance")
+    p_expand.add_argument("sources", nargs="+")
+    p_expand.add_argument("--products", required=True, help="JSON file: list of products or product instances")
+    p_expand.add_argument("--out", help="Write {product id: {concepts, facets}} here (default: stdout)")
+    p_bench = sub.add_parser("bench", help="Throughput on random products tagged with leaf concepts")
+    p_bench.add_argument("sources", nargs="+")
+    p_bench.add_argument("--products", type=int, default=1_000_000)
+    p_bench.add_argument("--tags", type=int, default=5, help="Tags per product")
+    p_bench.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    closure = AncestorClosure(load_graph(args.sources, store="compact"))
+    built = time.perf_counter() - t0
+    print(f"[closure] {len(closure)} concepts, {len(closure.anc_ids)} ancestor links, "
+          f"{len(closure.tops)} facets ({built:.2f}s)", file=sys.stderr)
+
+    if args.cmd == "expand":
+        with open(args.products, "r", encoding="utf-8") as f:
+            items = json.load(f)
+        pairs = [_product_tags(item) for item in items]
+        indptr, tags, unknown = closure.encode(tags for _, tags in pairs)
+        concepts = closure.decode(*closure.expand(indptr, tags))
+        facets = closure.decode(*closure.facets(indptr, tags))
+        result = {pid: {"concepts": c, "facets": f} for (pid, _), c, f in zip(pairs, concepts, facets)}
+        text = json.dumps(result, ensure_ascii=False, indent=2)
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as f:
+                f.write(text)
+            print(f"[OK] {len(pairs)} products expanded ({unknown} unknown tags dropped): {args.out}")
+        else:
+            print(text)
+        return 0
+
+    rnd = np.random.default_rng(args.seed)
+    has_children = np.diff(closure.down_ptr) > 1
+    leaves = np.flatnonzero(~has_children).astype(np.int32)
+    indptr = np.arange(0, (args.products + 1) * args.tags, args.tags, dtype=np.int64)
+    tags = leaves[rnd.integers(0, len(leaves), size=args.products * args.tags)]
+    print(f"{args.products} products x {args.tags} leaf tags, {len(closure)} concepts")
+    probe = int(closure.tops[0]) if len(closure.tops) else 0
+    for name, run in (("expand ancestors", lambda: closure.expand(indptr, tags)),
+                      ("expand facets", lambda: closure.facets(indptr, tags)),
+                      ("has_concept", lambda: closure.has_concept(indptr, tags, probe))):
+        t1 = time.perf_counter()
+        out = run()
+        elapsed = time.perf_counter() - t1
+        size = len(out[1]) if isinstance(out, tuple) else int(out.sum())
+        print(f"  {name:18s} {elapsed:7.3f}s  {args.products / elapsed:>12,.0f} products/s  ({size:,} results)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
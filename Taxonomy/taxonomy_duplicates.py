@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Near-duplicate concept detection
+--------------------------------
+Finds concepts whose definitions and labels are nearly the same, typically
+the same idea entered under two facets, or the generic, repeated wording
+the ChatGPT definition fallback of skos_md_and_ttl_update.py produces.
+
+How it works (NumPy/SciPy, no O(N^2) comparison)
+- every concept becomes a set of shingles: definition word pairs plus label
+  words (all languages, accent-folded as in taxonomy_search.py), each
+  hashed with CRC-32
+- MinHash signatures (PERMS universal hashes, min per concept) are computed
+  for all concepts at once, in chunks of shingles
+- LSH banding: the signature is cut into BANDS bands; concepts with an
+  identical band land in one bucket, and every bucket member is paired with
+  the bucket's first member. With 64 hashes in 16 bands a pair at Jaccard
+  0.7 shares a band with probability > 0.99, one at 0.3 with < 0.13
+- the candidate pairs are kept when the signature agreement (the Jaccard
+  estimate) reaches --threshold; clusters are the connected components of
+  the kept pairs (scipy.sparse.csgraph)
+
+Every cluster is reported with the facets (top concepts, via
+taxonomy_closure.py) of its members; clusters spanning several facets are
+flagged. --since OLD restricts the report to clusters with a concept added,
+relabelled or redefined since OLD (skos_diff.py).
+
+Install:
+  pip install rdflib numpy scipy
+
+Examples:
+  python taxonomy_duplicates.py export12.ttl
+  python taxonomy_duplicates.py export12.ttl --since export10.ttl --cross-facet --json duplicates.json
+  python taxonomy_duplicates.py big.ttl --threshold 0.8 --text definitions
+  python taxonomy_duplicates.py big.ttl --bench 1000
+"""
+import sys
+import json
+import time
+import random
+import argparse
+from collections import defaultdict
+from itertools import chain
+from zlib import crc32
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components
+
+from taxonomy_loader import load_graph
+from taxonomy_closure import AncestorClosure, concept_id
+from taxonomy_match import Vocabulary
+from taxonomy_search import tokenize
+from skos_diff import diff_graphs
+
+PERMS = 64
+BANDS = 16
+THRESHOLD = 0.7
+TEXTS = ("both", "definitions", "labels")
+_PRIME = np.uint64((1 << 31) - 1)
+_EMPTY = np.uint64(1 << 32)        # signature of a concept without shingles (never equal to a hash)
+_CHUNK = 1 << 20                   # shingles hashed per block (x PERMS uint64)
+
+
+def _shingles(labels: Sequence[str], definition: str, text: str) -> Set[str]:
+    out: Set[str] = set()
+    if text != "labels":
+        words = tokenize(definition)
+        out.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+        if len(words) == 1:
+            out.add(words[0])
+    if text != "definitions":
+        out.update("@" + w for label in labels for w in tokenize(label))
+    return out
+
+
+def shingle_hashes(vocab: Vocabulary, text: str = "both") -> Tuple[np.ndarray, np.ndarray]:
+    """(indptr, hashes): the CRC-32 of every concept's shingles, as CSR."""
+    sets = [_shingles(ls, d, text) for ls, d in zip(vocab.labels, vocab.definitions)]
+    indptr = np.zeros(len(sets) + 1, dtype=np.int64)
+    np.cumsum([len(s) for s in sets], out=indptr[1:])
+    hashes = np.fromiter(map(crc32, map(str.encode, chain.from_iterable(sets))), dtype=np.uint64,
+                         count=int(indptr[-1]))
+    return indptr, hashes
+
+
+def minhash(indptr: np.ndarray, hashes: np.ndarray, perms: int = PERMS, seed: int = 0) -> np.ndarray:
+    """MinHash signatures (rows x perms, uint64) with h(x) = (a x + b) mod (2^31 - 1)."""
+    rnd = np.random.default_rng(seed)
+    a = rnd.integers(1, int(_PRIME), size=perms, dtype=np.uint64)
+    b = rnd.integers(0, int(_PRIME), size=perms, dtype=np.uint64)
+    rows = len(indptr) - 1
+    sig = np.full((rows, perms), _EMPTY, dtype=np.uint64)
+    nonempty = np.flatnonzero(np.diff(indptr) > 0)
+    block = max(1, _CHUNK // perms)
+    start = 0
+    while start < len(nonempty):
+        # rows whose shingles fit in one block (at least one row)
+        limit = indptr[nonempty[start]] + block
+        stop = max(start + 1, int(np.searchsorted(indptr[nonempty + 1], limit, side="right")))
+        stop = min(stop, len(nonempty))
+        chunk = nonempty[start:stop]
+        lo, hi = indptr[chunk[0]], indptr[chunk[-1] + 1]
+        h = (hashes[lo:hi, None] * a + b) % _PRIME
+        sig[chunk] = np.minimum.reduceat(h, indptr[chunk] - lo, axis=0)
+        start = stop
+    return sig
+
+
+def lsh_pairs(sig: np.ndarray, bands: int = BANDS) -> Tuple[np.ndarray, np.ndarray]:
+    """Candidate pairs (i < j): concepts sharing a bucket in at least one band."""
+    rows, perms = sig.shape
+    width = perms // bands
+    live = np.flatnonzero(sig[:, 0] != _EMPTY)
+    found = []
+    for band in range(bands):
+        key = np.zeros(len(live), dtype=np.uint64)
+        for c in range(band * width, (band + 1) * width):
+            key = key * np.uint64(1_000_003) + sig[live, c]  # wraps modulo 2^64
+        order = np.argsort(key, kind="stable")
+        ordered = key[order]
+        first = np.concatenate([[True], ordered[1:] != ordered[:-1]])
+        head = np.maximum.accumulate(np.where(first, np.arange(len(order)), 0))
+        member = ~first
+        found.append(np.stack([live[order[head[member]]], live[order[member]]]))
+    if not found:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    pairs = np.concatenate(found, axis=1).astype(np.int64)
+    keys = np.minimum(pairs[0], pairs[1]) * rows + np.maximum(pairs[0], pairs[1])
+    keys.sort()  # sort + adjacent compare, as in taxonomy_closure._gather
+    if len(keys):
+        keys = keys[np.concatenate([[True], keys[1:] != keys[:-1]])]
+    return keys // rows, keys % rows
+
+
+def similarity(sig: np.ndarray, i: np.ndarray, j: np.ndarray) -> np.ndarray:
+    """Jaccard estimates: share of equal signature values."""
+    out = np.empty(len(i), dtype=np.float32)
+    step = max(1, _CHUNK // sig.shape[1])
+    for start in range(0, len(i), step):
+        a, b = i[start:start + step], j[start:start + step]
+        out[start:start + step] = (sig[a] == sig[b]).mean(axis=1)
+    return out
+
+
+def near_duplicates(vocab: Vocabulary, threshold: float = THRESHOLD, text: str = "both", perms: int = PERMS,
+                    bands: int = BANDS, seed: int = 0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(i, j, estimated Jaccard) of the concept pairs at or above the threshold."""
+    if perms % bands:
+        raise ValueError(f"{perms} hashes do not split into {bands} bands")
+    sig = minhash(*shingle_hashes(vocab, text), perms=perms, seed=seed)
+    i, j = lsh_pairs(sig, bands)
+    sim = similarity(sig, i, j)
+    keep = sim >= threshold
+    return i[keep], j[keep], sim[keep]
+
+
+def clusters(n: int, i: np.ndarray, j: np.ndarray) -> List[List[int]]:
+    """Connected components of the pair graph with at least two members, largest first."""
+    graph = sp.coo_matrix((np.ones(len(i), dtype=np.int8), (i, j)), shape=(n, n))
+    _, labels = connected_components(graph, directed=False)
+    order = np.argsort(labels, kind="stable")
+    bounds = np.flatnonzero(np.diff(labels[order])) + 1
+    groups = [g.tolist() for g in np.split(order, bounds) if len(g) > 1]
+    groups.sort(key=lambda g: (-len(g), g[0]))
+    return groups
+
+
+# ---------------- report ----------------
+
+def build_report(vocab: Vocabulary, closure: AncestorClosure, groups: List[List[int]],
+                 pairs: Dict[Tuple[int, int], float], only: Optional[Set[str]] = None,
+                 cross_facet: bool = False) -> List[dict]:
+    """Clusters as JSON-ready dicts, each member with its facets (names of its top concepts)."""
+    name_of = {str(u): n for u, n in zip(vocab.uris, vocab.names)}
+    facet_names = [name_of.get(str(u), cid) for u, cid in zip(closure.uris, closure.ids)]
+    lowest = defaultdict(lambda: 1.0)
+    for (a, b), s in pairs.items():
+        lowest[a] = min(lowest[a], s)
+        lowest[b] = min(lowest[b], s)
+    report = []
+    for group in groups:
+        uris = [str(vocab.uris[k]) for k in group]
+        if only is not None and not only.intersection(uris):
+            continue
+        members, facets = [], set()
+        for k, uri in zip(group, uris):
+            idx = closure.lookup(uri)
+            names = [] if idx is None else \
+                [facet_names[f] for f in closure.facet_ids[closure.facet_ptr[idx]:closure.facet_ptr[idx + 1]].tolist()]
+            facets.update(names)
+            members.append({"id": concept_id(vocab.uris[k]), "uri": uri, "label": vocab.names[k],
+                            "facets": names, "definition": vocab.definitions[k]})
+        if cross_facet and len(facets) < 2:
+            continue
+        report.append({"size": len(group), "cross_facet": len(facets) > 1, "facets": sorted(facets),
+                       "similarity": round(min(lowest[k] for k in group), 3), "members": members})
+    return report
+
+
+def describe(report: List[dict], threshold: float) -> str:
+    across = sum(1 for c in report if c["cross_facet"])
+    lines = [f"⚠️ {len(report)} near-duplicate cluster(s), {across} across facets (Jaccard >= {threshold:.2f}):"]
+    for c in report:
+        tag = " [cross-facet]" if c["cross_facet"] else ""
+        lines.append(f"- {c['size']} concepts, min. similarity {c['similarity']}{tag}")
+        for m in c["members"]:
+            lines.append(f"    {m['label']} ({m['id']}) — {', '.join(m['facets']) or 'no facet'}")
+    return "\n".join(lines)
+
+
+# ---------------- bench ----------------
+
+def _inject(vocab: Vocabulary, count: int, seed: int) -> Tuple[Vocabulary, List[Tuple[int, int]]]:
+    """Append `count` edited copies (one in twenty definition words replaced, a typo in one label)."""
+    rnd = random.Random(seed)
+    uris, labels, defs = list(vocab.uris), list(vocab.labels), list(vocab.definitions)
+    parents, codes = list(vocab.parents), list(vocab.codes)
+    words = [w for d in defs[:2000] for w in d.split()] or ["x"]
+    truth = []
+    for k in range(count):
+        src = rnd.randrange(len(vocab))
+        text = [rnd.choice(words) if rnd.random() < 0.05 else w for w in defs[src].split()]
+        ls = list(labels[src])
+        if ls:
+            ls[0] = ls[0][:-1] if len(ls[0]) > 3 else ls[0]
+        uris.append(f"urn:copy:{k}")
+        labels.append(ls)
+        defs.append(" ".join(text))
+        parents.append([])
+        codes.append(frozenset())
+        truth.append((src, len(uris) - 1))
+    return Vocabulary(uris, labels, defs, parents, codes), truth
+
+
+def _jaccard(vocab: Vocabulary, a: int, b: int, text: str) -> float:
+    x = _shingles(vocab.labels[a], vocab.definitions[a], text)
+    y = _shingles(vocab.labels[b], vocab.definitions[b], text)
+    return len(x & y) / len(x | y) if x or y else 0.0
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Find near-duplicate concepts (MinHash + LSH)")
+    ap.add_argument("sources", nargs="+", help="TTL/RDF sources")
+    ap.add_argument("--threshold", type=float, default=THRESHOLD, help="Minimum estimated Jaccard (0-1)")
+    ap.add_argument("--text", choices=TEXTS, default="both", help="What is compared")
+    ap.add_argument("--perms", type=int, default=PERMS, help="MinHash functions")
+    ap.add_argument("--bands", type=int, default=BANDS, help="LSH bands (must divide --perms)")
+    ap.add_argument("--cross-facet", action="store_true", help="Only clusters spanning several facets")
+    ap.add_argument("--since", nargs="+", metavar="OLD", help="Only clusters with concepts changed since OLD")
+    ap.add_argument("--json", help="Write the clusters as JSON")
+    ap.add_argument("--bench", type=int, metavar="N", help="Inject N edited copies and report recall and timing")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    g = load_graph(args.sources, store="compact")
+    vocab = Vocabulary.from_graph(g)
+    if args.bench:
+        vocab, truth = _inject(vocab, args.bench, args.seed)
+        t0 = time.perf_counter()
+        i, j, _ = near_duplicates(vocab, args.threshold, args.text, args.perms, args.bands, args.seed)
+        elapsed = time.perf_counter() - t0
+        groups = clusters(len(vocab), i, j)
+        component = {k: c for c, group in enumerate(groups) for k in group}
+        hit = [a in component and component.get(a) == component.get(b) for a, b in truth]
+        close = [_jaccard(vocab, a, b, args.text) >= args.threshold for a, b in truth]
+        reachable = sum(h for h, c in zip(hit, close) if c)
+        print(f"{len(vocab):,} concepts ({args.bench} injected copies): {elapsed:.2f}s, {len(i):,} pairs, "
+              f"{len(groups):,} clusters; injected pairs found: {sum(hit) / len(truth):.1%} "
+              f"({reachable / max(1, sum(close)):.1%} of the {sum(close)} at exact Jaccard >= {args.threshold})")
+        return 0
+
+    t0 = time.perf_counter()
+    i, j, sim = near_duplicates(vocab, args.threshold, args.text, args.perms, args.bands, args.seed)
+    groups = clusters(len(vocab), i, j)
+    elapsed = time.perf_counter() - t0
+    only = None
+    if args.since:
+        changes = diff_graphs(load_graph(args.since, store="compact"), g)
+        only = {e["uri"] for kind in ("added", "relabelled", "redefined") for e in changes[kind]}
+    pairs = dict(zip(zip(i.tolist(), j.tolist()), sim.tolist()))
+    report = build_report(vocab, AncestorClosure(g), groups, pairs, only, args.cross_facet)
+    print(describe(report, args.threshold) if report else "✅ no near-duplicate concepts")
+    print(f"[OK] {len(vocab)} concepts, {len(i)} similar pairs, {len(report)} cluster(s) reported ({elapsed:.2f}s)")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"threshold": args.threshold, "text": args.text, "clusters": report}, f, ensure_ascii=False,
+                      indent=2)
+        print(f"[OK] JSON report: {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
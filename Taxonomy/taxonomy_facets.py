@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Bitmap-indexed faceted product filtering and counting
+-----------------------------------------------------
+Server-side facet navigation: "how many active products fall under each
+taxonomy node, descendants included, given the other selected facets".
+
+Every concept keeps a bitmap of the products (slots) tagged with it or with
+anything under it, rolled up through skos:broader / inverse skos:narrower
+(the relations get_ancestors() follows in skos_md_and_ttl_update.py) via
+the precomputed closure of taxonomy_closure.py.
+
+Compression: a bitmap is stored the cheaper way, as in roaring bitmaps but
+per bitmap: a sorted int32 array of slots while it has at most 2 slots per
+64-bit word of the dense form, otherwise a row of uint64 words in one dense
+matrix. Leaves are mostly sparse, facets and upper levels dense.
+
+- filter(): OR of the selected concepts within a facet, AND across facets,
+  AND the lifecycleStatus bitmap; all as uint64 word operations
+- counts(): counts for the full tree in one call. Each facet is counted
+  against the selections of the OTHER facets (classic facet navigation),
+  so at most one filter per selected facet plus one is evaluated; a filter
+  is applied to all dense rows with one vectorised AND + popcount and to
+  all sparse bitmaps (kept concatenated) with one gather + add.reduceat
+- add()/remove(): touch only the bitmaps of the product's tags and their
+  ancestors; add_many() bulk-loads with the batch closure
+
+Products follow domain.ts: Product {id, tags, lifecycleStatus} or
+ProductInstance {id, product: Product}.
+
+Install:
+  pip install rdflib numpy
+
+Examples:
+  python taxonomy_facets.py counts export12.ttl --products products.json --select E7Y63352 --depth 2
+  python taxonomy_facets.py bench export12.ttl --products 1000000 --tags 5
+"""
+import sys
+import json
+import time
+import argparse
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from rdflib import URIRef
+from rdflib.namespace import SKOS
+
+from taxonomy_loader import load_graph
+from taxonomy_closure import AncestorClosure, concept_id
+from skos_traversal import traverse
+
+LIFECYCLE_STATUSES = ("Draft", "Active", "EndOfLife")
+ALL = None  # status filter: every live product
+
+
+_BYTE_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _row_popcount(bitmaps: np.ndarray) -> np.ndarray:
+    """Set bits per row of a 2-D uint64 array (np.bitwise_count needs NumPy 2; byte lookup table otherwise)."""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(bitmaps).sum(axis=1, dtype=np.int64)
+    as_bytes = np.ascontiguousarray(bitmaps).view(np.uint8)
+    return _BYTE_POPCOUNT[as_bytes].sum(axis=1, dtype=np.int64)
+
+
+def _bits(slots: np.ndarray, words: int) -> np.ndarray:
+    """Dense uint64 bitmap with the given slots set."""
+    out = np.zeros(words, dtype=np.uint64)
+    if len(slots):
+        np.bitwise_or.at(out, slots >> 6, np.left_shift(np.uint64(1), (slots & 63).astype(np.uint64)))
+    return out
+
+
+class FacetEngine:
+    """Per-concept product bitmaps with rolled-up counts; products are identified by string id."""
+
+    def __init__(self, closure: AncestorClosure, capacity: int = 1024):
+        self.closure = closure
+        n = len(closure)
+        self._words = max(1, -(-capacity // 64))
+        self._slot_of: Dict[str, int] = {}
+        self._product_of: List[Optional[str]] = []
+        self._free: List[int] = []
+        self._concepts_of: List[Optional[np.ndarray]] = []  # slot -> expanded concept indices
+        self._status_of: List[Optional[str]] = []
+        self._live = np.zeros(self._words, dtype=np.uint64)
+        self._status: Dict[str, np.ndarray] = {}
+        self._row = np.full(n, -1, dtype=np.int64)          # concept -> dense row, -1 = sparse
+        self._dense = np.zeros((0, self._words), dtype=np.uint64)
+        self._dense_concepts: List[int] = []
+        self._sparse: Dict[int, np.ndarray] = {}            # concept -> sorted int32 slots
+        self._flat: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None  # sparse bitmaps concatenated
+        # concept -> facet (first top-term ancestor), for grouping selections
+        has_facet = np.diff(closure.facet_ptr) > 0
+        self._facet = np.full(n, -1, dtype=np.int64)
+        self._facet[has_facet] = closure.facet_ids[closure.facet_ptr[:-1][has_facet]]
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+    # ---------------- storage ----------------
+
+    def _grow(self, slots_needed: int) -> None:
+        words = -(-slots_needed // 64)
+        if words <= self._words:
+            return
+        words = max(words, self._words * 2)
+        pad = words - self._words
+        self._dense = np.pad(self._dense, ((0, 0), (0, pad)))
+        self._live = np.pad(self._live, (0, pad))
+        for status in self._status:
+            self._status[status] = np.pad(self._status[status], (0, pad))
+        self._words = words
+
+    def _threshold(self) -> int:
+        return 2 * self._words  # int32 slots cost more than the dense row above this
+
+    def _promote(self, concept: int, slots: np.ndarray) -> None:
+        row = len(self._dense_concepts)
+        if row == len(self._dense):
+            extra = max(16, len(self._dense))
+            self._dense = np.vstack([self._dense, np.zeros((extra, self._words), dtype=np.uint64)])
+        self._dense[row] = _bits(slots, self._words)
+        self._dense_concepts.append(concept)
+        self._row[concept] = row
+        self._sparse.pop(concept, None)
+
+    def _allocate(self, product_id: str) -> int:
+        if self._free:
+            slot = self._free.pop()
+        else:
+            slot = len(self._product_of)
+            self._product_of.append(None)
+            self._concepts_of.append(None)
+            self._status_of.append(None)
+            self._grow(slot + 1)
+        self._slot_of[product_id] = slot
+        self._product_of[slot] = product_id
+        return slot
+
+    def _set_status(self, slot: int, status: Optional[str], on: bool) -> None:
+        word, bit = slot >> 6, np.uint64(1) << np.uint64(slot & 63)
+        if on:
+            self._live[word] |= bit
+        else:
+            self._live[word] &= ~bit
+        if status is not None:
+            bitmap = self._status.setdefault(status, np.zeros(self._words, dtype=np.uint64))
+            if on:
+                bitmap[word] |= bit
+            else:
+                bitmap[word] &= ~bit
+
+    # ---------------- updates ----------------
+
+    def add(self, product_id: str, tags: Iterable[str], status: Optional[str] = "Active") -> int:
+        """Add (or replace) a product; returns the number of concept bitmaps touched."""
+        if product_id in self._slot_of:
+            self.remove(product_id)
+        indptr, tag_ids, _ = self.closure.encode([tags])
+        concepts = self.closure.expand(indptr, tag_ids)[1]
+        slot = self._allocate(product_id)
+        self._concepts_of[slot] = concepts
+        self._status_of[slot] = status
+        self._set_status(slot, status, True)
+        word, bit = slot >> 6, np.uint64(1) << np.uint64(slot & 63)
+        threshold = self._threshold()
+        for c in concepts.tolist():
+            row = self._row[c]
+            if row >= 0:
+                self._dense[row, word] |= bit
+                continue
+            slots = self._sparse.get(c)
+            if slots is None:
+                self._sparse[c] = np.array([slot], dtype=np.int32)
+            else:
+                slots = np.insert(slots, np.searchsorted(slots, slot), slot)
+                if len(slots) > threshold:
+                    self._promote(c, slots)
+                else:
+                    self._sparse[c] = slots
+        self._flat = None
+        return len(concepts)
+
+    def remove(self, product_id: str) -> int:
+        """Remove a product; returns the number of concept bitmaps touched."""
+        slot = self._slot_of.pop(product_id, None)
+        if slot is None:
+            return 0
+        concepts = self._concepts_of[slot]
+        self._set_status(slot, self._status_of[slot], False)
+        word, mask = slot >> 6, ~(np.uint64(1) << np.uint64(slot & 63))
+        for c in concepts.tolist():
+            row = self._row[c]
+            if row >= 0:
+                self._dense[row, word] &= mask
+            else:
+                slots = self._sparse[c]
+                i = np.searchsorted(slots, slot)
+                self._sparse[c] = np.delete(slots, i) if i < len(slots) and slots[i] == slot else slots
+        self._product_of[slot] = self._concepts_of[slot] = self._status_of[slot] = None
+        self._free.append(slot)
+        self._flat = None
+        return len(concepts)
+
+    def add_many(self, product_ids: Sequence[str], tag_lists: Iterable[Iterable[str]],
+                 statuses: Optional[Sequence[Optional[str]]] = None) -> None:
+        """Bulk load into an empty engine: one batch expansion, bitmaps built per concept."""
+        if self._slot_of:
+            raise ValueError("add_many() needs an empty engine; use add() for updates")
+        count = len(product_ids)
+        indptr, tag_ids, _ = self.closure.encode(tag_lists)
+        exp_ptr, exp_ids = self.closure.expand(indptr, tag_ids)
+        self._grow(count)
+        self._product_of = list(product_ids)
+        self._slot_of = {pid: slot for slot, pid in enumerate(product_ids)}
+        if len(self._slot_of) != count:
+            raise ValueError("duplicate product ids")
+        self._concepts_of = np.split(exp_ids, exp_ptr[1:-1])
+        self._status_of = list(statuses) if statuses is not None else ["Active"] * count
+        slots = np.arange(count, dtype=np.int32)
+        self._live = _bits(slots, self._words)
+        by_status = defaultdict(list)
+        for slot, status in enumerate(self._status_of):
+            if status is not None:
+                by_status[status].append(slot)
+        self._status = {s: _bits(np.asarray(v, dtype=np.int32), self._words) for s, v in by_status.items()}
+        # (concept, slot) pairs sorted by concept -> one bitmap per concept
+        entry_slot = np.repeat(slots, np.diff(exp_ptr))
+        order = np.argsort(exp_ids, kind="stable")
+        concepts, entry_slot = exp_ids[order], entry_slot[order]
+        bounds = np.flatnonzero(np.diff(concepts)) + 1
+        starts = np.concatenate([[0], bounds]) if len(concepts) else np.zeros(0, dtype=np.int64)
+        ends = np.concatenate([bounds, [len(concepts)]]) if len(concepts) else np.zeros(0, dtype=np.int64)
+        threshold = self._threshold()
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            c = int(concepts[start])
+            if end - start > threshold:
+                self._promote(c, entry_slot[start:end])
+            else:
+                self._sparse[c] = entry_slot[start:end].copy()
+        self._flat = None
+
+    # ---------------- queries ----------------
+
+    def bitmap(self, concept: int) -> np.ndarray:
+        """Dense uint64 bitmap of the products at or under the concept."""
+        row = self._row[concept]
+        if row >= 0:
+            return self._dense[row].copy()
+        return _bits(self._sparse.get(concept, np.zeros(0, dtype=np.int32)), self._words)
+
+    def _base(self, status: Optional[str]) -> np.ndarray:
+        if status is ALL:
+            return self._live.copy()
+        return self._status.get(status, np.zeros(self._words, dtype=np.uint64)).copy()
+
+    def groups(self, selected: Iterable[str]) -> Dict[int, List[int]]:
+        """Selected ConceptIDs grouped by facet (facet index -> concept indices)."""
+        out: Dict[int, List[int]] = defaultdict(list)
+        for key in selected:
+            c = self.closure.lookup(key)
+            if c is None:
+                raise KeyError(f"unknown concept {key}")
+            out[int(self._facet[c])].append(c)
+        return dict(out)
+
+    def filter(self, groups: Dict[int, List[int]], status: Optional[str] = "Active") -> np.ndarray:
+        """Products matching every group (OR within a group), as a dense bitmap."""
+        result = self._base(status)
+        for concepts in groups.values():
+            union = np.zeros(self._words, dtype=np.uint64)
+            for c in concepts:
+                union |= self.bitmap(c)
+            result &= union
+        return result
+
+    def _flat_sparse(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(concepts, starts, slots): the non-empty sparse bitmaps concatenated (rebuilt after updates)."""
+        if self._flat is None:
+            items = [(c, s) for c, s in self._sparse.items() if len(s)]
+            concepts = np.fromiter((c for c, _ in items), dtype=np.int64, count=len(items))
+            starts = np.zeros(len(items), dtype=np.int64)
+            if items:
+                np.cumsum([len(s) for _, s in items[:-1]], out=starts[1:])
+            slots = np.concatenate([s for _, s in items]) if items else np.zeros(0, dtype=np.int32)
+            self._flat = (concepts, starts, slots)
+        return self._flat
+
+    def _count_all(self, mask: np.ndarray) -> np.ndarray:
+        """Products in `mask` per concept (all concepts, one vectorised pass)."""
+        counts = np.zeros(len(self.closure), dtype=np.int64)
+        rows = len(self._dense_concepts)
+        if rows:
+            dense = _row_popcount(self._dense[:rows] & mask)
+            counts[np.asarray(self._dense_concepts)] = dense
+        concepts, starts, slots = self._flat_sparse()
+        if len(slots):
+            in_mask = np.unpackbits(mask.view(np.uint8), bitorder="little").view(bool)  # one bool per slot
+            counts[concepts] = np.add.reduceat(in_mask[slots], starts, dtype=np.int64)
+        return counts
+
+    def counts(self, selected: Iterable[str] = (), status: Optional[str] = "Active") -> Dict[str, int]:
+        """
+        {ConceptID: products} for every concept with at least one product. A
+        concept is counted against the selections of the other facets (its own
+        facet's selection does not narrow its siblings).
+        """
+        groups = self.groups(selected)
+        facet_of = self._facet
+        result = np.zeros(len(self.closure), dtype=np.int64)
+        unselected = facet_of < 0
+        full = self._count_all(self.filter(groups, status))
+        unselected |= ~np.isin(facet_of, list(groups))
+        result[unselected] = full[unselected]
+        for facet in groups:
+            others = {f: cs for f, cs in groups.items() if f != facet}
+            in_facet = facet_of == facet
+            result[in_facet] = self._count_all(self.filter(others, status))[in_facet]
+        ids = self.closure.ids
+        return {ids[i]: int(result[i]) for i in np.flatnonzero(result).tolist()}
+
+    def products(self, selected: Iterable[str] = (), status: Optional[str] = "Active") -> List[str]:
+        """Ids of the products matching the selection."""
+        mask = self.filter(self.groups(selected), status)
+        slots = np.flatnonzero(np.unpackbits(mask.view(np.uint8), bitorder="little"))
+        return [self._product_of[s] for s in slots.tolist() if s < len(self._product_of)]
+
+    def stats(self) -> dict:
+        concepts, _, slots = self._flat_sparse()
+        return {"products": len(self), "dense_bitmaps": len(self._dense_concepts), "sparse_bitmaps": len(concepts),
+                "dense_bytes": len(self._dense_concepts) * self._words * 8, "sparse_bytes": slots.nbytes}
+
+
+def _product(item: dict) -> Tuple[str, List[str], Optional[str]]:
+    """(id, tags, lifecycleStatus) of a domain.ts Product or ProductInstance."""
+    product = item.get("product", item)
+    return str(item.get("id", product.get("id", ""))), list(product.get("tags", [])), product.get("lifecycleStatus")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Faceted product counts over the taxonomy")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p_counts = sub.add_parser("counts", help="Count products per taxonomy node for a selection")
+    p_counts.add_argument("sources", nargs="+")
+    p_counts.add_argument("--products", required=True, help="JSON file: list of products or product instances")
+    p_counts.add_argument("--select", action="append", default=[], help="Selected ConceptID (repeatable)")
+    p_counts.add_argument("--status", default="Active", help="lifecycleStatus to count, or 'all'")
+    p_counts.add_argument("--depth", type=int, help="Levels of the tree to print")
+    p_bench = sub.add_parser("bench", help="Bulk load, full-tree counts and updates on random products")
+    p_bench.add_argument("sources", nargs="+")
+    p_bench.add_argument("--products", type=int, default=1_000_000)
+    p_bench.add_argument("--tags", type=int, default=5, help="Tags per product")
+    p_bench.add_argument("--updates", type=int, default=10_000)
+    p_bench.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    g = load_graph(args.sources, store="compact")
+    closure = AncestorClosure(g)
+    engine = FacetEngine(closure)
+
+    if args.cmd == "counts":
+        with open(args.products, "r", encoding="utf-8") as f:
+            items = [_product(item) for item in json.load(f)]
+        engine.add_many([i for i, _, _ in items], [t for _, t, _ in items], [s for _, _, s in items])
+        status = ALL if args.status.lower() == "all" else args.status
+        counts = engine.counts(args.select, status)
+        children = defaultdict(list)
+        for child, parent in g.subject_objects(SKOS.broader):
+            children[parent].append(child)
+        for parent, child in g.subject_objects(SKOS.narrower):
+            children[parent].append(child)
+        label = lambda u: str(g.value(u, SKOS.prefLabel) or concept_id(u))
+        tops = sorted((closure.uris[i] for i in closure.tops.tolist()), key=label)
+        selected = set(args.select)
+
+        def show(node, depth, parent):
+            cid = concept_id(node)
+            if cid not in counts:
+                return False
+            mark = " *" if cid in selected else ""
+            print(f"{'  ' * depth}- {label(node)} ({counts[cid]}){mark}")
+
+        traverse(tops, lambda u: sorted((c for c in dict.fromkeys(children.get(u, ())) if isinstance(c, URIRef)),
+                                        key=label), pre=show, max_depth=args.depth, unique=False)
+        print(f"[OK] {len(engine.products(args.select, status))} of {len(engine)} products match")
+        return 0
+
+    rnd = np.random.default_rng(args.seed)
+    leaves = np.flatnonzero(np.diff(closure.down_ptr) == 1)
+    ids = [f"P{i}" for i in range(args.products)]
+    tag_ids = leaves[rnd.integers(0, len(leaves), size=(args.products, args.tags))]
+    names = np.asarray(closure.ids, dtype=object)
+    statuses = rnd.choice(LIFECYCLE_STATUSES, size=args.products, p=[0.1, 0.8, 0.1]).tolist()
+    t0 = time.perf_counter()
+    engine.add_many(ids, (names[row].tolist() for row in tag_ids), statuses)
+    print(f"bulk load  {args.products:,} products x {args.tags} tags: {time.perf_counter() - t0:.2f}s  {engine.stats()}")
+    top_ids = [closure.ids[i] for i in closure.tops.tolist()]
+    selections = [[], [names[leaves[0]]], [names[leaves[0]], top_ids[-1]]]
+    for selected in selections:
+        t0 = time.perf_counter()
+        counts = engine.counts(selected)
+        print(f"counts     selection {selected or '-'}: {(time.perf_counter() - t0) * 1000:.1f} ms "
+              f"({len(counts)} nodes)")
+    t0 = time.perf_counter()
+    touched = 0
+    for i in range(args.updates):
+        touched += engine.add(f"U{i}", names[leaves[rnd.integers(0, len(leaves), size=args.tags)]].tolist())
+    for i in range(args.updates):
+        touched += engine.remove(f"U{i}")
+    elapsed = time.perf_counter() - t0
+    print(f"updates    {2 * args.updates:,} add/remove: {elapsed / (2 * args.updates) * 1e6:.1f} us each, "
+          f"{touched / (2 * args.updates):.1f} bitmaps touched per update")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
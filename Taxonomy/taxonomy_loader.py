@@ -0,0 +1,543 @@
+# taxonomy_loader.py
+"""
+Shared TTL loader for the Taxonomy scripts.
+
+load_graph() replaces the `g = Graph(); g.parse(path, format="turtle")` lines
+of the exporters and lets a run choose its store:
+
+- store="rdflib"  (default) a normal rdflib.Graph, mutable
+- store="compact" a read-only compact_store.CompactGraph (int32 term IDs,
+                  sorted SPO/POS/OSP arrays); much smaller, same read API
+
+With store="compact" a snapshot file is kept next to the source
+(<source>.snapshot, or an explicit path). It records the source's size and
+mtime; as long as those match, the next run loads the snapshot instead of
+parsing Turtle.
+
+N-Triples input (.nt, or gzip-compressed .nt.gz) is parsed in parallel:
+the file is split on line boundaries into chunks, each chunk is parsed and
+dictionary-encoded in a process pool, and the per-chunk term tables are
+merged into one graph/store. Blank node labels stay document-scoped across
+chunks. Use `convert` once to turn the Turtle exports into N-Triples; the
+prefixes are kept as leading comments so qnames still work.
+
+Several sources (core taxonomy, SSR code list, translations) can be passed
+as a list; they are merged into one view. Each source keeps its own
+snapshot (with either store), and only the sources whose file changed are parsed again, in
+parallel, so updating SSR.ttl does not re-parse the core taxonomy.
+
+A Projection drops triples while they are parsed, before they reach the
+graph or the compact store: a predicate allow-list ("skos:*",
+"apmwg:linkedSSR", "<full-uri>"; rdf:type is always kept) and a language
+allow-list for tagged literals. Prefixes come from the file's own @prefix
+lines plus the usual rdf/rdfs/owl/skos/dc/dct defaults. Snapshots record the
+projection they were built with and are only reused for the same one.
+
+Usage:
+  from taxonomy_loader import load_graph
+  g = load_graph("export12.ttl")                                # rdflib.Graph
+  g = load_graph("export12.ttl", store="compact")               # CompactGraph + snapshot
+  g = load_graph("partner.nt.gz", store="compact", workers=8)   # parallel N-Triples ingest
+  g = load_graph(["export12.ttl", "SSR.ttl"], store="compact")  # merged, one snapshot per file
+  g = load_graph("export12.ttl", projection=Projection(["skos:*", "apmwg:linkedSSR"], ["en"]))
+
+  python taxonomy_loader.py convert export12.ttl export12.nt.gz # Turtle -> N-Triples (once)
+  python taxonomy_loader.py snapshot export12.ttl               # (re)build the snapshot
+  python taxonomy_loader.py stats export12.ttl                  # triples / memory comparison
+  python taxonomy_loader.py bench partner.nt.gz                 # N-Triples throughput per worker count
+"""
+
+import os
+import re
+import sys
+import gzip
+import time
+import uuid
+import argparse
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from rdflib import Graph, Literal
+from rdflib.namespace import DC, DCTERMS, OWL, RDF, RDFS, SKOS, XSD
+from rdflib.plugins.parsers.ntriples import W3CNTriplesParser
+from rdflib.plugins.serializers.nt import _nt_row
+
+from compact_store import CompactGraph, subject_order
+
+STORES = ("rdflib", "compact")
+SNAPSHOT_SUFFIX = ".snapshot"
+
+FORMATS = {".ttl": "turtle", ".nt": "nt", ".n3": "n3", ".rdf": "xml", ".xml": "xml", ".jsonld": "json-ld"}
+
+NT_CHUNK_BYTES = 8 * 1024 * 1024      # uncompressed bytes per parse task
+NT_PREFIX_LINE = re.compile(r"#\s*@prefix\s+([\w\-]*):\s*<([^>]*)>\s*\.")
+TTL_PREFIX_LINE = re.compile(r"\s*(?:@prefix|PREFIX)\s+([\w\-]*):\s*<([^>]*)>", re.IGNORECASE)
+
+# Resolve projection patterns like "skos:*" even when a file does not declare the prefix
+DEFAULT_PREFIXES = {
+    "rdf": str(RDF), "rdfs": str(RDFS), "owl": str(OWL), "xsd": str(XSD),
+    "skos": str(SKOS), "dc": str(DC), "dct": str(DCTERMS), "dcterms": str(DCTERMS),
+}
+
+
+def guess_format(path: str) -> str:
+    if path.lower().endswith(".nt.gz"):
+        return "nt"
+    return FORMATS.get(os.path.splitext(path)[1].lower(), "turtle")
+
+
+# ---------------- parse-time projection ----------------
+
+class Projection:
+    """
+    Predicate / language allow-list applied to triples while they are parsed.
+
+    predicates: patterns like "skos:*" (whole namespace), "apmwg:linkedSSR"
+                or "<http://...>" (full URI). rdf:type is always kept.
+    langs:      language tags to keep ("en" also keeps "en-GB"); literals
+                without a language tag are always kept.
+    An empty list means "no filter" for that part.
+    """
+
+    def __init__(self, predicates: Optional[Iterable[str]] = None, langs: Optional[Iterable[str]] = None):
+        self.predicates = sorted({p.strip() for p in predicates or () if p.strip()})
+        self.langs = sorted({l.strip().lower() for l in langs or () if l.strip()})
+        self._langs = frozenset(self.langs)
+        self._exact: Optional[frozenset] = None
+        self._namespaces: Tuple[str, ...] = ()
+        self._decisions = {}  # predicate -> keep?, decided once per distinct predicate
+
+    @classmethod
+    def from_args(cls, predicates: Optional[str] = None, langs: Optional[str] = None) -> Optional["Projection"]:
+        """Build from comma-separated CLI/env values; None when neither is set."""
+        if not predicates and not langs:
+            return None
+        return cls((predicates or "").split(","), (langs or "").split(","))
+
+    def spec(self) -> dict:
+        return {"predicates": self.predicates, "langs": self.langs}
+
+    def compile(self, prefixes: Dict[str, str]) -> "Projection":
+        """Resolve the predicate patterns against a prefix map (prefix -> namespace)."""
+        self._decisions = {}
+        if not self.predicates:
+            self._exact = None
+            return self
+        exact = {str(RDF.type)}
+        namespaces = []
+        for pattern in self.predicates:
+            if pattern.startswith("<") and pattern.endswith(">"):
+                uri = pattern[1:-1]
+            else:
+                prefix, sep, local = pattern.partition(":")
+                if not sep or prefix not in prefixes:
+                    raise ValueError(f"Cannot resolve predicate pattern '{pattern}' (unknown prefix '{prefix}')")
+                uri = prefixes[prefix] + local
+            if uri.endswith("*"):
+                namespaces.append(uri[:-1])
+            else:
+                exact.add(uri)
+        self._exact = frozenset(exact)
+        self._namespaces = tuple(namespaces)
+        return self
+
+    def keep(self, p, o) -> bool:
+        if self._exact is not None:
+            keep = self._decisions.get(p)
+            if keep is None:
+                uri = str(p)
+                keep = self._decisions[p] = uri in self._exact or uri.startswith(self._namespaces)
+            if not keep:
+                return False
+        if self._langs and type(o) is Literal and o.language:
+            lang = o.language.lower()
+            return lang in self._langs or lang.split("-", 1)[0] in self._langs
+        return True
+
+
+class _ProjectedGraph(Graph):
+    """Graph that drops non-matching triples as the parser adds them."""
+
+    def __init__(self, projection: Projection):
+        super().__init__()
+        self._projection = projection
+
+    def add(self, triple):
+        if self._projection is not None and not self._projection.keep(triple[1], triple[2]):
+            return self
+        return super().add(triple)
+
+
+def _turtle_prefixes(path: str) -> Dict[str, str]:
+    """
+    @prefix / PREFIX declarations of a Turtle file. rdflib only binds them on
+    the graph after parsing, so the projection has to read them up front.
+    """
+    out = {}
+    opener = gzip.open if path.lower().endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if "prefix" in line[:10].lower():
+                m = TTL_PREFIX_LINE.match(line)
+                if m:
+                    out[m.group(1)] = m.group(2)
+    return out
+
+
+def projection_prefixes(path: str, fmt: Optional[str] = None) -> Dict[str, str]:
+    """Prefix map used to resolve projection patterns for `path` (file prefixes win over defaults)."""
+    prefixes = dict(DEFAULT_PREFIXES)
+    if (fmt or guess_format(path)) == "nt":
+        prefixes.update(_nt_prefixes(path))
+    elif (fmt or guess_format(path)) in ("turtle", "n3"):
+        prefixes.update(_turtle_prefixes(path))
+    return prefixes
+
+
+# ---------------- parallel N-Triples ingest ----------------
+
+class _DocumentBNodes(dict):
+    """bnode_context that maps `_:label` to the same BNode id in every chunk of one document."""
+
+    def __init__(self, prefix: str):
+        super().__init__()
+        self.prefix = prefix
+
+    def get(self, label, default=None):
+        return f"{self.prefix}{label}"
+
+
+class _EncodingSink:
+    """N-Triples parser sink that dictionary-encodes terms per chunk."""
+
+    def __init__(self, projection: Optional[Projection] = None):
+        self.terms: List = []
+        self.ids = {}
+        self.rows = array("i")
+        self.projection = projection
+
+    def triple(self, s, p, o) -> None:
+        if self.projection is not None and not self.projection.keep(p, o):
+            return
+        ids = self.ids
+        for t in (s, p, o):
+            i = ids.get(t)
+            if i is None:
+                i = ids[t] = len(self.terms)
+                self.terms.append(t)
+            self.rows.append(i)
+
+
+def _parse_nt_task(task: Tuple) -> Tuple[List, bytes]:
+    """Worker: parse one chunk -> (local terms, flat int32 s/p/o rows)."""
+    kind, payload, projection, bnode_prefix = task
+    if kind == "range":
+        path, start, end = payload
+        with open(path, "rb") as f:
+            f.seek(start)
+            data = f.read(end - start)
+    else:
+        data = payload
+    sink = _EncodingSink(projection)
+    W3CNTriplesParser(sink).parsestring(data, bnode_context=_DocumentBNodes(bnode_prefix))
+    return sink.terms, sink.rows.tobytes()
+
+
+def _line_aligned_ranges(path: str, chunk_bytes: int) -> List[Tuple[int, int]]:
+    size = os.path.getsize(path)
+    offsets = [0]
+    with open(path, "rb") as f:
+        pos = chunk_bytes
+        while pos < size:
+            f.seek(pos)
+            f.readline()  # move to the start of the next line
+            nxt = f.tell()
+            if nxt >= size:
+                break
+            if nxt > offsets[-1]:
+                offsets.append(nxt)
+            pos = nxt + chunk_bytes
+    offsets.append(size)
+    return list(zip(offsets, offsets[1:]))
+
+
+def _gzip_chunks(path: str, chunk_bytes: int) -> Iterator[bytes]:
+    with gzip.open(path, "rb") as f:
+        buf: List[bytes] = []
+        size = 0
+        for line in f:
+            buf.append(line)
+            size += len(line)
+            if size >= chunk_bytes:
+                yield b"".join(buf)
+                buf, size = [], 0
+        if buf:
+            yield b"".join(buf)
+
+
+def _nt_prefixes(path: str) -> List[Tuple[str, str]]:
+    """Prefix bindings stored as leading '# @prefix p: <ns> .' comments (see convert)."""
+    opener = gzip.open if path.lower().endswith(".gz") else open
+    out = []
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if not line.startswith("#"):
+                break
+            m = NT_PREFIX_LINE.match(line)
+            if m:
+                out.append((m.group(1), m.group(2)))
+    return out
+
+
+def parse_ntriples_parallel(path: str, workers: Optional[int] = None,
+                            chunk_bytes: int = NT_CHUNK_BYTES,
+                            projection: Optional[Projection] = None) -> Tuple[List, List[Tuple[int, int, int]]]:
+    """
+    Parse an N-Triples file (optionally .gz) in a process pool.
+    Returns (terms, rows): a merged term table and (s, p, o) ID rows in file order.
+    With a projection, non-matching triples are dropped inside the workers.
+    """
+    workers = workers or os.cpu_count() or 1
+    bnode_prefix = f"nt{uuid.uuid4().hex[:8]}"
+    if projection is not None:
+        projection.compile(projection_prefixes(path, "nt"))
+    if path.lower().endswith(".gz"):
+        tasks = (("text", data, projection, bnode_prefix) for data in _gzip_chunks(path, chunk_bytes))
+    else:
+        tasks = (("range", (path, start, end), projection, bnode_prefix)
+                 for start, end in _line_aligned_ranges(path, chunk_bytes))
+
+    terms: List = []
+    ids = {}
+    rows: List[Tuple[int, int, int]] = []
+
+    def merge(result: Tuple[List, bytes]) -> None:
+        local_terms, blob = result
+        remap = []
+        for t in local_terms:
+            i = ids.get(t)
+            if i is None:
+                i = ids[t] = len(terms)
+                terms.append(t)
+            remap.append(i)
+        local = array("i")
+        local.frombytes(blob)
+        rows.extend(zip(*(map(remap.__getitem__, local[k::3]) for k in (0, 1, 2))))
+
+    if workers == 1:
+        for task in tasks:
+            merge(_parse_nt_task(task))
+        return terms, rows
+
+    # Bounded window of in-flight chunks; results are merged in file order
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.submit(_parse_nt_task, task))
+            if len(pending) >= 2 * workers:
+                merge(pending.popleft().result())
+        while pending:
+            merge(pending.popleft().result())
+    return terms, rows
+
+
+def load_ntriples(path: str, store: str = "rdflib", workers: Optional[int] = None,
+                  projection: Optional[Projection] = None):
+    terms, rows = parse_ntriples_parallel(path, workers, projection=projection)
+    namespaces = _nt_prefixes(path)
+    if store == "compact":
+        return CompactGraph.from_encoded(terms, rows, namespaces)
+    g = Graph()
+    for prefix, ns in namespaces:
+        g.bind(prefix, ns)
+    g.addN((terms[s], terms[p], terms[o], g) for s, p, o in rows)
+    return g
+
+
+def convert_to_ntriples(source: str, target: str) -> int:
+    """Write `source` (any rdflib format) as N-Triples, gzip-compressed if target ends in .gz."""
+    g = parse_rdflib(source)
+    opener = gzip.open if target.lower().endswith(".gz") else open
+    n = 0
+    with opener(target, "wt", encoding="utf-8", newline="\n") as f:
+        for prefix, ns in sorted(g.namespaces()):
+            f.write(f"# @prefix {prefix}: <{ns}> .\n")
+        # Subject by subject, in rdflib's insertion order, so the N-Triples load
+        # gives exporters the same per-subject order as the Turtle source
+        for s in subject_order(g):
+            for p, o in g.predicate_objects(s):
+                f.write(_nt_row((s, p, o)))
+                n += 1
+    return n
+
+
+def source_info(path: str, projection: Optional[Projection] = None) -> dict:
+    st = os.stat(path)
+    return {"path": os.path.abspath(path), "size": st.st_size, "mtime_ns": st.st_mtime_ns,
+            "projection": projection.spec() if projection else None}
+
+
+def parse_rdflib(path: str, fmt: Optional[str] = None, projection: Optional[Projection] = None) -> Graph:
+    fmt = fmt or guess_format(path)
+    if projection is None:
+        g = Graph()
+        g.parse(path, format=fmt)
+        return g
+    projection.compile(projection_prefixes(path, fmt))
+    g = _ProjectedGraph(projection)
+    g.parse(path, format=fmt)
+    g._projection = None  # later additions by the caller are not filtered
+    return g
+
+
+def _snapshot_is_fresh(path: str, snap_path: str, projection: Optional[Projection] = None) -> bool:
+    if not os.path.exists(snap_path):
+        return False
+    try:
+        recorded = CompactGraph.snapshot_source(snap_path)
+    except Exception as e:
+        print(f"⚠️ Ignoring unreadable snapshot {snap_path}: {e}")
+        return False
+    info = source_info(path, projection)
+    return all(recorded.get(k) == info[k] for k in ("size", "mtime_ns", "projection"))
+
+
+def load_compact(path: str, fmt: Optional[str] = None, snapshot: Union[str, bool, None] = True,
+                 workers: Optional[int] = None, projection: Optional[Projection] = None) -> CompactGraph:
+    """CompactGraph for `path`, from a fresh snapshot when there is one (same source and projection)."""
+    snap_path = None
+    if snapshot:
+        snap_path = snapshot if isinstance(snapshot, str) else path + SNAPSHOT_SUFFIX
+        if _snapshot_is_fresh(path, snap_path, projection):
+            try:
+                return CompactGraph.load(snap_path)
+            except Exception as e:
+                print(f"⚠️ Ignoring unreadable snapshot {snap_path}: {e}")
+    if (fmt or guess_format(path)) == "nt":
+        cg = load_ntriples(path, "compact", workers, projection)
+    else:
+        cg = CompactGraph.from_graph(parse_rdflib(path, fmt, projection))
+    if snap_path:
+        cg.save(snap_path, source_info(path, projection))
+    return cg
+
+
+def _load_source_task(task: Tuple) -> CompactGraph:
+    """Worker: CompactGraph of one source, parsed and re-snapshotted if stale."""
+    path, snapshot, projection = task
+    return load_compact(path, snapshot=snapshot, workers=1, projection=projection)
+
+
+def load_sources(paths: Sequence[str], store: str = "rdflib", snapshot: bool = True,
+                 workers: Optional[int] = None, projection: Optional[Projection] = None):
+    """
+    Merge several vocabulary files (core taxonomy, SSR code list, translations)
+    into one view. Every source keeps its own <source>.snapshot, so only the
+    sources that changed are parsed, in parallel; the others load from their
+    snapshots. Returns a CompactGraph, or an rdflib.Graph built from the merge.
+    """
+    if store not in STORES:
+        raise ValueError(f"Unknown store '{store}', expected one of {STORES}")
+    stale = [p for p in paths if not (snapshot and _snapshot_is_fresh(p, p + SNAPSHOT_SUFFIX, projection))]
+    graphs = {}
+    workers = min(workers or os.cpu_count() or 1, len(stale))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for path, cg in zip(stale, pool.map(_load_source_task, [(p, snapshot, projection) for p in stale])):
+                graphs[path] = cg
+    for path in paths:
+        if path not in graphs:
+            graphs[path] = _load_source_task((path, snapshot, projection))
+    merged = CompactGraph.merge(graphs[p] for p in paths)
+    print(f"[loader] {len(paths)} sources ({len(stale)} parsed, {len(paths) - len(stale)} from snapshot), "
+          f"{len(merged)} triples")
+    return merged if store == "compact" else merged.to_graph()
+
+
+def load_graph(path: Union[str, Sequence[str]], store: str = "rdflib", fmt: Optional[str] = None,
+               snapshot: Union[str, bool, None] = True, workers: Optional[int] = None,
+               projection: Optional[Projection] = None):
+    """Load a vocabulary file, or several merged (see load_sources), into the chosen store."""
+    if not isinstance(path, str):
+        if len(path) > 1:
+            if isinstance(snapshot, str):
+                raise ValueError("An explicit snapshot path needs a single source; "
+                                 f"with several, each uses <source>{SNAPSHOT_SUFFIX}")
+            return load_sources(path, store, bool(snapshot), workers, projection)
+        path = path[0]
+    if store == "rdflib":
+        if (fmt or guess_format(path)) == "nt":
+            return load_ntriples(path, "rdflib", workers, projection)
+        return parse_rdflib(path, fmt, projection)
+    if store == "compact":
+        return load_compact(path, fmt, snapshot, workers, projection)
+    raise ValueError(f"Unknown store '{store}', expected one of {STORES}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Build compact snapshots / compare stores for a vocabulary file")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p_snap = sub.add_parser("snapshot", help="Parse a TTL file and write its compact snapshot")
+    p_snap.add_argument("source")
+    p_snap.add_argument("--out", help=f"Snapshot path (default <source>{SNAPSHOT_SUFFIX})")
+    p_stats = sub.add_parser("stats", help="Compare load time and memory of both stores")
+    p_stats.add_argument("source")
+    for p in (p_snap, p_stats):
+        p.add_argument("--predicates", help="Projection: comma-separated predicate patterns, e.g. 'skos:*,apmwg:linkedSSR'")
+        p.add_argument("--langs", help="Projection: comma-separated language tags to keep, e.g. 'en'")
+    p_conv = sub.add_parser("convert", help="Convert a Turtle file to N-Triples (.nt or .nt.gz)")
+    p_conv.add_argument("source")
+    p_conv.add_argument("target")
+    p_bench = sub.add_parser("bench", help="N-Triples ingest throughput for 1..N workers")
+    p_bench.add_argument("source", help=".nt or .nt.gz file")
+    p_bench.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = ap.parse_args()
+
+    if args.cmd == "convert":
+        t0 = time.perf_counter()
+        n = convert_to_ntriples(args.source, args.target)
+        print(f"[OK] {n} triples -> {args.target} ({time.perf_counter() - t0:.2f}s)")
+        return
+
+    if args.cmd == "bench":
+        workers = 1
+        while True:
+            t0 = time.perf_counter()
+            terms, rows = parse_ntriples_parallel(args.source, workers)
+            elapsed = time.perf_counter() - t0
+            print(f"{workers:>3} workers  {len(rows):>10} triples  {elapsed:7.2f}s  {len(rows) / elapsed:>10.0f} triples/s")
+            if workers >= args.max_workers:
+                break
+            workers = min(workers * 2, args.max_workers)
+        return
+
+    if args.cmd == "snapshot":
+        out = args.out or args.source + SNAPSHOT_SUFFIX
+        t0 = time.perf_counter()
+        projection = Projection.from_args(args.predicates, args.langs)
+        cg = CompactGraph.from_graph(parse_rdflib(args.source, projection=projection))
+        cg.save(out, source_info(args.source, projection))
+        print(f"[OK] {cg} -> {out} ({time.perf_counter() - t0:.2f}s)")
+        return
+
+    import tracemalloc
+    projection = Projection.from_args(args.predicates, args.langs)
+    for label, loader in (("rdflib", lambda: parse_rdflib(args.source, projection=projection)),
+                          ("compact (from TTL)",
+                           lambda: CompactGraph.from_graph(parse_rdflib(args.source, projection=projection))),
+                          ("compact (snapshot)", lambda: load_compact(args.source, projection=projection))):
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        g = loader()
+        elapsed = time.perf_counter() - t0
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        n = len(g)
+        print(f"{label:20s} {n:>9} triples  {elapsed:7.3f}s  {current / 1e6:8.1f} MB  {current / max(n, 1):7.0f} B/triple")
+        del g
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,490 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Mapping suggestions against a partner vocabulary
+------------------------------------------------
+Proposes skos:exactMatch / skos:closeMatch links (the mockup's Mapping
+relations) from our taxonomy to a second SKOS vocabulary, scored along the
+evidence dimensions of Taxonomy_Mapping_Policy_Template.md.
+
+Evidence (0-100, weights and thresholds from the policy's YAML profile)
+- label (0.25): TF-IDF cosine of the character 3-grams of all prefLabels and
+  altLabels, every language (accent-folded as in taxonomy_search.py)
+- definition (0.30): TF-IDF cosine of the definition words
+- hierarchy (0.20): cosine of the parents' label vectors (both top
+  concepts count as the same pattern)
+- codes (0.10): overlap (Jaccard) of the apmwg:linkedSSR codes
+- usage (0.15) has no data in SKOS and is left out
+A dimension without data on either side is dropped and the remaining
+weights are rescaled. exactMatch needs >= 90, closeMatch >= 75; both are
+kept 1:1 (best score first) and top concepts only map to top concepts.
+
+Scaling (no all-pairs comparison)
+- blocking: the keys of a concept are its folded label words and label
+  3-grams; the target side is an inverted index of its keys, leaving out
+  keys shared by more than CAP target concepts. Every source concept looks
+  up its KEYS rarest keys among those in the index, so typos in one word
+  still leave the others. One sparse product per chunk of source concepts
+  counts the shared keys; the best CANDIDATES targets per concept are kept
+- scoring: the evidence dimensions of the candidate pairs are computed as
+  row-wise sparse dot products (NumPy / scipy.sparse), chunk by chunk
+
+Output: the accepted mappings as SKOS triples (Turtle) and, optionally, the
+ranked suggestions as CSV with the policy's minimal mapping fields.
+
+Install:
+  pip install rdflib numpy scipy
+
+Examples:
+  python taxonomy_match.py suggest export12.ttl --target partner.ttl --out mappings.ttl --report suggestions.csv
+  python taxonomy_match.py suggest big.ttl --target partner_big.ttl --out mappings.ttl --top 5
+  python taxonomy_match.py bench big.ttl
+"""
+import sys
+import csv
+import math
+import time
+import random
+import argparse
+from collections import defaultdict
+from functools import lru_cache
+from itertools import chain
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+from rdflib import Graph, Literal, URIRef
+from rdflib.namespace import RDF, SKOS
+
+from taxonomy_loader import load_graph
+from taxonomy_closure import concept_id
+from taxonomy_search import tokenize
+
+WEIGHTS = {"label": 0.25, "definition": 0.30, "hierarchy": 0.20, "codes": 0.10}
+THRESHOLDS = {"exactMatch": 90.0, "closeMatch": 75.0}
+NGRAM = 3
+KEYS = 8            # rarest label words/3-grams per source concept used for blocking
+CAP = 500           # keys of more target concepts than this are not indexed
+CANDIDATES = 20     # targets scored per source concept
+CHUNK = 4096        # source concepts per sparse product
+
+
+class Vocabulary:
+    """The concepts of one SKOS source with the text the matcher compares."""
+
+    def __init__(self, uris: List, labels: List[List[str]], definitions: List[str],
+                 parents: List[List[int]], codes: List[frozenset], names: Optional[List[str]] = None):
+        self.uris = uris
+        self.labels = labels
+        self.definitions = definitions
+        self.parents = parents
+        self.codes = codes
+        self.names = names if names is not None else [ls[0] if ls else concept_id(u) for u, ls in zip(uris, labels)]
+        self.top = np.array([not p for p in parents], dtype=bool)
+
+    def __len__(self) -> int:
+        return len(self.uris)
+
+    @classmethod
+    def from_graph(cls, graph) -> "Vocabulary":
+        pref = defaultdict(list)  # uri -> [(lang, text)]
+        alt = defaultdict(list)
+        definition = defaultdict(list)
+        parents = defaultdict(list)
+        codes = defaultdict(set)
+        concepts = {}
+        kind_of: Dict = {}
+        known = {RDF.type: "type", SKOS.prefLabel: "pref", SKOS.altLabel: "alt", SKOS.definition: "def",
+                 SKOS.broader: "broader", SKOS.narrower: "narrower"}
+        for s, p, o in graph.triples((None, None, None)):
+            kind = kind_of.get(p, "?")
+            if kind == "?":
+                kind = kind_of[p] = known.get(p) or ("ssr" if concept_id(p) == "linkedSSR" else None)
+            if kind is None:
+                continue
+            if kind == "type":
+                if o == SKOS.Concept and isinstance(s, URIRef):
+                    concepts[s] = None
+            elif kind in ("pref", "alt", "def"):
+                if isinstance(o, Literal):
+                    {"pref": pref, "alt": alt, "def": definition}[kind][s].append(
+                        ((o.language or "").lower(), str(o).strip()))
+            elif kind == "broader":
+                parents[s].append(o)
+            elif kind == "narrower":
+                parents[o].append(s)
+            else:
+                codes[s].add(concept_id(o))
+        uris = sorted(concepts, key=str)
+        index = {u: i for i, u in enumerate(uris)}
+        by_lang = lambda pairs: sorted(pairs, key=lambda p: (p[0] != "en", p[0]))  # English first, as a name
+        return cls(
+            uris,
+            [[t for _, t in by_lang(pref.get(u, []))] + [t for _, t in alt.get(u, [])] for u in uris],
+            [" ".join(t for _, t in by_lang(definition.get(u, []))) for u in uris],
+            [sorted({index[p] for p in parents.get(u, ()) if p in index and p != u}) for u in uris],
+            [frozenset(codes.get(u, ())) for u in uris],
+        )
+
+
+# ---------------- TF-IDF ----------------
+
+@lru_cache(maxsize=1 << 18)
+def _word_grams(word: str) -> Tuple[str, ...]:
+    """Character n-grams of a folded word padded with blanks (" veg" -> " ve", "veg", "eg ")."""
+    text = f" {word} "
+    return tuple(text[k:k + NGRAM] for k in range(len(text) - NGRAM + 1))
+
+
+class _Terms(dict):
+    """term -> column; unseen terms get the next column."""
+
+    def __missing__(self, term: str) -> int:
+        column = self[term] = len(self)
+        return column
+
+
+def _counts(rows: Iterable[Iterable[str]], vocab: _Terms) -> sp.csr_matrix:
+    """Term-count matrix of term iterables; new terms are added to `vocab`."""
+    offsets = [0]
+    ids: List[int] = []
+    column = vocab.__getitem__
+    for terms in rows:
+        ids.extend(map(column, terms))
+        offsets.append(len(ids))
+    indptr = np.asarray(offsets, dtype=np.int64)
+    m = sp.csr_matrix((np.ones(len(ids), dtype=np.float32), np.asarray(ids, dtype=np.int32), indptr),
+                      shape=(len(offsets) - 1, max(len(vocab), 1)))
+    m.sum_duplicates()
+    return m
+
+
+def _widen(m: sp.csr_matrix, width: int) -> sp.csr_matrix:
+    return sp.csr_matrix((m.data, m.indices, m.indptr), shape=(m.shape[0], width))
+
+
+def _tfidf(left: sp.csr_matrix, right: sp.csr_matrix) -> Tuple[sp.csr_matrix, sp.csr_matrix]:
+    """L2-normalised (1 + log tf) * idf rows of both sides, with an IDF over both."""
+    width = max(left.shape[1], right.shape[1])
+    left, right = _widen(left, width), _widen(right, width)
+    df = np.bincount(left.indices, minlength=width) + np.bincount(right.indices, minlength=width)
+    docs = left.shape[0] + right.shape[0]
+    idf = (np.log((1 + docs) / (1 + df)) + 1).astype(np.float32)
+    out = []
+    for m in (left, right):
+        m = m.copy()
+        m.data = (1 + np.log(m.data)) * idf[m.indices]
+        norms = np.sqrt(np.asarray(m.multiply(m).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        m = sp.csr_matrix(sp.diags(1 / norms) @ m)
+        out.append(m)
+    return out[0], out[1]
+
+
+def _rowdot(a: sp.csr_matrix, b: sp.csr_matrix, i: np.ndarray, j: np.ndarray) -> np.ndarray:
+    """a[i[k]] . b[j[k]] for every k."""
+    return np.asarray(a[i].multiply(b[j]).sum(axis=1), dtype=np.float32).ravel()
+
+
+def _top_per_row(rows: np.ndarray, cols: np.ndarray, scores: np.ndarray, k: int) -> np.ndarray:
+    """Mask keeping the k highest scores of every row."""
+    order = np.lexsort((-scores, rows))
+    rows_sorted = rows[order]
+    starts = np.flatnonzero(np.concatenate([[True], rows_sorted[1:] != rows_sorted[:-1]])) if len(rows) else rows
+    rank = np.arange(len(rows)) - np.repeat(starts, np.diff(np.append(starts, len(rows))))
+    keep = np.zeros(len(rows), dtype=bool)
+    keep[order[rank < k]] = True
+    return keep
+
+
+class Matcher:
+    """Blocking + vectorised evidence scoring between a source and a target Vocabulary."""
+
+    def __init__(self, source: Vocabulary, target: Vocabulary, weights: Dict[str, float] = WEIGHTS,
+                 allow_top_to_non_top: bool = False):
+        self.source, self.target = source, target
+        self.weights = weights
+        self.allow_top_to_non_top = allow_top_to_non_top
+        grams, words, terms = _Terms(), _Terms(), _Terms()
+        s_words, t_words = ([[w for label in ls for w in tokenize(label)] for ls in v.labels] for v in (source, target))
+        s_grams = _counts((chain.from_iterable(map(_word_grams, ws)) for ws in s_words), grams)
+        t_grams = _counts((chain.from_iterable(map(_word_grams, ws)) for ws in t_words), grams)
+        self.s_label, self.t_label = _tfidf(s_grams, t_grams)
+        # blocking keys: label 3-grams + label words, one column space
+        s_words, t_words = _counts(s_words, words), _counts(t_words, words)
+        self.s_keys, self.t_keys = (
+            sp.csr_matrix(sp.hstack([_widen(g, len(grams)), _widen(w, max(len(words), 1))]))
+            for g, w in ((s_grams, s_words), (t_grams, t_words)))
+        s_terms = _counts((tokenize(d) for d in source.definitions), terms)
+        t_terms = _counts((tokenize(d) for d in target.definitions), terms)
+        self.s_def, self.t_def = _tfidf(s_terms, t_terms)
+        self.s_has_def = np.diff(self.s_def.indptr) > 0
+        self.t_has_def = np.diff(self.t_def.indptr) > 0
+        self.s_has_codes = np.array([bool(c) for c in source.codes], dtype=bool)
+        self.t_has_codes = np.array([bool(c) for c in target.codes], dtype=bool)
+        self.s_parent = self._parent_vectors(source, self.s_label)
+        self.t_parent = self._parent_vectors(target, self.t_label)
+
+    @staticmethod
+    def _parent_vectors(vocab: Vocabulary, labels: sp.csr_matrix) -> sp.csr_matrix:
+        rows = np.repeat(np.arange(len(vocab)), [len(p) for p in vocab.parents])
+        cols = np.fromiter((p for ps in vocab.parents for p in ps), dtype=np.int64, count=len(rows))
+        incidence = sp.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, cols)), shape=(len(vocab),) * 2)
+        m = sp.csr_matrix(incidence @ labels)
+        norms = np.sqrt(np.asarray(m.multiply(m).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        return sp.csr_matrix(sp.diags(1 / norms) @ m)
+
+    # ---------------- blocking ----------------
+
+    def candidates(self, keys: int = KEYS, cap: int = CAP, per_concept: int = CANDIDATES) -> Tuple[np.ndarray, np.ndarray]:
+        """(source, target) index pairs sharing rare label keys, at most per_concept per source concept."""
+        s, t = self.s_keys, self.t_keys
+        t_df = np.bincount(t.indices, minlength=t.shape[1])
+        df = np.bincount(s.indices, minlength=s.shape[1]) + t_df
+        # source keys: the `keys` rarest of every concept among those the target index holds
+        rows = np.repeat(np.arange(s.shape[0]), np.diff(s.indptr))
+        indexed = (t_df[s.indices] > 0) & (t_df[s.indices] <= cap)
+        rows, cols = rows[indexed], s.indices[indexed]
+        keep = _top_per_row(rows, cols, -df[cols].astype(np.float64), keys)
+        s_keys = sp.csr_matrix((np.ones(int(keep.sum()), dtype=np.float32), (rows[keep], cols[keep])),
+                               shape=s.shape)
+        # target index: every key shared by at most `cap` target concepts
+        usable = t_df[t.indices] <= cap
+        t_rows = np.repeat(np.arange(t.shape[0]), np.diff(t.indptr))
+        t_index = sp.csr_matrix((np.ones(int(usable.sum()), dtype=np.float32), (t.indices[usable], t_rows[usable])),
+                                shape=(t.shape[1], t.shape[0]))
+        pairs_i, pairs_j = [], []
+        for start in range(0, s.shape[0], CHUNK):
+            shared = sp.coo_matrix(s_keys[start:start + CHUNK] @ t_index)
+            if not shared.nnz:
+                continue
+            keep = _top_per_row(shared.row, shared.col, shared.data, per_concept)
+            pairs_i.append(shared.row[keep].astype(np.int64) + start)
+            pairs_j.append(shared.col[keep].astype(np.int64))
+        if not pairs_i:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        i, j = np.concatenate(pairs_i), np.concatenate(pairs_j)
+        if not self.allow_top_to_non_top:  # policy: a top concept only maps to a top concept
+            same = self.source.top[i] == self.target.top[j]
+            i, j = i[same], j[same]
+        return i, j
+
+    # ---------------- scoring ----------------
+
+    def score(self, i: np.ndarray, j: np.ndarray) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """Evidence (0-100) and per-dimension similarities of the pairs (NaN = no data)."""
+        parts: Dict[str, List[np.ndarray]] = defaultdict(list)
+        s_top, t_top = self.source.top, self.target.top
+        s_codes, t_codes = self.source.codes, self.target.codes
+        for start in range(0, len(i), 250_000):
+            a, b = i[start:start + 250_000], j[start:start + 250_000]
+            parts["label"].append(_rowdot(self.s_label, self.t_label, a, b))
+            definition = _rowdot(self.s_def, self.t_def, a, b)
+            definition[~(self.s_has_def[a] & self.t_has_def[b])] = np.nan
+            parts["definition"].append(definition)
+            hierarchy = _rowdot(self.s_parent, self.t_parent, a, b)
+            both_top = s_top[a] & t_top[b]
+            hierarchy[both_top] = 1.0
+            hierarchy[(s_top[a] | t_top[b]) & ~both_top] = np.nan
+            parts["hierarchy"].append(hierarchy)
+            codes = np.full(len(a), np.nan, dtype=np.float32)
+            for k in np.flatnonzero(self.s_has_codes[a] | self.t_has_codes[b]).tolist():
+                left, right = s_codes[a[k]], t_codes[b[k]]
+                codes[k] = len(left & right) / len(left | right)
+            parts["codes"].append(codes)
+        dims = {name: (np.concatenate(v) if v else np.zeros(0, dtype=np.float32)) for name, v in parts.items()}
+        total = np.zeros(len(i), dtype=np.float64)
+        weight = np.zeros(len(i), dtype=np.float64)
+        for name, w in self.weights.items():
+            values = dims.get(name)
+            if values is None:
+                continue
+            present = ~np.isnan(values)
+            total[present] += w * np.clip(values[present], 0, 1)
+            weight[present] += w
+        weight[weight == 0] = 1
+        return (100 * total / weight).astype(np.float32), dims
+
+    def suggest(self, top: int = 3, pairs: Optional[Tuple[np.ndarray, np.ndarray]] = None, **blocking) -> dict:
+        """Ranked suggestions: the `top` best targets of every source concept, as parallel arrays."""
+        i, j = pairs if pairs is not None else self.candidates(**blocking)
+        evidence, dims = self.score(i, j)
+        keep = _top_per_row(i, j, evidence, top)
+        order = np.lexsort((-evidence[keep], i[keep]))
+        i, j, evidence = i[keep][order], j[keep][order], evidence[keep][order]
+        dims = {name: v[keep][order] for name, v in dims.items()}
+        starts = np.flatnonzero(np.concatenate([[True], i[1:] != i[:-1]])) if len(i) else i
+        rank = np.arange(len(i)) - np.repeat(starts, np.diff(np.append(starts, len(i)))) + 1
+        return {"source": i, "target": j, "evidence": evidence, "rank": rank, **dims}
+
+
+def accept(suggestions: dict, thresholds: Dict[str, float] = THRESHOLDS) -> List[Tuple[int, int, str, float]]:
+    """(source, target, relation, evidence) above the thresholds, kept 1:1 best-first."""
+    ordered = sorted(thresholds.items(), key=lambda kv: -kv[1])
+    floor = ordered[-1][1]
+    eligible = np.flatnonzero(suggestions["evidence"] >= floor)
+    eligible = eligible[np.argsort(-suggestions["evidence"][eligible], kind="stable")]
+    used_s, used_t, out = set(), set(), []
+    for k in eligible.tolist():
+        s, t = int(suggestions["source"][k]), int(suggestions["target"][k])
+        if s in used_s or t in used_t:
+            continue
+        score = float(suggestions["evidence"][k])
+        relation = next(name for name, threshold in ordered if score >= threshold)
+        used_s.add(s)
+        used_t.add(t)
+        out.append((s, t, relation, score))
+    return out
+
+
+def to_graph(source: Vocabulary, target: Vocabulary, mappings: Sequence[Tuple[int, int, str, float]]) -> Graph:
+    out = Graph()
+    out.bind("skos", SKOS)
+    for s, t, relation, _ in mappings:
+        out.add((source.uris[s], SKOS[relation], target.uris[t]))
+    return out
+
+
+def write_report(path: str, source: Vocabulary, target: Vocabulary, suggestions: dict,
+                 mappings: Sequence[Tuple[int, int, str, float]]) -> None:
+    """Ranked suggestions as CSV, with the minimal data fields of the mapping policy."""
+    accepted = {(s, t): relation for s, t, relation, _ in mappings}
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["mapping_id", "source_concept_iri", "target_concept_iri", "rank", "type",
+                         "evidence_score", "evidence_notes", "source_snippet", "target_snippet"])
+        for k in range(len(suggestions["source"])):
+            s, t = int(suggestions["source"][k]), int(suggestions["target"][k])
+            notes = "; ".join(f"{name} {suggestions[name][k]:.2f}" for name in WEIGHTS
+                              if name in suggestions and not math.isnan(suggestions[name][k]))
+            writer.writerow([f"map-{k + 1:06d}", str(source.uris[s]), str(target.uris[t]),
+                             int(suggestions["rank"][k]), accepted.get((s, t), ""),
+                             f"{suggestions['evidence'][k]:.1f}", notes, source.names[s], target.names[t]])
+
+
+# ---------------- synthetic partner vocabulary ----------------
+
+def _typo(rnd: random.Random, text: str) -> str:
+    if len(text) < 4:
+        return text
+    k = rnd.randrange(1, len(text) - 1)
+    return text[:k] + text[k + 1] + text[k] + text[k + 2:] if rnd.random() < 0.5 else text[:k] + text[k + 1:]
+
+
+def _kept_ancestor(source: Vocabulary, node: int, kept: Dict[int, int]) -> Optional[int]:
+    seen = set()
+    while node not in kept:
+        if node in seen or not source.parents[node]:
+            return None
+        seen.add(node)
+        node = source.parents[node][0]
+    return node
+
+
+def _partner(source: Vocabulary, seed: int, missing: float = 0.1, extra: float = 0.1) -> Tuple[Vocabulary, Dict[int, int]]:
+    """A perturbed copy of `source` (typos, dropped labels and definition words, shuffled order,
+    missing concepts, distractors) and the truth {source index: target index}."""
+    rnd = random.Random(seed)
+    kept = [i for i in range(len(source)) if rnd.random() >= missing]
+    n_extra = int(len(source) * extra)
+    order = list(range(len(kept) + n_extra))
+    rnd.shuffle(order)
+    truth = {src: order[k] for k, src in enumerate(kept)}
+    size = len(order)
+    labels: List[List[str]] = [[] for _ in range(size)]
+    definitions = [""] * size
+    parents: List[List[int]] = [[] for _ in range(size)]
+    codes: List[frozenset] = [frozenset()] * size
+    for src, dst in truth.items():
+        ls = [_typo(rnd, l) if rnd.random() < 0.3 else l for l in source.labels[src] if rnd.random() < 0.8]
+        labels[dst] = ls or source.labels[src][:1]
+        words = source.definitions[src].split()
+        definitions[dst] = "" if rnd.random() < 0.1 else " ".join(w for w in words if rnd.random() < 0.8)
+        parents[dst] = sorted({truth[a] for a in (_kept_ancestor(source, p, truth) for p in source.parents[src])
+                               if a is not None})
+        codes[dst] = source.codes[src]
+    vocab_words = [w for ls in source.labels[:2000] for l in ls for w in l.split()] or ["x"]
+    def_words = [w for d in source.definitions[:2000] for w in d.split()] or ["x"]
+    for k in range(len(kept), size):
+        dst = order[k]
+        labels[dst] = [" ".join(rnd.choice(vocab_words) for _ in range(rnd.randint(1, 3))) for _ in range(3)]
+        definitions[dst] = " ".join(rnd.choice(def_words) for _ in range(12))
+        parents[dst] = [order[rnd.randrange(len(kept))]] if rnd.random() < 0.8 and kept else []
+    uris = [URIRef(f"http://example.org/partner#p{k}") for k in range(size)]
+    return Vocabulary(uris, labels, definitions, parents, codes), truth
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Suggest skos:exactMatch/closeMatch mappings to a partner vocabulary")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p_suggest = sub.add_parser("suggest", help="Match our taxonomy against a partner SKOS vocabulary")
+    p_suggest.add_argument("sources", nargs="+", help="Our taxonomy (TTL/RDF sources)")
+    p_suggest.add_argument("--target", nargs="+", required=True, help="Partner vocabulary sources")
+    p_suggest.add_argument("--out", default="mappings.ttl", help="Accepted mappings as SKOS triples (Turtle)")
+    p_suggest.add_argument("--report", help="Ranked suggestions as CSV")
+    p_suggest.add_argument("--top", type=int, default=3, help="Suggestions kept per source concept")
+    p_suggest.add_argument("--exact", type=float, default=THRESHOLDS["exactMatch"], help="exactMatch threshold (0-100)")
+    p_suggest.add_argument("--close", type=float, default=THRESHOLDS["closeMatch"], help="closeMatch threshold (0-100)")
+    p_suggest.add_argument("--allow-top-to-non-top", action="store_true", help="Waive the top-concept constraint")
+    p_bench = sub.add_parser("bench", help="Match a taxonomy against a perturbed copy of itself")
+    p_bench.add_argument("sources", nargs="+")
+    p_bench.add_argument("--missing", type=float, default=0.1, help="Share of concepts absent from the partner")
+    p_bench.add_argument("--extra", type=float, default=0.1, help="Distractor concepts, as a share of the source")
+    p_bench.add_argument("--seed", type=int, default=0)
+    for p in (p_suggest, p_bench):
+        p.add_argument("--keys", type=int, default=KEYS, help="Rare label keys per concept used for blocking")
+        p.add_argument("--candidates", type=int, default=CANDIDATES, help="Targets scored per source concept")
+    args = ap.parse_args()
+
+    source = Vocabulary.from_graph(load_graph(args.sources, store="compact"))
+    blocking = {"keys": args.keys, "per_concept": args.candidates}
+    if args.cmd == "bench":
+        return bench(source, args.missing, args.extra, args.seed, blocking)
+
+    t0 = time.perf_counter()
+    target = Vocabulary.from_graph(load_graph(args.target, store="compact"))
+    matcher = Matcher(source, target, allow_top_to_non_top=args.allow_top_to_non_top)
+    suggestions = matcher.suggest(args.top, **blocking)
+    mappings = accept(suggestions, {"exactMatch": args.exact, "closeMatch": args.close})
+    to_graph(source, target, mappings).serialize(destination=args.out, format="turtle")
+    if args.report:
+        write_report(args.report, source, target, suggestions, mappings)
+    counts = defaultdict(int)
+    for _, _, relation, _ in mappings:
+        counts[relation] += 1
+    print(f"[OK] {len(source)} x {len(target)} concepts, {len(suggestions['source'])} suggestions, "
+          f"{counts['exactMatch']} exactMatch + {counts['closeMatch']} closeMatch -> {args.out} "
+          f"({time.perf_counter() - t0:.1f}s)")
+    return 0
+
+
+def bench(source: Vocabulary, missing: float, extra: float, seed: int, blocking: dict) -> int:
+    target, truth = _partner(source, seed, missing, extra)
+    print(f"{len(source)} source x {len(target)} partner concepts ({len(truth)} true pairs)")
+    t0 = time.perf_counter()
+    matcher = Matcher(source, target)
+    t1 = time.perf_counter()
+    i, j = matcher.candidates(**blocking)
+    t2 = time.perf_counter()
+    found = sum(1 for a, b in zip(i.tolist(), j.tolist()) if truth.get(a) == b)
+    print(f"features   {t1 - t0:6.2f}s")
+    print(f"blocking   {t2 - t1:6.2f}s  {len(i):,} candidate pairs ({len(i) / max(len(source), 1):.1f} per concept, "
+          f"{len(i) / max(len(source) * len(target), 1):.2e} of all pairs); true pair among them: "
+          f"{found / max(len(truth), 1):.1%}")
+    suggestions = matcher.suggest(1, pairs=(i, j))
+    t3 = time.perf_counter()
+    top1 = sum(1 for a, b in zip(suggestions["source"].tolist(), suggestions["target"].tolist()) if truth.get(a) == b)
+    print(f"scoring    {t3 - t2:6.2f}s  top-1 correct: {top1 / max(len(truth), 1):.1%}")
+    mappings = accept(suggestions)
+    for relation in THRESHOLDS:
+        pairs = [(s, t) for s, t, r, _ in mappings if r == relation]
+        right = sum(1 for s, t in pairs if truth.get(s) == t)
+        print(f"{relation:11s} {len(pairs):7,} emitted, precision {right / max(len(pairs), 1):.1%}")
+    right = sum(1 for s, t, _, _ in mappings if truth.get(s) == t)
+    print(f"total      {t3 - t0:6.2f}s  recall of exact+close: {right / max(len(truth), 1):.1%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
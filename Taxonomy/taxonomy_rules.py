@@ -0,0 +1,476 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compiled rule evaluation for products
+-------------------------------------
+Evaluates the mockup's Rule sets (domain.ts: Rule with TaxonomyCondition
+HasConcept and FeatureCondition FeatureExists / ValueInRange, evaluated one
+product and one rule at a time by evaluateRules() in App.tsx) over whole
+catalogues.
+
+A rule passes when all of its conditions hold (a rule without conditions
+always passes). The conditions keep App.tsx's semantics, except that
+HasConcept also matches tags UNDER the concept (taxonomy navigation):
+- HasConcept on Product / Feature: a product tag / a feature tag is the
+  concept or one of its descendants (tags unknown to the taxonomy, such as
+  the mockup's "C-Flight", match by equality only)
+- HasConcept on FeatureValue: a value's referenceSystemId, same matching
+- FeatureExists: a feature with that name
+- ValueInRange: the first feature with that name has a SingleValue number
+  in [min, max] or a ValueRange overlapping it (open ends allowed; inverted
+  ranges never match; DiscreteSet values are ignored, as in App.tsx)
+
+Compilation
+- identical conditions are shared between rules; each rule needs a count
+  of distinct satisfied conditions
+- HasConcept conditions are pushed down once to every descendant of their
+  concept (descendants from taxonomy_closure.py), so a tag finds its
+  conditions with one lookup
+- ValueInRange conditions are indexed per feature name in a sorted
+  interval index (bounds cut the axis into regions; every region keeps the
+  ranges covering it), so a value finds its ranges with one bisection
+- FeatureExists conditions are indexed by feature name
+
+A product therefore only reaches the rules of the conditions it satisfies.
+For a batch, the satisfied conditions form a sparse products x conditions
+matrix; multiplied by the conditions x rules matrix it gives, per product,
+the satisfied-condition count of every candidate rule, compared with the
+count the rule needs.
+
+Install:
+  pip install rdflib numpy scipy
+
+Examples:
+  python taxonomy_rules.py check export12.ttl --rules rules.json --products products.json --explain
+  python taxonomy_rules.py bench export12.ttl --rules 5000 --products 200000
+"""
+import sys
+import json
+import time
+import random
+import argparse
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+
+from taxonomy_loader import load_graph
+from taxonomy_closure import AncestorClosure
+
+TARGETS = ("Product", "Feature", "FeatureValue")
+CHUNK = 4096  # products per sparse product; keeps the candidate matrix cache-sized
+
+
+def _number(value) -> Optional[float]:
+    """Numeric value of a feature value string (None if not a number)."""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if number != number else number  # NaN
+
+
+class IntervalIndex:
+    """Inclusive [min, max] ranges (None = open end) with stabbing and overlap queries by bisection."""
+
+    def __init__(self, ranges: Iterable[Tuple[Optional[float], Optional[float], int]]):
+        ranges = list(ranges)
+        self.bounds = sorted({v for lo, hi, _ in ranges for v in (lo, hi) if v is not None})
+        # regions: 0 = below bounds[0], 1 = bounds[0], 2 = between bounds[0] and bounds[1], ...
+        regions = 2 * len(self.bounds) + 1
+        starts: List[List[int]] = [[] for _ in range(regions)]
+        ends: List[List[int]] = [[] for _ in range(regions + 1)]
+        for lo, hi, item in ranges:
+            first = 0 if lo is None else self._region(lo)
+            last = regions - 1 if hi is None else self._region(hi)
+            if first <= last:  # min > max never matches
+                starts[first].append(item)
+                ends[last + 1].append(item)
+        self.starts = [tuple(s) for s in starts]
+        self.covering: List[Tuple[int, ...]] = []
+        active = set()
+        for r in range(regions):
+            active.difference_update(ends[r])
+            active.update(starts[r])
+            self.covering.append(tuple(sorted(active)))
+
+    def _region(self, value: float) -> int:
+        i = bisect_left(self.bounds, value)
+        return 2 * i + 1 if i < len(self.bounds) and self.bounds[i] == value else 2 * i
+
+    def point(self, value: float) -> Tuple[int, ...]:
+        """Items whose range contains the value."""
+        return self.covering[self._region(value)]
+
+    def overlap(self, lo: float, hi: float) -> List[int]:
+        """Items whose range overlaps [lo, hi]."""
+        if lo > hi:
+            return []
+        first, last = self._region(lo), self._region(hi)
+        found = list(self.covering[first])
+        for r in range(first + 1, last + 1):
+            found.extend(self.starts[r])
+        return found
+
+
+class RuleSet:
+    """A Rule list compiled against the taxonomy for batch evaluation."""
+
+    def __init__(self, rules: Sequence[dict], closure: AncestorClosure):
+        self.closure = closure
+        self.rules = list(rules)
+        self.rule_ids = [str(r.get("id", i)) for i, r in enumerate(self.rules)]
+        self.conditions: List[dict] = []
+        keys: Dict[tuple, int] = {}
+        rule_conditions: List[List[int]] = []
+        for rule, rule_id in zip(self.rules, self.rule_ids):
+            found = set()
+            for condition in rule.get("conditions", []):
+                key = self._key(condition, rule_id)
+                if key not in keys:
+                    keys[key] = len(self.conditions)
+                    self.conditions.append(condition)
+                found.add(keys[key])
+            rule_conditions.append(sorted(found))
+        # rules without conditions always pass: they hang off one extra condition every product satisfies
+        self._always = len(self.conditions)
+        for conds in rule_conditions:
+            if not conds:
+                conds.append(self._always)
+        self.need = np.array([len(c) for c in rule_conditions], dtype=np.int32)
+        rows = np.fromiter((c for conds in rule_conditions for c in conds), dtype=np.int32)
+        cols = np.repeat(np.arange(len(self.rules), dtype=np.int32), self.need)
+        self._matrix = sp.csr_matrix((np.ones(len(rows), dtype=np.int32), (rows, cols)),
+                                     shape=(len(self.conditions) + 1, len(self.rules)))
+        self._compile()
+
+    @staticmethod
+    def _key(condition: dict, rule_id: str) -> tuple:
+        kind = condition.get("kind")
+        if kind == "HasConcept":
+            target = condition.get("target", "Product")
+            if target not in TARGETS:
+                raise ValueError(f"rule {rule_id}: unknown HasConcept target {target!r}")
+            return kind, target, str(condition["conceptId"])
+        if kind == "FeatureExists":
+            return kind, str(condition["featureName"])
+        if kind == "ValueInRange":
+            bounds = []
+            for name in ("min", "max"):
+                value = condition.get(name)
+                if value is not None and _number(value) is None:
+                    raise ValueError(f"rule {rule_id}: ValueInRange {name} is not a number: {value!r}")
+                bounds.append(None if value is None else _number(value))
+            return (kind, str(condition["featureName"]), *bounds)
+        raise ValueError(f"rule {rule_id}: unknown condition kind {kind!r}")
+
+    def _compile(self) -> None:
+        closure = self.closure
+        down_ptr, down_ids = closure.down_ptr, closure.down_ids
+        # HasConcept: per target, concept index -> conditions (pushed down to descendants),
+        # and tag string -> conditions for concepts the taxonomy does not know
+        self._by_concept: Dict[str, Dict[int, Tuple[int, ...]]] = {}
+        self._by_tag: Dict[str, Dict[str, Tuple[int, ...]]] = {}
+        self._exists: Dict[str, Tuple[int, ...]] = {}
+        pushed = {t: defaultdict(list) for t in TARGETS}
+        exact = {t: defaultdict(list) for t in TARGETS}
+        exists = defaultdict(list)
+        ranges = defaultdict(list)
+        self.unresolved = 0
+        for c, condition in enumerate(self.conditions):
+            kind = condition["kind"]
+            if kind == "HasConcept":
+                target = condition.get("target", "Product")
+                concept = closure.lookup(str(condition["conceptId"]))
+                if concept is None:
+                    exact[target][str(condition["conceptId"])].append(c)
+                    self.unresolved += 1
+                    continue
+                for d in down_ids[down_ptr[concept]:down_ptr[concept + 1]].tolist():
+                    pushed[target][d].append(c)
+            elif kind == "FeatureExists":
+                exists[str(condition["featureName"])].append(c)
+            else:
+                lo, hi = (None if condition.get(k) is None else _number(condition[k]) for k in ("min", "max"))
+                ranges[str(condition["featureName"])].append((lo, hi, c))
+        for target in TARGETS:
+            self._by_concept[target] = {d: tuple(cs) for d, cs in pushed[target].items()}
+            self._by_tag[target] = {tag: tuple(cs) for tag, cs in exact[target].items()}
+        self._exists = {name: tuple(cs) for name, cs in exists.items()}
+        self._ranges = {name: IntervalIndex(rs) for name, rs in ranges.items()}
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    # ---------------- evaluation ----------------
+
+    def _tags(self, target: str, tags: Iterable, found: set) -> None:
+        by_concept, by_tag = self._by_concept[target], self._by_tag[target]
+        if not by_concept and not by_tag:
+            return
+        index = self.closure.index
+        for tag in tags:
+            concept = index.get(tag)
+            hit = by_concept.get(concept) if concept is not None else by_tag.get(tag)
+            if hit:
+                found.update(hit)
+
+    def satisfied(self, item: dict) -> set:
+        """Indices of the conditions a Product (or ProductInstance) satisfies."""
+        product = item.get("product", item)
+        found: set = set()
+        self._tags("Product", product.get("tags", ()), found)
+        features = product.get("features", ())
+        if not features:
+            return found
+        self._tags("Feature", (t for f in features for t in f.get("tags", ())), found)
+        self._tags("FeatureValue", (v.get("referenceSystemId") for f in features for v in f.get("values", ())),
+                   found)
+        seen = set()
+        for feature in features:
+            name = feature.get("name")
+            if name in seen:  # ValueInRange looks at the first feature of a name only
+                continue
+            seen.add(name)
+            hit = self._exists.get(name)
+            if hit:
+                found.update(hit)
+            index = self._ranges.get(name)
+            if index is None:
+                continue
+            for value in feature.get("values", ()):
+                kind = value.get("kind")
+                if kind == "SingleValue":
+                    number = _number(value.get("value"))
+                    if number is not None:
+                        found.update(index.point(number))
+                elif kind == "ValueRange":
+                    lo, hi = _number(value.get("min")), _number(value.get("max"))
+                    if lo is not None and hi is not None:
+                        found.update(index.overlap(lo, hi))
+        return found
+
+    def _evaluate_chunk(self, products: Sequence[dict]) -> Tuple[np.ndarray, np.ndarray]:
+        count = len(products)
+        indptr = np.zeros(count + 1, dtype=np.int64)
+        conds: List[int] = []
+        for p, item in enumerate(products):
+            conds.extend(self.satisfied(item))
+            conds.append(self._always)
+            indptr[p + 1] = len(conds)
+        satisfied = sp.csr_matrix((np.ones(len(conds), dtype=np.int32), np.asarray(conds, dtype=np.int32), indptr),
+                                  shape=(count, self._matrix.shape[0]))
+        hits = satisfied @ self._matrix  # (product, rule) -> satisfied conditions of the rule
+        ok = hits.data == self.need[hits.indices]
+        running = np.zeros(len(ok) + 1, dtype=np.int64)
+        np.cumsum(ok, out=running[1:])
+        out_ptr = running[hits.indptr]
+        rules = hits.indices[ok]
+        # sort the rules of each product (only the passing entries, far fewer than the candidates)
+        rows = np.repeat(np.arange(count, dtype=np.int64), np.diff(out_ptr))
+        return out_ptr, rules[np.lexsort((rules, rows))]
+
+    def evaluate(self, products: Sequence[dict], chunk: int = CHUNK) -> Tuple[np.ndarray, np.ndarray]:
+        """(indptr, rule indices): the rules every product passes, as CSR."""
+        ptrs, rules = [np.zeros(1, dtype=np.int64)], []
+        for start in range(0, len(products), chunk):
+            ptr, ids = self._evaluate_chunk(products[start:start + chunk])
+            ptrs.append(ptr[1:] + ptrs[-1][-1])
+            rules.append(ids)
+        return np.concatenate(ptrs), (np.concatenate(rules) if rules else np.zeros(0, dtype=np.int32))
+
+    def passed(self, products: Sequence[dict]) -> List[List[str]]:
+        """Ids of the rules every product passes."""
+        indptr, rules = self.evaluate(products)
+        ids = self.rule_ids
+        flat = [ids[r] for r in rules.tolist()]
+        bounds = indptr.tolist()
+        return [flat[bounds[p]:bounds[p + 1]] for p in range(len(products))]
+
+    def explain(self, item: dict) -> List[dict]:
+        """Per rule {ruleId, name, passed, details}, the shape App.tsx's evaluateRules() returns."""
+        found = self.satisfied(item)
+        keys = {self._key(c, ""): i for i, c in enumerate(self.conditions)}
+        out = []
+        for rule, rule_id in zip(self.rules, self.rule_ids):
+            details = []
+            for condition in rule.get("conditions", []):
+                ok = keys[self._key(condition, rule_id)] in found
+                kind = condition["kind"]
+                if kind == "HasConcept":
+                    what = f"Concept {condition['conceptId']} on {condition.get('target', 'Product')}"
+                elif kind == "FeatureExists":
+                    what = f"Feature '{condition['featureName']}' exists"
+                else:
+                    what = f"{condition['featureName']} within [{condition.get('min', '')}, {condition.get('max', '')}]"
+                details.append(("✓ " if ok else "✗ ") + what)
+            out.append({"ruleId": rule_id, "name": rule.get("name", ""),
+                        "passed": all(d.startswith("✓") for d in details), "details": details})
+        return out
+
+
+# ---------------- synthetic catalogue ----------------
+
+def _synthetic(closure: AncestorClosure, rules: int, products: int, seed: int) -> Tuple[List[dict], List[dict]]:
+    rnd = random.Random(seed)
+    ids = closure.ids
+    leaves = np.flatnonzero(np.diff(closure.down_ptr) == 1).tolist()
+    inner = np.flatnonzero(np.diff(closure.down_ptr) > 1).tolist() or leaves
+    names = [f"F{i}" for i in range(200)]
+    numeric = names[:50]
+    rule_list = []
+    for r in range(rules):
+        conditions = []
+        for _ in range(rnd.randint(1, 3)):
+            roll = rnd.random()
+            if roll < 0.5:
+                concept = ids[rnd.choice(inner if rnd.random() < 0.5 else leaves)]
+                target = rnd.choices(TARGETS, weights=(6, 3, 1))[0]
+                conditions.append({"kind": "HasConcept", "conceptId": concept, "target": target})
+            elif roll < 0.75:
+                conditions.append({"kind": "FeatureExists", "featureName": rnd.choice(names)})
+            else:
+                lo = rnd.randint(0, 900)
+                cond = {"kind": "ValueInRange", "featureName": rnd.choice(numeric), "min": lo,
+                        "max": lo + rnd.randint(1, 200)}
+                if rnd.random() < 0.1:
+                    del cond[rnd.choice(("min", "max"))]
+                conditions.append(cond)
+        rule_list.append({"id": f"R{r}", "name": f"rule {r}", "conditions": conditions})
+    product_list = []
+    for p in range(products):
+        features = []
+        for name in rnd.sample(names, rnd.randint(2, 6)):
+            if name in numeric:
+                if rnd.random() < 0.8:
+                    values = [{"kind": "SingleValue", "value": str(rnd.randint(0, 1000))}]
+                else:
+                    lo = rnd.randint(0, 1000)
+                    values = [{"kind": "ValueRange", "min": str(lo), "max": str(lo + rnd.randint(0, 100))}]
+            else:
+                values = [{"kind": "SingleValue", "value": "x", "referenceSystemId": ids[rnd.choice(leaves)]}]
+            features.append({"id": name, "name": name, "values": values, "tags": [ids[rnd.choice(leaves)]]})
+        product_list.append({"id": f"P{p}", "name": f"product {p}", "lifecycleStatus": "Active",
+                             "tags": [ids[rnd.choice(leaves)] for _ in range(rnd.randint(1, 5))],
+                             "features": features})
+    return rule_list, product_list
+
+
+def _evaluate_naive(rules: Sequence[dict], item: dict, closure: AncestorClosure) -> List[bool]:
+    """Reference evaluation, one rule and condition at a time (as App.tsx does, with descendants)."""
+    product = item.get("product", item)
+    features = product.get("features", [])
+
+    def under(tag, concept_id) -> bool:
+        tag_i, concept = closure.lookup(tag), closure.lookup(concept_id)
+        if tag_i is None or concept is None:
+            return tag == concept_id
+        return bool(closure.descendants_mask(concept)[tag_i])
+
+    def holds(condition) -> bool:
+        kind = condition["kind"]
+        if kind == "HasConcept":
+            target = condition.get("target", "Product")
+            if target == "Product":
+                tags = product.get("tags", [])
+            elif target == "Feature":
+                tags = [t for f in features for t in f.get("tags", [])]
+            else:
+                tags = [v.get("referenceSystemId") for f in features for v in f.get("values", [])]
+            return any(under(t, condition["conceptId"]) for t in tags if t is not None)
+        if kind == "FeatureExists":
+            return any(f.get("name") == condition["featureName"] for f in features)
+        feature = next((f for f in features if f.get("name") == condition["featureName"]), None)
+        lo, hi = condition.get("min"), condition.get("max")
+        for value in (feature or {}).get("values", []):
+            if value.get("kind") == "SingleValue":
+                n = _number(value.get("value"))
+                if n is not None and (lo is None or n >= lo) and (hi is None or n <= hi) \
+                        and (lo is None or hi is None or lo <= hi):
+                    return True
+            elif value.get("kind") == "ValueRange":
+                a, b = _number(value.get("min")), _number(value.get("max"))
+                if a is not None and b is not None and a <= b and (lo is None or b >= lo) \
+                        and (hi is None or a <= hi) and (lo is None or hi is None or lo <= hi):
+                    return True
+        return False
+
+    return [all(holds(c) for c in rule.get("conditions", [])) for rule in rules]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Evaluate domain.ts rules over products, compiled against the taxonomy")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p_check = sub.add_parser("check", help="Evaluate a JSON rule list over a JSON product list")
+    p_check.add_argument("sources", nargs="+")
+    p_check.add_argument("--rules", required=True, help="JSON file: list of Rule")
+    p_check.add_argument("--products", required=True, help="JSON file: list of products or product instances")
+    p_check.add_argument("--explain", action="store_true", help="Per rule details, as evaluateRules() in App.tsx")
+    p_check.add_argument("--out", help="Write the JSON result here (default: stdout)")
+    p_bench = sub.add_parser("bench", help="Evaluations per second on a synthetic rule set and catalogue")
+    p_bench.add_argument("sources", nargs="+")
+    p_bench.add_argument("--rules", type=int, default=5000)
+    p_bench.add_argument("--products", type=int, default=100_000)
+    p_bench.add_argument("--verify", type=int, default=200, help="Cross-check this many products naively")
+    p_bench.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    closure = AncestorClosure(load_graph(args.sources, store="compact"))
+
+    if args.cmd == "check":
+        with open(args.rules, "r", encoding="utf-8") as f:
+            rules = json.load(f)
+        with open(args.products, "r", encoding="utf-8") as f:
+            products = json.load(f)
+        ruleset = RuleSet(rules, closure)
+        pid = lambda item: str(item.get("id", item.get("product", {}).get("id", "")))
+        if args.explain:
+            result = {pid(item): ruleset.explain(item) for item in products}
+        else:
+            result = {pid(item): ids for item, ids in zip(products, ruleset.passed(products))}
+        text = json.dumps(result, ensure_ascii=False, indent=2)
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as f:
+                f.write(text)
+            print(f"[OK] {len(products)} products x {len(ruleset)} rules: {args.out}")
+        else:
+            print(text)
+        if ruleset.unresolved:
+            print(f"[WARN] {ruleset.unresolved} HasConcept condition(s) name concepts not in the taxonomy "
+                  f"(matched by equality)", file=sys.stderr)
+        return 0
+
+    rules, products = _synthetic(closure, args.rules, args.products, args.seed)
+    t0 = time.perf_counter()
+    ruleset = RuleSet(rules, closure)
+    compiled = time.perf_counter() - t0
+    print(f"{len(rules)} rules ({len(ruleset.conditions)} distinct conditions) compiled in {compiled:.2f}s; "
+          f"{len(closure)} concepts")
+    t0 = time.perf_counter()
+    indptr, passed = ruleset.evaluate(products)
+    elapsed = time.perf_counter() - t0
+    candidates = sum(len(ruleset.satisfied(p)) for p in products[:1000]) / min(len(products), 1000)
+    print(f"evaluate {len(products):,} products: {elapsed:.2f}s  {len(products) / elapsed:,.0f} products/s  "
+          f"{len(products) * len(rules) / elapsed:,.0f} rule evaluations/s")
+    print(f"  {candidates:.1f} satisfied conditions per product, {len(passed) / len(products):.2f} rules passed "
+          f"per product")
+    if args.verify:
+        sample = products[:args.verify]
+        t0 = time.perf_counter()
+        expected = [_evaluate_naive(rules, p, closure) for p in sample]
+        naive = time.perf_counter() - t0
+        got = ruleset.evaluate(sample)
+        mismatches = 0
+        for p, row in enumerate(expected):
+            want = {r for r, ok in enumerate(row) if ok}
+            mismatches += want != set(got[1][got[0][p]:got[0][p + 1]].tolist())
+        print(f"verify   {len(sample)} products naively: {mismatches} mismatches "
+              f"(naive: {len(sample) * len(rules) / naive:,.0f} rule evaluations/s)")
+        return 1 if mismatches else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
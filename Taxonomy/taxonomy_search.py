@@ -0,0 +1,388 @@
+# taxonomy_search.py
+"""
+Multilingual full-text and typeahead search over the taxonomy.
+
+Indexes the skos:prefLabel, skos:altLabel and skos:definition literals of
+every concept in every language (the en/fr/de/es labels of export12.ttl):
+
+- tokens are accent-folded and lower-cased ("Végétarien" -> "vegetarien"),
+  so queries match with or without accents
+- inverted index with BM25 ranking; a term's frequency is weighted by field
+  (prefLabel 3, altLabel 2, definition 1). Each posting list stores the
+  final BM25 contribution ("impact") per concept, sorted by impact, so a
+  query only adds up precomputed scores (NumPy)
+- typeahead: for every label-word prefix of up to PREFIX_LENGTH characters
+  the best SUGGEST_DEPTH concepts (shortest labels first) are precomputed
+  (edge n-grams); "asian veg" ranks the concepts matching "asian" and keeps
+  those with a label word starting with "veg"
+
+The index is pickled next to its sources' size/mtime: open_index() loads it
+when it is fresh and rebuilds (and saves) it otherwise, so the lookup
+service and the CLI start without re-tokenising.
+
+Usage:
+  from taxonomy_search import open_index
+  index = open_index(["export12.ttl"], "export12.search")
+  index.search("vegetarien asiatique")   # [(uri, label, score), ...]
+  index.suggest("asian veg")
+
+  python taxonomy_search.py build export12.ttl --index export12.search
+  python taxonomy_search.py query --index export12.search "végétarien"
+  python taxonomy_search.py suggest --index export12.search "veg"
+  python taxonomy_search.py bench --index big.search --queries 10000
+"""
+
+import os
+import re
+import sys
+import time
+import pickle
+import random
+import argparse
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from rdflib import URIRef, Literal
+from rdflib.namespace import RDF, SKOS
+
+from taxonomy_loader import load_graph, source_info
+
+INDEX_FORMAT = "skos-search-index"
+INDEX_VERSION = 1
+FIELD_WEIGHTS = {"pref": 3.0, "alt": 2.0, "definition": 1.0}
+K1 = 1.2
+B = 0.75
+PREFIX_LENGTH = 8      # edge n-grams up to this length; longer prefixes scan the vocabulary
+SUGGEST_DEPTH = 50     # concepts kept per edge n-gram
+TOKEN = re.compile(r"\w+")
+
+Result = Tuple[str, str, float]  # (uri, label, score)
+
+
+def fold(text: str) -> str:
+    """Lower case without accents ("Végétarien" -> "vegetarien")."""
+    if text.isascii():
+        return text.lower()
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+@lru_cache(maxsize=1 << 18)
+def _fold_word(word: str) -> str:
+    return fold(word)
+
+
+def tokenize(text: str) -> List[str]:
+    text = text.casefold()
+    if not text.isascii():
+        text = unicodedata.normalize("NFC", text)  # decomposed accents would split words
+    return [_fold_word(w) for w in TOKEN.findall(text)]
+
+
+class SearchIndex:
+    """BM25 inverted index plus edge n-gram typeahead; immutable once built."""
+
+    def __init__(self, uris: List[str], labels: List[str], label_words: List[str],
+                 terms: List[str], offsets: np.ndarray, post_docs: np.ndarray, post_scores: np.ndarray,
+                 prefixes: List[str], prefix_offsets: np.ndarray, prefix_docs: np.ndarray,
+                 label_terms: List[str]):
+        self.uris = uris                  # doc -> concept URI
+        self.labels = labels              # doc -> display label
+        self.label_words = label_words    # doc -> " word word ..." (folded label words, all languages)
+        self.terms = terms                # sorted vocabulary
+        self.offsets = offsets            # CSR: postings of terms[i] are [offsets[i], offsets[i+1])
+        self.post_docs = post_docs
+        self.post_scores = post_scores
+        self.prefixes = prefixes          # sorted edge n-grams
+        self.prefix_offsets = prefix_offsets
+        self.prefix_docs = prefix_docs
+        self.label_terms = label_terms    # sorted label vocabulary (prefixes longer than PREFIX_LENGTH)
+        self._term_ids = {t: i for i, t in enumerate(terms)}
+        self._prefix_ids = {p: i for i, p in enumerate(prefixes)}
+
+    # ---------------- building ----------------
+
+    @classmethod
+    def from_graph(cls, graph, langs: Optional[Sequence[str]] = None) -> "SearchIndex":
+        wanted = {l.lower() for l in langs} if langs else None
+        fields = {SKOS.prefLabel: "pref", SKOS.altLabel: "alt", SKOS.definition: "definition", RDF.type: "type"}
+        texts = defaultdict(list)  # uri -> [(field, lang, text)]
+        concepts = []
+        for s, p, o in graph.triples((None, None, None)):
+            field = fields.get(p)
+            if field is None:
+                continue
+            if field == "type":
+                if o == SKOS.Concept and isinstance(s, URIRef):
+                    concepts.append(s)
+            elif isinstance(o, Literal):
+                lang = (o.language or "").lower()
+                if wanted is None or not lang or lang in wanted:
+                    texts[s].append((field, lang, str(o)))
+
+        uris, labels, label_words = [], [], []
+        tf: Dict[str, Dict[int, float]] = defaultdict(dict)
+        lengths = []
+        for c in dict.fromkeys(concepts):
+            doc = len(uris)
+            entries = texts.get(c, [])
+            pref = [(lang, text) for field, lang, text in entries if field == "pref"]
+            label = next((text for lang, text in pref if lang == "en"), pref[0][1] if pref else None)
+            uris.append(str(c))
+            labels.append(label or re.split(r"[#/]", str(c))[-1])
+            words = {}
+            length = 0.0
+            for field, _, text in entries:
+                weight = FIELD_WEIGHTS[field]
+                for term in tokenize(text):
+                    postings = tf[term]
+                    postings[doc] = postings.get(doc, 0.0) + weight
+                    length += weight
+                    if field != "definition":
+                        words[term] = None
+            lengths.append(length)
+            label_words.append(" " + " ".join(words) + " ")
+
+        # BM25 impacts, each posting list sorted by impact
+        n = len(uris)
+        lengths_arr = np.asarray(lengths, dtype=np.float64)
+        avgdl = float(lengths_arr.mean()) if n else 1.0
+        norm = K1 * (1 - B + B * lengths_arr / (avgdl or 1.0))
+        terms = sorted(tf)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        doc_parts, score_parts = [], []
+        for i, term in enumerate(terms):
+            postings = tf[term]
+            docs = np.fromiter(postings.keys(), dtype=np.int32, count=len(postings))
+            freqs = np.fromiter(postings.values(), dtype=np.float64, count=len(postings))
+            idf = np.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            scores = idf * freqs * (K1 + 1) / (freqs + norm[docs])
+            order = np.argsort(-scores, kind="stable")
+            doc_parts.append(docs[order])
+            score_parts.append(scores[order].astype(np.float32))
+            offsets[i + 1] = offsets[i] + len(docs)
+        post_docs = np.concatenate(doc_parts) if doc_parts else np.zeros(0, dtype=np.int32)
+        post_scores = np.concatenate(score_parts) if score_parts else np.zeros(0, dtype=np.float32)
+
+        # Edge n-grams over label words: docs in (label length, label) order, first SUGGEST_DEPTH per prefix
+        edge: Dict[str, List[int]] = defaultdict(list)
+        prefixes_of: Dict[str, List[str]] = {}
+        for doc in sorted(range(n), key=lambda d: (len(labels[d]), fold(labels[d]), d)):
+            seen = set()
+            for word in label_words[doc].split():
+                word_prefixes = prefixes_of.get(word)
+                if word_prefixes is None:
+                    word_prefixes = prefixes_of[word] = [word[:k] for k in range(1, min(len(word), PREFIX_LENGTH) + 1)]
+                for prefix in word_prefixes:
+                    if prefix not in seen:
+                        seen.add(prefix)
+                        bucket = edge[prefix]
+                        if len(bucket) < SUGGEST_DEPTH:
+                            bucket.append(doc)
+        prefixes = sorted(edge)
+        prefix_offsets = np.zeros(len(prefixes) + 1, dtype=np.int64)
+        prefix_offsets[1:] = np.cumsum([len(edge[p]) for p in prefixes])
+        prefix_docs = np.fromiter((d for p in prefixes for d in edge[p]), dtype=np.int32,
+                                  count=int(prefix_offsets[-1]))
+        label_terms = sorted({w for words in label_words for w in words.split()})
+        return cls(uris, labels, label_words, terms, offsets, post_docs, post_scores,
+                   prefixes, prefix_offsets, prefix_docs, label_terms)
+
+    # ---------------- queries ----------------
+
+    def _postings(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        i = self._term_ids.get(term)
+        if i is None:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)
+        lo, hi = self.offsets[i], self.offsets[i + 1]
+        return self.post_docs[lo:hi], self.post_scores[lo:hi]
+
+    def _rank(self, terms: Sequence[str], limit: int) -> List[Tuple[int, float]]:
+        """Top (doc, score) by summed BM25 impacts of the terms."""
+        lists = [self._postings(t) for t in dict.fromkeys(terms)]
+        lists = [(d, s) for d, s in lists if len(d)]
+        if not lists:
+            return []
+        if len(lists) == 1:
+            docs, scores = lists[0]
+            return list(zip(docs[:limit].tolist(), scores[:limit].tolist()))
+        docs = np.concatenate([d for d, _ in lists])
+        scores = np.concatenate([s for _, s in lists])
+        if len(docs) > len(self.uris) // 8:
+            totals = np.bincount(docs, weights=scores, minlength=len(self.uris))
+            candidates = np.flatnonzero(totals)
+            totals = totals[candidates]
+        else:
+            candidates, inverse = np.unique(docs, return_inverse=True)
+            totals = np.bincount(inverse, weights=scores)
+        if len(candidates) > limit:
+            top = np.argpartition(-totals, limit - 1)[:limit]
+        else:
+            top = np.arange(len(candidates))
+        top = top[np.lexsort((candidates[top], -totals[top]))]
+        return list(zip(candidates[top].tolist(), totals[top].tolist()))
+
+    def _results(self, ranked: List[Tuple[int, float]]) -> List[Result]:
+        return [(self.uris[d], self.labels[d], round(s, 4)) for d, s in ranked]
+
+    def search(self, query: str, limit: int = 10) -> List[Result]:
+        """Full-text search, BM25-ranked: [(uri, label, score)]."""
+        return self._results(self._rank(tokenize(query), limit))
+
+    def suggest(self, query: str, limit: int = 10) -> List[Result]:
+        """Typeahead: the last word of the query is a prefix of a label word."""
+        terms = tokenize(query)
+        if not terms:
+            return []
+        if query[-1:].isspace():
+            return self.search(query, limit)
+        prefix, complete = terms[-1], terms[:-1]
+        if complete:
+            ranked = self._rank(complete, max(limit * 20, 200))
+            needle = " " + prefix
+            return self._results([(d, s) for d, s in ranked if needle in self.label_words[d]][:limit])
+        if len(prefix) <= PREFIX_LENGTH:
+            i = self._prefix_ids.get(prefix)
+            if i is None:
+                return []
+            lo, hi = self.prefix_offsets[i], self.prefix_offsets[i + 1]
+            docs = self.prefix_docs[lo:min(hi, lo + limit)]
+            return self._results([(d, 0.0) for d in docs.tolist()])
+        # Long prefix: expand over the label vocabulary (a narrow range by now)
+        lo = bisect_left(self.label_terms, prefix)
+        expanded = []
+        while lo < len(self.label_terms) and self.label_terms[lo].startswith(prefix) and len(expanded) < 64:
+            expanded.append(self.label_terms[lo])
+            lo += 1
+        return self.search(" ".join(expanded), limit) if expanded else []
+
+    def __len__(self) -> int:
+        return len(self.uris)
+
+    # ---------------- persistence ----------------
+
+    def save(self, path: str, sources: Sequence[dict] = (), langs: Optional[Sequence[str]] = None) -> None:
+        """Pickle header + index atomically (tmp file + rename); `langs` as passed to from_graph."""
+        header = {"format": INDEX_FORMAT, "version": INDEX_VERSION, "sources": list(sources),
+                  "langs": _langs_key(langs)}
+        state = {k: v for k, v in self.__dict__.items() if not k.startswith("_")}
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def read_header(path: str) -> Optional[dict]:
+        try:
+            with open(path, "rb") as f:
+                header = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        if not isinstance(header, dict) or header.get("format") != INDEX_FORMAT:
+            return None
+        return header
+
+    @classmethod
+    def load(cls, path: str) -> "SearchIndex":
+        with open(path, "rb") as f:
+            header = pickle.load(f)
+            if not isinstance(header, dict) or header.get("format") != INDEX_FORMAT:
+                raise ValueError(f"{path} is not a search index")
+            if header.get("version") != INDEX_VERSION:
+                raise ValueError(f"{path}: index version {header.get('version')}, expected {INDEX_VERSION}")
+            return cls(**pickle.load(f))
+
+
+def _sources_key(infos: Sequence[dict]) -> List[list]:
+    return [[i.get("path"), i.get("size"), i.get("mtime_ns")] for i in infos]
+
+
+def _langs_key(langs: Optional[Sequence[str]]) -> Optional[List[str]]:
+    return sorted({l.lower() for l in langs}) if langs else None  # None: every language
+
+
+def open_index(sources: Sequence[str], path: str, graph=None, langs: Optional[Sequence[str]] = None) -> SearchIndex:
+    """
+    The index at `path` if it matches the sources and languages, else a fresh one
+    (from `graph` if given), saved there.
+    """
+    current = [source_info(p) for p in sources]
+    header = SearchIndex.read_header(path)
+    if header is not None and header.get("version") == INDEX_VERSION \
+            and _sources_key(header.get("sources", [])) == _sources_key(current) \
+            and "langs" in header and header["langs"] == _langs_key(langs):
+        return SearchIndex.load(path)
+    index = SearchIndex.from_graph(graph if graph is not None else load_graph(list(sources), store="compact"), langs)
+    index.save(path, current, langs)
+    return index
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Build and query the taxonomy search index")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p_build = sub.add_parser("build", help="Index the sources")
+    p_build.add_argument("sources", nargs="+")
+    p_build.add_argument("--langs", help="Index only these languages (comma-separated)")
+    p_query = sub.add_parser("query", help="Full-text search")
+    p_suggest = sub.add_parser("suggest", help="Typeahead suggestions")
+    for p in (p_query, p_suggest):
+        p.add_argument("text")
+        p.add_argument("--limit", type=int, default=10)
+    p_bench = sub.add_parser("bench", help="Measure query latency with words sampled from the index")
+    p_bench.add_argument("--queries", type=int, default=10000)
+    for p in (p_build, p_query, p_suggest, p_bench):
+        p.add_argument("--index", required=True, help="Index file")
+    args = ap.parse_args()
+
+    if args.cmd == "build":
+        t0 = time.perf_counter()
+        g = load_graph(args.sources, store="compact")
+        langs = [l.strip() for l in args.langs.split(",") if l.strip()] if args.langs else None
+        index = SearchIndex.from_graph(g, langs)
+        index.save(args.index, [source_info(p) for p in args.sources], langs)
+        print(f"[OK] {len(index)} concepts, {len(index.terms)} terms, {len(index.prefixes)} prefixes -> "
+              f"{args.index} ({os.path.getsize(args.index) / 1024:.0f} KiB, {time.perf_counter() - t0:.2f}s)")
+        return 0
+
+    t0 = time.perf_counter()
+    index = SearchIndex.load(args.index)
+    loaded = time.perf_counter() - t0
+    if args.cmd in ("query", "suggest"):
+        t1 = time.perf_counter()
+        results = index.search(args.text, args.limit) if args.cmd == "query" else index.suggest(args.text, args.limit)
+        elapsed = time.perf_counter() - t1
+        for uri, label, score in results:
+            print(f"{score:8.3f}  {label}  <{uri}>")
+        print(f"({len(results)} results in {elapsed * 1000:.3f} ms; index loaded in {loaded:.2f}s)")
+        return 0
+
+    rnd = random.Random(0)
+    words = [w for w in index.label_terms if len(w) > 2] or index.label_terms
+    cases = {
+        "search 1 word": [rnd.choice(words) for _ in range(args.queries)],
+        "search 2 words": [f"{rnd.choice(words)} {rnd.choice(words)}" for _ in range(args.queries)],
+        "suggest prefix": [(w := rnd.choice(words))[:rnd.randint(1, len(w))] for _ in range(args.queries)],
+        "suggest word + prefix": [f"{rnd.choice(words)} {(w := rnd.choice(words))[:rnd.randint(1, len(w))]}"
+                                  for _ in range(args.queries)],
+    }
+    print(f"{len(index)} concepts, {len(index.terms)} terms; index loaded in {loaded:.2f}s")
+    for name, queries in cases.items():
+        run = index.search if name.startswith("search") else index.suggest
+        times = []
+        for q in queries:
+            t1 = time.perf_counter()
+            run(q)
+            times.append(time.perf_counter() - t1)
+        times.sort()
+        print(f"  {name:24s} p50 {times[len(times) // 2] * 1e3:.3f} ms  "
+              f"p99 {times[int(len(times) * 0.99)] * 1e3:.3f} ms  max {times[-1] * 1e3:.3f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Read-only taxonomy lookup service
+---------------------------------
+Loads the vocabulary once, precomputes its indexes and answers lookups by
+ConceptID over HTTP, so product systems no longer parse the TTL themselves.
+
+Endpoints (GET, JSON; {id} is a ConceptID such as E7Y63352 or a full URI):
+  /health                       version, sources, counts
+  /concepts/{id}                label, labels per language, definition,
+                                broader/narrower/related, linked SSRs, facet
+  /concepts/{id}/children       narrower concepts (id + label), label order
+  /concepts/{id}/ancestors      all broader ancestors, nearest first
+  /concepts/{id}/facet          the top-term facet the concept belongs to
+  /facets                       all facets
+  /facets/{id}                  the concepts of one facet
+  /search?q=vegetarien&limit=10 full-text search, BM25-ranked (taxonomy_search.py)
+  /suggest?q=asian veg          typeahead: the last word is a label-word prefix
+  /ssr/{code}                   concepts linked to an SSR code (apmwg:linkedSSR)
+
+Serving
+- HTTP/1.1 with keep-alive (ThreadingHTTPServer, one thread per connection)
+- every response carries an ETag (snapshot version + body hash);
+  If-None-Match answers 304 without a body
+- encoded responses are kept in a per-snapshot LRU cache
+- hot-swap: the sources are polled (--watch seconds, 0 = off; SIGHUP forces a
+  reload). A new index is built in the background and swapped in with one
+  assignment; requests in flight finish on the index they started with, and
+  a source that fails to load keeps the previous index serving.
+
+A concept's facet is the first top term (by label) it can be reached from,
+as in taxonomy_shards.py and taxonomy_bundle.py.
+
+Install:
+  pip install rdflib numpy
+
+Examples:
+  python taxonomy_service.py export12.ttl SSR.ttl --port 8765
+  curl -s localhost:8765/concepts/E7Y63352/ancestors
+  python taxonomy_service_bench.py --url http://127.0.0.1:8765
+"""
+import sys
+import json
+import time
+import signal
+import socket
+import hashlib
+import argparse
+import threading
+from collections import OrderedDict, defaultdict
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from rdflib import URIRef, Literal
+from rdflib.namespace import RDF, RDFS, SKOS
+
+from taxonomy_loader import load_graph, source_info
+from skos_traversal import traverse, ancestors
+from taxonomy_search import SearchIndex, open_index
+
+DEFAULT_PORT = 8765
+RESPONSE_CACHE_SIZE = 50_000
+SEARCH_LIMIT = 10
+
+
+def concept_id(uri) -> str:
+    """Local name of the URI (the ConceptID for apmwg concepts)."""
+    s = str(uri)
+    return s[max(s.rfind("#"), s.rfind("/")) + 1:] or s
+
+
+def sources_signature(sources: Sequence[str]) -> List[Tuple[int, int]]:
+    infos = [source_info(p) for p in sources]
+    return [(i["size"], i["mtime_ns"]) for i in infos]
+
+
+class TaxonomyIndex:
+    """Immutable lookup indexes over one snapshot of the sources."""
+
+    def __init__(self, sources: Sequence[str], search_index: Optional[str] = None):
+        t0 = time.perf_counter()
+        self.sources = list(sources)
+        self.signature = sources_signature(self.sources)
+        digest = hashlib.sha256()
+        for path in self.sources:
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+        self.version = digest.hexdigest()[:16]
+        g = load_graph(self.sources, store="compact")
+        self._build(g)
+        # Serialised search index: loaded when it matches the sources, else rebuilt from g and saved
+        self.search_index = open_index(self.sources, search_index, graph=g) if search_index \
+            else SearchIndex.from_graph(g)
+        self.build_seconds = time.perf_counter() - t0
+        self._cache: "OrderedDict[str, Tuple[int, bytes, str]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    def _build(self, g) -> None:
+        types = defaultdict(set)
+        pref = defaultdict(list)  # uri -> [(lang, text)]
+        rdfs_label = {}
+        definition = defaultdict(list)
+        parents = defaultdict(list)
+        children = defaultdict(list)
+        related = defaultdict(list)
+        ssr_links = defaultdict(list)  # concept -> [SSR uri]
+        kind_of: Dict = {}
+        known = {RDF.type: "type", SKOS.prefLabel: "pref", RDFS.label: "label", SKOS.definition: "def",
+                 SKOS.broader: "broader", SKOS.narrower: "narrower", SKOS.related: "related"}
+        for s, p, o in g.triples((None, None, None)):
+            kind = kind_of.get(p, "?")
+            if kind == "?":
+                kind = kind_of[p] = known.get(p) or ("ssr" if concept_id(p) == "linkedSSR" else None)
+            if kind is None:
+                continue
+            if kind == "type":
+                types[s].add(o)
+            elif kind == "pref":
+                if isinstance(o, Literal):
+                    pref[s].append(((o.language or "").lower(), str(o).strip()))
+            elif kind == "label":
+                rdfs_label.setdefault(s, str(o).strip())
+            elif kind == "def":
+                if isinstance(o, Literal):
+                    definition[s].append(((o.language or "").lower(), str(o).strip()))
+            elif kind == "broader":
+                parents[s].append(o)
+                children[o].append(s)
+            elif kind == "narrower":
+                parents[o].append(s)
+                children[s].append(o)
+            elif kind == "related":
+                related[s].append(o)
+                related[o].append(s)
+            else:
+                ssr_links[s].append(o)
+
+        def pick(pairs: List[Tuple[str, str]]) -> Optional[str]:
+            for lang, text in pairs:
+                if lang == "en":
+                    return text
+            return pairs[0][1] if pairs else None
+
+        def label_of(uri) -> str:
+            return pick(pref.get(uri, [])) or rdfs_label.get(uri) or concept_id(uri)
+
+        concepts = [s for s, t in types.items() if SKOS.Concept in t and isinstance(s, URIRef)]
+        concept_set = set(concepts)
+        labels = {c: label_of(c) for c in concepts}
+        order = lambda u: (labels.get(u, "").lower(), str(u))
+        concepts.sort(key=order)
+        kids = {c: sorted((k for k in dict.fromkeys(children.get(c, ())) if k in concept_set), key=order)
+                for c in concepts}
+
+        # Facets: first top term (by label) a concept is reachable from
+        facet_of: Dict = {}
+        facets = []
+        visited = set()
+        for top in (c for c in concepts if not parents.get(c)):
+            members = []
+            traverse([top], kids.__getitem__, pre=lambda node, depth, parent: members.append(node),
+                     visited=visited)
+            for c in members:
+                facet_of[c] = top
+            facets.append({"id": concept_id(top), "label": labels[top], "concepts": [concept_id(c) for c in members]})
+
+        ref = lambda u: {"id": concept_id(u), "label": labels.get(u, concept_id(u))}
+        self.concepts: Dict[str, dict] = {}
+        self.children: Dict[str, list] = {}
+        self.ancestors: Dict[str, list] = {}
+        self.ssr: Dict[str, list] = defaultdict(list)
+        for c in concepts:
+            cid = concept_id(c)
+            facet = facet_of.get(c)
+            record = {"id": cid, "uri": str(c), "label": labels[c]}
+            by_lang = {lang or "und": text for lang, text in reversed(pref.get(c, []))}
+            if by_lang:
+                record["labels"] = dict(sorted(by_lang.items()))
+            if definition.get(c):
+                record["definition"] = pick(definition[c])
+            for key, values in (("broader", parents.get(c)), ("narrower", kids[c]), ("related", related.get(c))):
+                if values:
+                    record[key] = [ref(u) for u in dict.fromkeys(values)]
+            if ssr_links.get(c):
+                record["ssr"] = [concept_id(u) for u in dict.fromkeys(ssr_links[c])]
+                for u in record["ssr"]:
+                    self.ssr[u].append(ref(c))
+            record["facet"] = ref(facet) if facet is not None else None
+            self.concepts[cid] = record
+            self.children[cid] = [ref(u) for u in kids[c]]
+            self.ancestors[cid] = [ref(u) for u in ancestors(c, lambda n: parents.get(n, ()))]
+        self.ssr = dict(self.ssr)
+        self.facets = facets
+        self._facet_by_id = {f["id"]: f for f in facets}
+        self._uri_to_id = {str(c): concept_id(c) for c in concepts}
+
+    # ---------------- lookups (payload or None for 404) ----------------
+
+    def resolve(self, key: str) -> Optional[str]:
+        if key in self.concepts:
+            return key
+        return self._uri_to_id.get(key)
+
+    def concept(self, key: str) -> Optional[dict]:
+        cid = self.resolve(key)
+        return self.concepts[cid] if cid else None
+
+    def concept_children(self, key: str) -> Optional[dict]:
+        cid = self.resolve(key)
+        return {"id": cid, "children": self.children[cid]} if cid else None
+
+    def concept_ancestors(self, key: str) -> Optional[dict]:
+        cid = self.resolve(key)
+        return {"id": cid, "ancestors": self.ancestors[cid]} if cid else None
+
+    def concept_facet(self, key: str) -> Optional[dict]:
+        cid = self.resolve(key)
+        return {"id": cid, "facet": self.concepts[cid]["facet"]} if cid else None
+
+    def facet_list(self) -> dict:
+        return {"facets": [{"id": f["id"], "label": f["label"], "concepts": len(f["concepts"])} for f in self.facets]}
+
+    def facet(self, key: str) -> Optional[dict]:
+        f = self._facet_by_id.get(self.resolve(key) or key)
+        if f is None:
+            return None
+        return {"id": f["id"], "label": f["label"],
+                "concepts": [{"id": cid, "label": self.concepts[cid]["label"]} for cid in f["concepts"]]}
+
+    def search(self, query: str, limit: int = SEARCH_LIMIT, typeahead: bool = False) -> dict:
+        """Full-text (or typeahead) results from the search index, as ConceptIDs."""
+        run = self.search_index.suggest if typeahead else self.search_index.search
+        results = []
+        for uri, _, score in run(query, limit):
+            cid = self._uri_to_id.get(uri)
+            if cid is not None:
+                results.append({"id": cid, "label": self.concepts[cid]["label"], "score": score})
+        return {"query": query, "results": results}
+
+    def ssr_concepts(self, code: str) -> Optional[dict]:
+        concepts = self.ssr.get(code)
+        return {"ssr": code, "concepts": concepts} if concepts is not None else None
+
+    def health(self) -> dict:
+        return {"status": "ok", "version": self.version, "sources": self.sources, "concepts": len(self.concepts),
+                "facets": len(self.facets), "ssr_codes": len(self.ssr), "build_seconds": round(self.build_seconds, 3)}
+
+    # ---------------- encoded responses ----------------
+
+    def response(self, path: str) -> Tuple[int, bytes, str]:
+        """(status, body, etag) for a request path; cached per snapshot."""
+        with self._cache_lock:
+            hit = self._cache.get(path)
+            if hit is not None:
+                self._cache.move_to_end(path)
+                return hit
+        status, payload = self._route(path)
+        body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        etag = f'"{self.version}-{hashlib.sha1(body).hexdigest()[:12]}"'
+        result = (status, body, etag)
+        with self._cache_lock:
+            self._cache[path] = result
+            if len(self._cache) > RESPONSE_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return result
+
+    def _route(self, path: str) -> Tuple[int, dict]:
+        url = urlsplit(path)
+        parts = [unquote(p) for p in url.path.strip("/").split("/") if p]
+        payload = None
+        if parts == ["health"]:
+            payload = self.health()
+        elif parts == ["facets"]:
+            payload = self.facet_list()
+        elif parts in (["search"], ["suggest"]):
+            params = parse_qs(url.query)
+            try:
+                limit = max(1, min(int(params.get("limit", [SEARCH_LIMIT])[0]), 100))
+            except ValueError:
+                return HTTPStatus.BAD_REQUEST, {"error": "limit must be an integer"}
+            payload = self.search(params.get("q", [""])[0], limit, typeahead=parts == ["suggest"])
+        elif len(parts) == 2 and parts[0] == "facets":
+            payload = self.facet(parts[1])
+        elif len(parts) == 2 and parts[0] == "ssr":
+            payload = self.ssr_concepts(parts[1])
+        elif len(parts) in (2, 3) and parts[0] == "concepts":
+            lookup = {None: self.concept, "children": self.concept_children, "ancestors": self.concept_ancestors,
+                      "facet": self.concept_facet}.get(parts[2] if len(parts) == 3 else None)
+            if lookup is None:
+                return HTTPStatus.NOT_FOUND, {"error": f"unknown endpoint {url.path}"}
+            payload = lookup(parts[1])
+        else:
+            return HTTPStatus.NOT_FOUND, {"error": f"unknown endpoint {url.path}"}
+        if payload is None:
+            return HTTPStatus.NOT_FOUND, {"error": f"not found: {parts[1]}"}
+        return HTTPStatus.OK, payload
+
+
+class TaxonomyRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    server_version = "TaxonomyService/1.0"
+
+    def setup(self):
+        super().setup()
+        # headers and body are separate writes: without this, Nagle + delayed ACK add ~40 ms per keep-alive request
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def do_GET(self):
+        self._respond(send_body=True)
+
+    def do_HEAD(self):
+        self._respond(send_body=False)
+
+    def _respond(self, send_body: bool):
+        """Shared GET/HEAD path: same status and headers, body only for GET (HEAD must not write it on keep-alive)."""
+        index = self.server.index  # one snapshot for the whole request, even if a swap happens meanwhile
+        status, body, etag = index.response(self.path)
+        if_none_match = self.headers.get("If-None-Match") or ""
+        if status == HTTPStatus.OK and (etag in if_none_match or if_none_match.strip() == "*"):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("ETag", etag)
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class TaxonomyServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, sources: Sequence[str], verbose: bool = False,
+                 search_index: Optional[str] = None):
+        self.sources = list(sources)
+        self.verbose = verbose
+        self.search_index = search_index
+        self.index = TaxonomyIndex(self.sources, search_index)
+        self._reload = threading.Event()
+        super().__init__(address, TaxonomyRequestHandler)
+
+    def reload(self) -> bool:
+        """Build a new index from the sources and swap it in; keeps the old one on failure."""
+        try:
+            index = TaxonomyIndex(self.sources, self.search_index)
+        except Exception as e:
+            print(f"⚠️ Reload failed, still serving {self.index.version}: {e}", flush=True)
+            return False
+        old, self.index = self.index, index
+        print(f"🔄 Swapped snapshot {old.version} -> {index.version} "
+              f"({len(index.concepts)} concepts, built in {index.build_seconds:.2f}s)", flush=True)
+        return True
+
+    def request_reload(self) -> None:
+        self._reload.set()
+
+    def watch(self, interval: Optional[float]) -> None:
+        """
+        Poll the sources every `interval` seconds (None: only on request_reload());
+        reload once a change has settled (same size/mtime on two polls).
+        """
+        pending = None
+        while True:
+            forced = self._reload.wait(interval)
+            self._reload.clear()
+            try:
+                current = sources_signature(self.sources)
+            except OSError:
+                continue  # a source is being replaced
+            if forced:
+                self.reload()
+                pending = None
+            elif current != self.index.signature:
+                if current == pending:
+                    self.reload()
+                    pending = None
+                else:
+                    pending = current
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Serve taxonomy lookups over HTTP")
+    ap.add_argument("sources", nargs="+", help="Vocabulary file(s); several are merged")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=DEFAULT_PORT)
+    ap.add_argument("--watch", type=float, default=2.0, help="Seconds between source checks for hot-swap (0 = off)")
+    ap.add_argument("--search-index", help="Serialised search index file (taxonomy_search.py); "
+                                           "loaded when fresh, else rebuilt and saved")
+    ap.add_argument("--verbose", action="store_true", help="Log every request")
+    args = ap.parse_args()
+
+    server = TaxonomyServer((args.host, args.port), args.sources, args.verbose, args.search_index)
+    index = server.index
+    print(f"✅ {len(index.concepts)} concepts, {len(index.facets)} facets, snapshot {index.version} "
+          f"({index.build_seconds:.2f}s); serving http://{args.host}:{server.server_address[1]}", flush=True)
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, lambda signum, frame: server.request_reload())
+    threading.Thread(target=server.watch, args=(args.watch if args.watch > 0 else None,), daemon=True).start()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark for taxonomy_service.py
+---------------------------------
+Sends a mix of lookups over keep-alive connections (one per client thread)
+and reports p50/p90/p99 latency and requests per second.
+
+The ConceptIDs, facets and SSR codes are taken from the service itself
+(/facets, /facets/{id}), so any snapshot works. With --revalidate the
+clients send the ETag they got back (If-None-Match) and mostly get 304s.
+
+Either point it at a running service (--url) or let it start one on a free
+port with --serve SOURCES.
+
+Examples:
+  python taxonomy_service_bench.py --url http://127.0.0.1:8765
+  python taxonomy_service_bench.py --serve export12.ttl --requests 50000 --clients 8
+  python taxonomy_service_bench.py --serve big.ttl --mix concept,ancestors --revalidate
+"""
+import os
+import sys
+import json
+import time
+import random
+import socket
+import argparse
+import threading
+import subprocess
+import http.client
+from collections import Counter
+from typing import List, Tuple
+from urllib.parse import quote, urlsplit
+
+ENDPOINTS = ("concept", "children", "ancestors", "facet", "search", "suggest", "ssr")
+
+
+def _get(conn: http.client.HTTPConnection, path: str, headers=None) -> Tuple[int, bytes, str]:
+    conn.request("GET", path, headers=headers or {})
+    resp = conn.getresponse()
+    body = resp.read()
+    return resp.status, body, resp.getheader("ETag", "")
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_service(sources: List[str]) -> Tuple[subprocess.Popen, str]:
+    port = _free_port()
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "taxonomy_service.py")
+    proc = subprocess.Popen([sys.executable, script, *sources, "--port", str(port), "--watch", "0"])
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 600
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit("service exited during start-up")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            if _get(conn, "/health")[0] == 200:
+                conn.close()
+                return proc, url
+        except OSError:
+            time.sleep(0.2)
+    proc.kill()
+    raise SystemExit("service did not start in time")
+
+
+def build_paths(conn: http.client.HTTPConnection, mix: List[str], count: int, seed: int) -> List[str]:
+    """`count` request paths over the endpoints in `mix`, with ids sampled from the service."""
+    facets = json.loads(_get(conn, "/facets")[1])["facets"]
+    ids, labels = [], []
+    for f in facets:
+        for c in json.loads(_get(conn, f"/facets/{quote(f['id'])}")[1])["concepts"]:
+            ids.append(c["id"])
+            labels.append(c["label"])
+    ssr_codes = []
+    for cid in ids[:2000]:
+        ssr_codes.extend(json.loads(_get(conn, f"/concepts/{quote(cid)}")[1]).get("ssr", []))
+    if not ids:
+        raise SystemExit("the service has no concepts")
+    rnd = random.Random(seed)
+    paths = []
+    for _ in range(count):
+        kind = rnd.choice(mix)
+        if kind == "search":
+            paths.append(f"/search?q={quote(rnd.choice(labels))}")
+        elif kind == "suggest":
+            word = rnd.choice(labels).split()[0]
+            paths.append(f"/suggest?q={quote(word[:rnd.randint(1, max(1, len(word)))])}")
+        elif kind == "ssr" and ssr_codes:
+            paths.append(f"/ssr/{quote(rnd.choice(ssr_codes))}")
+        else:
+            cid = quote(rnd.choice(ids))
+            paths.append(f"/concepts/{cid}" if kind in ("concept", "ssr") else f"/concepts/{cid}/{kind}")
+    return paths
+
+
+def run(url: str, paths: List[str], clients: int, revalidate: bool) -> dict:
+    target = urlsplit(url)
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    lock = threading.Lock()
+    chunks = [paths[i::clients] for i in range(clients)]
+
+    def client(chunk: List[str]) -> None:
+        conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=30)
+        etags = {}
+        local, codes = [], Counter()
+        for path in chunk:
+            headers = {"If-None-Match": etags[path]} if revalidate and path in etags else None
+            t0 = time.perf_counter()
+            status, _, etag = _get(conn, path, headers)
+            local.append(time.perf_counter() - t0)
+            codes[status] += 1
+            if etag:
+                etags[path] = etag
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            statuses.update(codes)
+
+    threads = [threading.Thread(target=client, args=(chunk,)) for chunk in chunks]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    latencies.sort()
+    pct = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+    return {"requests": len(latencies), "seconds": elapsed, "rps": len(latencies) / elapsed,
+            "p50_ms": pct(0.50), "p90_ms": pct(0.90), "p99_ms": pct(0.99), "max_ms": latencies[-1] * 1000,
+            "statuses": dict(statuses)}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Latency/throughput benchmark for taxonomy_service.py")
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--url", help="Base URL of a running service")
+    src.add_argument("--serve", nargs="+", metavar="SOURCE", help="Start a service on these sources")
+    ap.add_argument("--requests", type=int, default=20000)
+    ap.add_argument("--clients", type=int, default=4, help="Concurrent keep-alive connections")
+    ap.add_argument("--mix", default=",".join(ENDPOINTS), help=f"Endpoints to exercise ({', '.join(ENDPOINTS)})")
+    ap.add_argument("--revalidate", action="store_true", help="Send If-None-Match with known ETags")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--json", action="store_true", help="Print the result as JSON")
+    args = ap.parse_args()
+    mix = [m.strip() for m in args.mix.split(",") if m.strip()]
+    unknown = set(mix) - set(ENDPOINTS)
+    if unknown:
+        ap.error(f"unknown endpoint(s): {', '.join(sorted(unknown))}")
+
+    proc = None
+    url = args.url
+    if args.serve:
+        proc, url = start_service(args.serve)
+    try:
+        target = urlsplit(url)
+        conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=30)
+        paths = build_paths(conn, mix, args.requests, args.seed)
+        conn.close()
+        run(url, paths[: max(1, len(paths) // 10)], args.clients, args.revalidate)  # warm-up
+        result = run(url, paths, args.clients, args.revalidate)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"{result['requests']} requests, {args.clients} clients, {result['seconds']:.2f}s: "
+              f"{result['rps']:.0f} req/s")
+        print(f"latency p50 {result['p50_ms']:.2f} ms, p90 {result['p90_ms']:.2f} ms, "
+              f"p99 {result['p99_ms']:.2f} ms, max {result['max_ms']:.2f} ms")
+        print("status " + ", ".join(f"{k}: {v}" for k, v in sorted(result["statuses"].items())))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
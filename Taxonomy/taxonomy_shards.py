@@ -0,0 +1,436 @@
+# taxonomy_shards.py
+"""
+Facet-sharded taxonomy storage with lazy loading.
+
+A subtree job (one facet's Markdown, one Confluence section) should not have
+to load the whole vocabulary. build_shards() splits the merged sources into
+one compact store per top-term facet and writes a small manifest:
+
+  <dir>/manifest.json        sources, prefixes, facets, label/ID directory,
+                             rdf:type index, cross-facet edges
+  <dir>/f0003.snapshot       triples of the concepts under facet #3
+  <dir>/shared.snapshot      everything not under a facet (schemes, SSR codes,
+                             ontology/property definitions, ...)
+
+A concept belongs to the first facet (by label) it can be reached from; a
+blank node goes with the subject that first refers to it. ShardedTaxonomy
+offers the read API of rdflib.Graph and only loads a shard on first access:
+
+- patterns with a bound subject read that subject's shard
+- (?, p, o) with o a facet concept reads o's shard plus the cross-facet
+  edges from the manifest (e.g. polyhierarchy broader, related)
+- (?, rdf:type, C) is answered from the manifest's type index
+- anything else loads every shard
+
+The manifest records the sources' size/mtime (and projection); open_shards()
+rebuilds the shards when a source changed.
+
+Usage:
+  from taxonomy_shards import open_shards
+  g = open_shards(["export12.ttl", "SSR.ttl"], ".skos_shards")
+  root = g.find_concept("Meal Preferences")
+  for child in g.subjects(SKOS.broader, root): ...
+  print(g.loaded_shards())
+
+  python taxonomy_shards.py build export12.ttl SSR.ttl --dir .skos_shards
+  python taxonomy_shards.py info --dir .skos_shards
+  python taxonomy_shards.py tree --dir .skos_shards --facet "Meal Preferences" --depth 3
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+from collections import defaultdict
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from rdflib import Graph, URIRef, BNode, Literal
+from rdflib.exceptions import UniquenessError
+from rdflib.namespace import RDF, RDFS, SKOS
+
+from compact_store import CompactGraph
+from taxonomy_loader import load_graph, source_info, Projection
+
+DEFAULT_SHARD_DIR = ".skos_shards"
+MANIFEST_FILE = "manifest.json"
+MANIFEST_VERSION = 1
+SHARED = "shared"
+
+
+def _label(graph, uri) -> str:
+    """skos:prefLabel@en, any prefLabel, rdfs:label, then the fragment (as in the exporters)."""
+    best = None
+    for pred in (SKOS.prefLabel, RDFS.label):
+        for lbl in graph.objects(uri, pred):
+            if isinstance(lbl, Literal):
+                if lbl.language == "en":
+                    return str(lbl)
+                if best is None:
+                    best = str(lbl)
+    return best or re.split(r"[#/]", str(uri))[-1]
+
+
+def _term_key(term) -> str:
+    return f"_:{term}" if isinstance(term, BNode) else str(term)
+
+
+def _key_term(key: str):
+    return BNode(key[2:]) if key.startswith("_:") else URIRef(key)
+
+# ---------------- building ----------------
+
+def build_shards(sources: Sequence[str], shard_dir: str = DEFAULT_SHARD_DIR,
+                 projection: Optional[Projection] = None) -> dict:
+    """Split the merged sources into facet shards under shard_dir; returns the manifest."""
+    g = load_graph(list(sources), store="compact", projection=projection)
+
+    narrower = defaultdict(list)
+    has_broader = set()
+    for s, o in g.subject_objects(SKOS.broader):
+        narrower[o].append(s)
+        has_broader.add(s)
+    for s, o in g.subject_objects(SKOS.narrower):
+        narrower[s].append(o)
+        has_broader.add(o)
+    concepts = dict.fromkeys(g.subjects(RDF.type, SKOS.Concept))
+    for c in list(narrower) + list(has_broader):
+        concepts.setdefault(c)
+    facets = sorted((c for c in concepts if c not in has_broader and isinstance(c, URIRef)),
+                    key=lambda u: (_label(g, u).lower(), str(u)))
+
+    # Concept -> facet shard: first facet (in label order) it is reachable from
+    home: Dict = {}
+    facet_entries = []
+    for n, facet in enumerate(facets):
+        name = f"f{n:04d}"
+        stack = [facet]
+        count = 0
+        while stack:
+            c = stack.pop()
+            if c in home:
+                continue
+            home[c] = name
+            count += 1
+            stack.extend(narrower.get(c, ()))
+        facet_entries.append({"uri": str(facet), "label": _label(g, facet), "shard": name, "concepts": count})
+
+    # Other URI subjects are shared; blank nodes follow the first subject that refers to them
+    bnode_refs = defaultdict(list)
+    for s, o in g.subject_objects():
+        if isinstance(o, BNode):
+            bnode_refs[s].append(o)
+    for s in list(g.subjects(unique=True)):
+        if isinstance(s, BNode):
+            continue
+        shard = home.setdefault(s, SHARED)
+        stack = list(bnode_refs.get(s, ()))
+        while stack:
+            b = stack.pop()
+            if b not in home:
+                home[b] = shard
+                stack.extend(bnode_refs.get(b, ()))
+
+    buckets = defaultdict(list)
+    for s, p, o in g:
+        buckets[home.setdefault(s, SHARED)].append((s, p, o))
+
+    cross = []
+    for s, p, o in g:
+        if isinstance(o, URIRef) and home.get(o, SHARED) != SHARED and home[o] != home[s]:
+            cross.append([_term_key(s), str(p), str(o)])
+
+    types = defaultdict(list)
+    bnode_classes = set()
+    for s, cls in g.subject_objects(RDF.type):
+        if isinstance(s, BNode):
+            bnode_classes.add(str(cls))  # class has blank-node members: not indexable as URIs
+        else:
+            types[str(cls)].append(str(s))
+
+    os.makedirs(shard_dir, exist_ok=True)
+    namespaces = [(prefix, str(ns)) for prefix, ns in g.namespaces()]
+    shards = {}
+    for name in sorted(buckets):
+        store = CompactGraph.from_triples(buckets[name], namespaces)
+        file = f"{name}.snapshot"
+        store.save(os.path.join(shard_dir, file), {"shard": name})
+        shards[name] = {"file": file, "triples": len(store)}
+
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "sources": [source_info(p, projection) for p in sources],
+        "namespaces": namespaces,
+        "triples": len(g),
+        "facets": facet_entries,
+        "shards": shards,
+        # uri -> [shard, label]; blank nodes only need their shard
+        "directory": {_term_key(s): [home[s], _label(g, s) if isinstance(s, URIRef) else None]
+                      for s in home if home[s] in shards},
+        "types": {cls: members for cls, members in types.items() if cls not in bnode_classes},
+        "cross_edges": cross,
+    }
+    tmp = os.path.join(shard_dir, f"{MANIFEST_FILE}.{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(tmp, os.path.join(shard_dir, MANIFEST_FILE))
+    # Shards of an earlier build that no longer exist
+    for file in os.listdir(shard_dir):
+        if file.endswith(".snapshot") and file not in {s["file"] for s in shards.values()}:
+            os.remove(os.path.join(shard_dir, file))
+    return manifest
+
+
+def _manifest_is_fresh(manifest: dict, sources: Sequence[str], projection: Optional[Projection]) -> bool:
+    if manifest.get("version") != MANIFEST_VERSION:
+        return False
+    current = [source_info(p, projection) for p in sources]
+    keys = ("path", "size", "mtime_ns", "projection")
+    return [[i.get(k) for k in keys] for i in manifest.get("sources", [])] == [[i[k] for k in keys] for i in current]
+
+# ---------------- lazy view ----------------
+
+class ShardedTaxonomy:
+    """Read-only, rdflib.Graph-like view over facet shards, loaded on first access."""
+
+    def __init__(self, shard_dir: str = DEFAULT_SHARD_DIR):
+        self.shard_dir = shard_dir
+        with open(os.path.join(shard_dir, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        self.facets: List[dict] = self.manifest["facets"]
+        self._directory: Dict[str, list] = self.manifest["directory"]
+        self._types: Dict[str, List[str]] = self.manifest["types"]
+        self._cross_in = defaultdict(list)  # object -> [(s, p, o)] with s in another shard
+        for s, p, o in self.manifest["cross_edges"]:
+            self._cross_in[URIRef(o)].append((_key_term(s), URIRef(p), URIRef(o)))
+        self._shards: Dict[str, CompactGraph] = {}
+        self._ns_graph = Graph(bind_namespaces="none")
+        for prefix, ns in self.manifest["namespaces"]:
+            self._ns_graph.bind(prefix, ns, override=True, replace=True)
+        self.namespace_manager = self._ns_graph.namespace_manager
+
+    # ---------------- shards ----------------
+
+    def _shard(self, name: str) -> CompactGraph:
+        store = self._shards.get(name)
+        if store is None:
+            info = self.manifest["shards"][name]
+            store = self._shards[name] = CompactGraph.load(os.path.join(self.shard_dir, info["file"]))
+        return store
+
+    def _home(self, term) -> Optional[str]:
+        entry = self._directory.get(_term_key(term))
+        return entry[0] if entry else None
+
+    def loaded_shards(self) -> List[str]:
+        return sorted(self._shards)
+
+    # ---------------- directory ----------------
+
+    def label(self, uri) -> Optional[str]:
+        """Label from the manifest directory (no shard access)."""
+        entry = self._directory.get(str(uri))
+        return entry[1] if entry else None
+
+    def find_concept(self, label_or_uri: str) -> Optional[URIRef]:
+        """A facet or concept by URI, qname or label (case-insensitive; facets win)."""
+        if label_or_uri in self._directory:
+            return URIRef(label_or_uri)
+        if ":" in label_or_uri and not label_or_uri.startswith("http"):
+            try:
+                uri = str(self.namespace_manager.expand_curie(label_or_uri))
+                if uri in self._directory:
+                    return URIRef(uri)
+            except ValueError:
+                pass
+        wanted = label_or_uri.strip().lower()
+        for facet in self.facets:
+            if facet["label"].lower() == wanted:
+                return URIRef(facet["uri"])
+        for key, (_, label) in self._directory.items():
+            if label and label.lower() == wanted:
+                return URIRef(key)
+        return None
+
+    # ---------------- rdflib.Graph-compatible read API ----------------
+
+    def triples(self, pattern: Tuple) -> Iterator[Tuple]:
+        s, p, o = pattern
+        if s is not None:
+            home = self._home(s)
+            if home is not None:
+                yield from self._shard(home).triples(pattern)
+            elif isinstance(s, BNode):
+                for name in self.manifest["shards"]:
+                    yield from self._shard(name).triples(pattern)
+            return
+        if p == RDF.type and o is not None and str(o) in self._types:
+            for member in self._types[str(o)]:
+                yield URIRef(member), p, o
+            return
+        home = self._home(o) if isinstance(o, URIRef) else None
+        if home is not None and home != SHARED:
+            yield from self._shard(home).triples(pattern)
+            for triple in self._cross_in.get(o, ()):
+                if p is None or triple[1] == p:
+                    yield triple
+            return
+        for name in self.manifest["shards"]:
+            yield from self._shard(name).triples(pattern)
+
+    def objects(self, subject=None, predicate=None, unique: bool = False) -> Iterator:
+        return self._project(self.triples((subject, predicate, None)), 2, unique)
+
+    def subjects(self, predicate=None, object=None, unique: bool = False) -> Iterator:
+        return self._project(self.triples((None, predicate, object)), 0, unique)
+
+    def predicates(self, subject=None, object=None, unique: bool = False) -> Iterator:
+        return self._project(self.triples((subject, None, object)), 1, unique)
+
+    def predicate_objects(self, subject=None, unique: bool = False) -> Iterator[Tuple]:
+        for _, p, o in self.triples((subject, None, None)):
+            yield p, o
+
+    def subject_objects(self, predicate=None, unique: bool = False) -> Iterator[Tuple]:
+        for s, _, o in self.triples((None, predicate, None)):
+            yield s, o
+
+    def subject_predicates(self, object=None, unique: bool = False) -> Iterator[Tuple]:
+        for s, p, _ in self.triples((None, None, object)):
+            yield s, p
+
+    @staticmethod
+    def _project(triples: Iterator[Tuple], pos: int, unique: bool) -> Iterator:
+        seen = set() if unique else None
+        for t in triples:
+            term = t[pos]
+            if seen is not None:
+                if term in seen:
+                    continue
+                seen.add(term)
+            yield term
+
+    def value(self, subject=None, predicate=RDF.value, object=None, default=None, any: bool = True):
+        if subject is None and object is None:
+            return default
+        if object is None:
+            values = self.objects(subject, predicate)
+        elif subject is None:
+            values = self.subjects(predicate, object)
+        else:
+            values = self.predicates(subject, object)
+        first = next(values, None)
+        if first is None:
+            return default
+        if not any and next(values, None) is not None:
+            raise UniquenessError([first])
+        return first
+
+    def namespaces(self) -> Iterator[Tuple[str, object]]:
+        return self._ns_graph.namespaces()
+
+    def bind(self, prefix: str, namespace, override: bool = True, replace: bool = False) -> None:
+        self._ns_graph.bind(prefix, namespace, override=override, replace=replace)
+
+    def qname(self, uri) -> str:
+        return self.namespace_manager.qname(uri)
+
+    def __iter__(self) -> Iterator[Tuple]:
+        return self.triples((None, None, None))
+
+    def __contains__(self, triple: Tuple) -> bool:
+        return next(self.triples(triple), None) is not None
+
+    def __len__(self) -> int:
+        return self.manifest["triples"]
+
+    def __repr__(self) -> str:
+        return (f"<ShardedTaxonomy {len(self)} triples, {len(self.facets)} facets, "
+                f"{len(self._shards)}/{len(self.manifest['shards'])} shards loaded>")
+
+
+def open_shards(sources: Sequence[str], shard_dir: str = DEFAULT_SHARD_DIR,
+                projection: Optional[Projection] = None) -> ShardedTaxonomy:
+    """ShardedTaxonomy for the sources, (re)building the shards if a source changed."""
+    manifest_path = os.path.join(shard_dir, MANIFEST_FILE)
+    fresh = False
+    if os.path.exists(manifest_path):
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                fresh = _manifest_is_fresh(json.load(f), sources, projection)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Ignoring unreadable shard manifest {manifest_path}: {e}")
+    if not fresh:
+        t0 = time.perf_counter()
+        manifest = build_shards(sources, shard_dir, projection)
+        print(f"[shards] {len(manifest['shards'])} shards for {len(sources)} sources in {shard_dir} "
+              f"({time.perf_counter() - t0:.2f}s)")
+    return ShardedTaxonomy(shard_dir)
+
+
+def subtree(graph, root, depth: Optional[int] = None) -> List[Tuple[URIRef, int]]:
+    """(concept, level) of root and its narrower concepts (via inverse broader), pre-order by label."""
+    out = []
+    seen = set()
+    stack = [(root, 0)]
+    while stack:
+        node, level = stack.pop()
+        if node in seen:
+            continue
+        seen.add(node)
+        out.append((node, level))
+        if depth is not None and level >= depth:
+            continue
+        children = sorted(graph.subjects(SKOS.broader, node), key=lambda u: _label(graph, u).lower())
+        stack.extend((c, level + 1) for c in reversed(children))
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Build and inspect facet-sharded taxonomy storage")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p_build = sub.add_parser("build", help="Split the sources into one shard per top-term facet")
+    p_build.add_argument("sources", nargs="+")
+    p_info = sub.add_parser("info", help="List facets and shard sizes")
+    p_tree = sub.add_parser("tree", help="Print a facet subtree, loading only the shards it needs")
+    p_tree.add_argument("--facet", required=True, help="Facet/concept label, qname or URI")
+    p_tree.add_argument("--depth", type=int, help="Levels below the facet (default: all)")
+    for p in (p_build, p_info, p_tree):
+        p.add_argument("--dir", default=DEFAULT_SHARD_DIR, help=f"Shard directory (default {DEFAULT_SHARD_DIR})")
+    args = ap.parse_args()
+
+    if args.cmd == "build":
+        t0 = time.perf_counter()
+        manifest = build_shards(args.sources, args.dir)
+        print(f"[OK] {manifest['triples']} triples -> {len(manifest['shards'])} shards in {args.dir} "
+              f"({time.perf_counter() - t0:.2f}s)")
+        return 0
+
+    g = ShardedTaxonomy(args.dir)
+    if args.cmd == "info":
+        shards = g.manifest["shards"]
+        for facet in g.facets:
+            print(f"{facet['shard']}  {shards[facet['shard']]['triples']:>9} triples  "
+                  f"{facet['concepts']:>7} concepts  {facet['label']}")
+        if SHARED in shards:
+            print(f"{SHARED:6s} {shards[SHARED]['triples']:>9} triples")
+        print(f"{len(g.manifest['cross_edges'])} cross-facet edges, {len(g.manifest['directory'])} directory entries")
+        return 0
+
+    root = g.find_concept(args.facet)
+    if root is None:
+        print(f"ERROR: no facet or concept '{args.facet}'")
+        return 2
+    t0 = time.perf_counter()
+    nodes = subtree(g, root, args.depth)
+    elapsed = time.perf_counter() - t0
+    for node, level in nodes:
+        print(f"{'  ' * level}- {_label(g, node)}")
+    print(f"[OK] {len(nodes)} concepts, shards loaded: {', '.join(g.loaded_shards())} "
+          f"of {len(g.manifest['shards'])} ({elapsed * 1000:.1f} ms)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
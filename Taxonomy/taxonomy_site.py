@@ -0,0 +1,519 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Static HTML taxonomy site
+-------------------------
+Renders the taxonomy as a static site that stays usable at partner scale,
+instead of one HTML file or one Markdown/PDF document:
+
+  site/index.html                     facets with their sizes + search box
+  site/facets/<ConceptID>.html        one page per facet (top concept)
+  site/data/<ConceptID>.tree.<hash>.json
+                                      the facet's outline (label, children),
+                                      rendered client-side as it is expanded
+  site/data/<ConceptID>.<n>.<hash>.json
+                                      concept details (labels per language,
+                                      altLabels, definitions, BT/NT/RT, linked
+                                      SSR) in chunks of CHUNK concepts, fetched
+                                      when a concept is opened
+  site/search/index.json              search manifest (the only JSON fetched
+                                      without a content hash)
+  site/search/t-<prefix>.<hash>.json  token -> concept postings, sharded by the
+                                      first two letters of the folded token
+                                      (hex-encoded in the name)
+  site/search/docs.<n>.<hash>.json    (ConceptID, label, facet) per concept block;
+                                      labels in every language, altLabels,
+                                      linked SSR codes and ConceptIDs are indexed
+  site/assets/site.<hash>.js/.css
+
+Data and assets carry a content hash in their names, so they can be served
+with far-future cache headers; only the HTML entry points and the search
+manifest keep stable names. The facet outlines come from the shared
+hierarchy traversal (skos_traversal.py, cycle-safe); a concept's home is
+the first facet (by label) it is reached from, as in taxonomy_shards.py.
+Search tokens are accent-folded like taxonomy_search.py.
+
+Facets are rendered in parallel (process pool). site/site-manifest.json
+keeps every facet's content fingerprint: a rerun only re-renders facets
+whose concepts, or the labels they link to, changed, and rebuilds the
+search index only when some facet did; files no longer referenced are
+removed.
+
+Install:
+  pip install rdflib numpy
+
+Examples:
+  python taxonomy_site.py export12.ttl SSR.ttl --out site
+  python taxonomy_site.py big.ttl --out site --workers 8
+  python taxonomy_site.py export12.ttl --out site --full
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from html import escape
+from typing import Dict, List, Optional, Tuple
+
+from rdflib import URIRef, Literal
+from rdflib.namespace import RDF, SKOS
+
+from taxonomy_loader import load_graph
+from taxonomy_closure import concept_id
+from taxonomy_search import tokenize
+from skos_traversal import traverse, CycleReport
+
+SITE_VERSION = "site-1"    # bump when the rendered output changes (invalidates every facet)
+MANIFEST = "site-manifest.json"
+CHUNK = 500                # concepts per detail chunk
+DOC_BLOCK = 2000           # concepts per search docs block
+RESULTS = 20
+DIRS = ("facets", "data", "search", "assets")
+
+CSS = """
+body{font-family:'Segoe UI',Tahoma,Geneva,Verdana,sans-serif;margin:0;color:#2c3e50;background:#f5f6fa}
+header{background:#2c3e50;color:#fff;padding:12px 24px;display:flex;gap:24px;align-items:center}
+header a{color:#fff;text-decoration:none;font-weight:600}
+main{display:flex;gap:24px;padding:24px;max-width:1400px;margin:0 auto}
+#tree{flex:1;min-width:0}#detail{flex:1;min-width:0;position:sticky;top:24px;align-self:flex-start}
+ul.tree{list-style:none;padding-left:18px;margin:0}ul.tree li{margin:2px 0}
+.toggle{display:inline-block;width:16px;cursor:pointer;color:#7f8c8d}.leaf{cursor:default}
+.concept{cursor:pointer}.concept.active{background:#d6eaf8;border-radius:3px}
+.card{background:#fff;border-radius:8px;padding:16px 20px;box-shadow:0 2px 8px rgba(0,0,0,.08)}
+.card table{border-collapse:collapse;width:100%}.card td,.card th{border-bottom:1px solid #ecf0f1;padding:4px 6px;text-align:left;vertical-align:top}
+.facets{list-style:none;padding:0;display:grid;grid-template-columns:repeat(auto-fill,minmax(260px,1fr));gap:12px}
+.facets li{background:#fff;border-radius:8px;padding:12px 16px;box-shadow:0 2px 8px rgba(0,0,0,.08)}
+.search{position:relative}.search input{padding:6px 10px;width:320px;border-radius:4px;border:0}
+#results{position:absolute;background:#fff;color:#2c3e50;list-style:none;padding:0;margin:4px 0 0;width:420px;box-shadow:0 4px 16px rgba(0,0,0,.2);z-index:10}
+#results li{padding:6px 10px;border-bottom:1px solid #ecf0f1}#results a{color:#2c3e50}#results small{color:#7f8c8d}
+""".strip()
+
+JS = r"""
+(function () {
+  const root = document.documentElement.dataset.root || "";
+  const cache = {};
+  function load(path) {
+    if (!cache[path]) cache[path] = fetch(root + path).then(r => r.json());
+    return cache[path];
+  }
+  function fold(text) {
+    // mirrors taxonomy_search.fold: casefold (lower case plus ß -> ss, ς -> σ), then strip accents
+    return text.toLowerCase().replace(/ß/g, "ss").replace(/ς/g, "σ")
+      .normalize("NFKD").replace(/[\u0300-\u036f]/g, "");
+  }
+  function el(tag, attrs, text) {
+    const e = document.createElement(tag);
+    Object.entries(attrs || {}).forEach(([k, v]) => e.setAttribute(k, v));
+    if (text !== undefined) e.textContent = text;
+    return e;
+  }
+
+  // ---------------- search ----------------
+  const input = document.getElementById("q"), list = document.getElementById("results");
+  let searchManifest = null;
+  function shardOf(token) { return token.slice(0, 2); }
+  function lowerBound(a, x) {
+    let lo = 0, hi = a.length;
+    while (lo < hi) { const m = (lo + hi) >> 1; if (a[m] < x) lo = m + 1; else hi = m; }
+    return lo;
+  }
+  async function postings(word) {
+    // every concept with a token starting with `word`
+    const file = searchManifest.shards[shardOf(word)];
+    if (!file) return new Set();
+    const shard = await load(file), out = new Set();
+    for (let i = lowerBound(shard.tokens, word); i < shard.tokens.length && shard.tokens[i].startsWith(word); i++) {
+      let doc = 0;
+      for (const gap of shard.postings[i]) { doc += gap; out.add(doc); }
+    }
+    return out;
+  }
+  async function search(query) {
+    searchManifest = searchManifest || await load("search/index.json");
+    // shards are keyed by two letters: single letters are too unselective to look up
+    const words = fold(query).split(/[^\p{L}\p{N}_]+/u).filter(w => w.length > 1);
+    if (!words.length) return [];
+    let hits = null;
+    for (const word of words) {
+      const found = await postings(word);
+      hits = hits === null ? found : new Set([...hits].filter(d => found.has(d)));
+      if (!hits.size) return [];
+    }
+    // lower doc ids are shorter labels: the first hits are the best
+    const best = [...hits].sort((a, b) => a - b).slice(0, searchManifest.results);
+    const out = [];
+    for (const doc of best) {
+      const block = await load(searchManifest.docs[Math.floor(doc / searchManifest.block)]);
+      const [cid, label, facet] = block[doc % searchManifest.block];
+      out.push({ cid, label, facet: searchManifest.facets[facet] });
+    }
+    return out;
+  }
+  if (input) {
+    let seq = 0;
+    input.addEventListener("input", async () => {
+      const mine = ++seq, found = await search(input.value);
+      if (mine !== seq) return;
+      list.replaceChildren(...found.map(h => {
+        const li = el("li"), a = el("a", { href: root + "facets/" + h.facet[0] + ".html#" + h.cid }, h.label);
+        li.append(a, " ", el("small", {}, h.facet[1]));
+        return li;
+      }));
+    });
+  }
+
+  // ---------------- facet page ----------------
+  const treeBox = document.getElementById("tree");
+  if (!treeBox) return;
+  const detailBox = document.getElementById("detail");
+  let tree = null, parent = null, items = {};
+  function renderLevel(ul, nodes) {
+    for (const n of nodes) {
+      const [cid, label, kids] = tree.nodes[n];
+      const li = el("li"), toggle = el("span", { class: "toggle" + (kids.length ? "" : " leaf") }, kids.length ? "▸" : "·");
+      const name = el("span", { class: "concept", id: "c-" + n }, label);
+      li.append(toggle, name);
+      items[n] = li;
+      toggle.addEventListener("click", () => expand(n));
+      name.addEventListener("click", () => { history.replaceState(null, "", "#" + cid); show(n); });
+      ul.append(li);
+    }
+  }
+  function expand(n, open) {
+    const li = items[n], kids = tree.nodes[n][2];
+    if (!kids.length) return;
+    let ul = li.querySelector(":scope > ul");
+    if (!ul) { ul = el("ul", { class: "tree" }); renderLevel(ul, kids); li.append(ul); }
+    else if (!open) { ul.hidden = !ul.hidden; }
+    if (open) ul.hidden = false;
+    li.querySelector(".toggle").textContent = ul.hidden ? "▸" : "▾";
+  }
+  function link(entry) {
+    const [cid, label, facet] = entry;
+    if (!facet) return label;
+    const href = facet === tree.facet ? "#" + cid : root + "facets/" + facet + ".html#" + cid;
+    return el("a", { href }, label);
+  }
+  function row(table, name, values) {
+    if (!values || !values.length) return;
+    const tr = el("tr"), td = el("td");
+    values.forEach((v, k) => { if (k) td.append(", "); td.append(typeof v === "string" ? v : link(v)); });
+    tr.append(el("th", {}, name), td);
+    table.append(tr);
+  }
+  async function show(n) {
+    document.querySelectorAll(".concept.active").forEach(e => e.classList.remove("active"));
+    let path = [], p = parent[n];
+    while (p !== undefined && p !== -1) { path.unshift(p); p = parent[p]; }
+    path.forEach(k => expand(k, true));
+    const name = document.getElementById("c-" + n);
+    if (name) { name.classList.add("active"); name.scrollIntoView({ block: "nearest" }); }
+    const chunk = await load(tree.chunks[Math.floor(n / tree.chunk)]);
+    const d = chunk[n % tree.chunk], card = el("div", { class: "card" }), table = el("table");
+    card.append(el("h2", {}, d.label), el("p", {}, d.id + " · " + d.uri));
+    Object.entries(d.definition).forEach(([lang, text]) => card.append(el("p", {}, (lang ? lang + ": " : "") + text)));
+    row(table, "Labels", Object.entries(d.labels).map(([lang, text]) => text + (lang ? " (" + lang + ")" : "")));
+    row(table, "UF", d.alt);
+    row(table, "BT", d.broader);
+    row(table, "NT", d.narrower);
+    row(table, "RT", d.related);
+    row(table, "Linked SSR", d.ssr);
+    card.append(table);
+    detailBox.replaceChildren(card);
+  }
+  load(treeBox.dataset.tree).then(t => {
+    tree = t;
+    parent = new Array(t.nodes.length).fill(-1);
+    t.nodes.forEach(([, , kids], n) => kids.forEach(k => { if (parent[k] === -1 && k !== 0) parent[k] = n; }));
+    const ul = el("ul", { class: "tree" });
+    renderLevel(ul, [0]);
+    treeBox.replaceChildren(ul);
+    expand(0, true);
+    const target = decodeURIComponent(location.hash.slice(1));
+    const n = target ? t.nodes.findIndex(node => node[0] === target) : 0;
+    show(n >= 0 ? n : 0);
+  });
+  window.addEventListener("hashchange", () => {
+    if (!tree) return;
+    const n = tree.nodes.findIndex(node => node[0] === decodeURIComponent(location.hash.slice(1)));
+    if (n >= 0) show(n);
+  });
+})();
+""".strip()
+
+
+# ---------------- model ----------------
+
+class SiteModel:
+    """Concept data and facet membership, collected in one pass over the triples."""
+
+    def __init__(self, graph):
+        self.labels = defaultdict(dict)        # uri -> {lang: text}
+        self.alt = defaultdict(list)
+        self.definitions = defaultdict(dict)
+        self.children = defaultdict(list)
+        self.parents = defaultdict(list)
+        self.related = defaultdict(list)
+        self.ssr = defaultdict(list)
+        concepts = {}
+        kind_of: Dict = {}
+        known = {RDF.type: "type", SKOS.prefLabel: "pref", SKOS.altLabel: "alt", SKOS.definition: "definition",
+                 SKOS.broader: "broader", SKOS.narrower: "narrower", SKOS.related: "related"}
+        for s, p, o in graph.triples((None, None, None)):
+            kind = kind_of.get(p, "?")
+            if kind == "?":
+                kind = kind_of[p] = known.get(p) or ("ssr" if concept_id(p) == "linkedSSR" else None)
+            if kind is None:
+                continue
+            if kind == "type":
+                if o == SKOS.Concept and isinstance(s, URIRef):
+                    concepts.setdefault(s)
+            elif kind == "pref":
+                if isinstance(o, Literal):
+                    self.labels[s].setdefault((o.language or "").lower(), str(o))
+            elif kind == "alt":
+                self.alt[s].append(str(o))
+            elif kind == "definition":
+                lang = (o.language or "").lower() if isinstance(o, Literal) else ""
+                self.definitions[s][lang] = "\n".join(filter(None, [self.definitions[s].get(lang), str(o).strip()]))
+            elif kind in ("broader", "narrower"):
+                child, parent = (s, o) if kind == "broader" else (o, s)
+                if parent not in self.children[child] and child not in self.children[parent]:
+                    self.children[parent].append(child)
+                    self.parents[child].append(parent)
+                concepts.setdefault(child)
+                concepts.setdefault(parent)
+            elif kind == "related":
+                self.related[s].append(o)
+            else:
+                self.ssr[s].append(concept_id(o))
+        self.concepts = [c for c in concepts if isinstance(c, URIRef)]
+        self.ids = {c: concept_id(c) for c in self.concepts}
+        for kids in self.children.values():
+            kids.sort(key=lambda u: (self.label(u).lower(), str(u)))
+        self.facets = sorted((c for c in self.concepts if not self.parents.get(c)),
+                             key=lambda u: (self.label(u).lower(), str(u)))
+        self.cycles = CycleReport()
+        self.home: Dict = {}                   # concept -> facet it is first reached from
+        self.members: Dict = {}                # facet -> DFS order of its concepts
+        for facet in self.facets:
+            order = []
+            traverse([facet], lambda n: self.children.get(n, ()), report=self.cycles,
+                     pre=lambda node, depth, parent: order.append(node))
+            self.members[facet] = order
+            for c in order:
+                self.home.setdefault(c, facet)
+
+    def label(self, uri) -> str:
+        labels = self.labels.get(uri, {})
+        return labels.get("en") or next(iter(labels.values()), concept_id(uri))
+
+    def cid(self, uri) -> str:
+        return self.ids.get(uri) or concept_id(uri)
+
+    def ref(self, uri) -> list:
+        home = self.home.get(uri)
+        return [self.cid(uri), self.label(uri), self.ids[home] if home is not None else None]
+
+    def facet_payload(self, facet) -> dict:
+        """Outline + details of one facet: everything its page renders (and its fingerprint covers)."""
+        order = self.members[facet]
+        position = {c: n for n, c in enumerate(order)}
+        nodes = [[self.ids[c], self.label(c), [position[k] for k in self.children.get(c, ()) if k in position]]
+                 for c in order]
+        details = [{
+            "id": self.ids[c], "uri": str(c), "label": self.label(c),
+            "labels": dict(sorted(self.labels.get(c, {}).items())),
+            "alt": sorted(self.alt.get(c, ())),
+            "definition": dict(sorted(self.definitions.get(c, {}).items())),
+            "broader": [self.ref(p) for p in self.parents.get(c, ())],
+            "narrower": [self.ref(k) for k in self.children.get(c, ())],
+            "related": sorted((self.ref(r) for r in self.related.get(c, ())), key=lambda r: r[1]),
+            "ssr": sorted(self.ssr.get(c, ())),
+        } for c in order]
+        return {"facet": self.ids[facet], "label": self.label(facet), "nodes": nodes, "details": details}
+
+
+# ---------------- writing ----------------
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()[:10]
+
+
+def _write(out: str, relative: str, data: bytes) -> None:
+    path = os.path.join(out, relative)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _write_hashed(out: str, folder: str, stem: str, ext: str, data: bytes) -> str:
+    """Write <folder>/<stem>.<hash>.<ext> unless it exists; returns the relative path."""
+    relative = f"{folder}/{stem}.{_digest(data)}.{ext}"
+    if not os.path.exists(os.path.join(out, relative)):
+        _write(out, relative, data)
+    return relative
+
+
+def _json(value) -> bytes:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _page(title: str, body: str, assets: Dict[str, str], root: str, extra_head: str = "") -> bytes:
+    return f"""<!DOCTYPE html>
+<html lang="en" data-root="{root}">
+<head>
+<meta charset="UTF-8">
+<meta name="viewport" content="width=device-width, initial-scale=1.0">
+<title>{escape(title)}</title>
+<link rel="stylesheet" href="{root}{assets['css']}">{extra_head}
+</head>
+<body>
+<header><a href="{root}index.html">Taxonomy</a>
+<div class="search"><input id="q" type="search" placeholder="Search concepts (any language)" autocomplete="off"><ul id="results"></ul></div>
+</header>
+{body}
+<script src="{root}{assets['js']}" defer></script>
+</body>
+</html>
+""".encode("utf-8")
+
+
+def render_facet(task: Tuple[str, dict, Dict[str, str]]) -> Tuple[str, List[str]]:
+    """Write one facet's page and chunks; returns (facet, files written or reused)."""
+    out, payload, assets = task
+    facet = payload["facet"]
+    details = payload["details"]
+    chunks = [_write_hashed(out, "data", f"{facet}.{k // CHUNK}", "json", _json(details[k:k + CHUNK]))
+              for k in range(0, len(details), CHUNK)]
+    tree = _write_hashed(out, "data", f"{facet}.tree", "json",
+                         _json({"facet": facet, "nodes": payload["nodes"], "chunk": CHUNK, "chunks": chunks}))
+    top = details[0]
+    outline = "".join(f"<li>{escape(label)}</li>" for _, label, _ in
+                      (payload["nodes"][k] for k in payload["nodes"][0][2]))
+    body = (f'<main><section id="tree" data-tree="{tree}"><h1>{escape(payload["label"])}</h1>'
+            f'<p>{escape(" ".join(top["definition"].values()))}</p>'
+            f'<noscript><ul>{outline}</ul></noscript></section><aside id="detail"></aside></main>')
+    page = f"facets/{facet}.html"
+    _write(out, page, _page(f"{payload['label']} – Taxonomy", body, assets, "../"))
+    return facet, [page, tree] + chunks
+
+
+def build_search(model: SiteModel, out: str) -> List[str]:
+    """Prefix-sharded inverted index + docs blocks; returns the files (manifest included)."""
+    facet_no = {f: k for k, f in enumerate(model.facets)}
+    concepts = sorted(model.home, key=lambda c: (len(model.label(c)), model.label(c).lower(), str(c)))
+    postings = defaultdict(list)
+    for doc, c in enumerate(concepts):
+        words = set()
+        for text in list(model.labels.get(c, {}).values()) + model.alt.get(c, []) + model.ssr.get(c, []) + [model.ids[c]]:
+            words.update(tokenize(text))
+        for w in words:
+            postings[w].append(doc)
+    shards = defaultdict(list)
+    for token in sorted(postings):
+        shards[token[:2]].append(token)
+    files = {}
+    for prefix, tokens in sorted(shards.items()):
+        gaps = [[d - p for d, p in zip(postings[t], [0] + postings[t][:-1])] for t in tokens]
+        files[prefix] = _write_hashed(out, "search", f"t-{prefix.encode('utf-8').hex()}", "json",
+                                      _json({"tokens": tokens, "postings": gaps}))
+    docs = [_write_hashed(out, "search", f"docs.{k // DOC_BLOCK}", "json",
+                          _json([[model.ids[c], model.label(c), facet_no[model.home[c]]]
+                                 for c in concepts[k:k + DOC_BLOCK]]))
+            for k in range(0, len(concepts), DOC_BLOCK)]
+    manifest = {"shards": files, "docs": docs, "block": DOC_BLOCK, "results": RESULTS,
+                "facets": [[concept_id(f), model.label(f)] for f in model.facets]}
+    _write(out, "search/index.json", _json(manifest))
+    return ["search/index.json"] + list(files.values()) + docs
+
+
+def build_site(graph, out: str, workers: Optional[int] = None, full: bool = False) -> dict:
+    model = SiteModel(graph)
+    for folder in DIRS:
+        os.makedirs(os.path.join(out, folder), exist_ok=True)
+    assets = {"css": _write_hashed(out, "assets", "site", "css", CSS.encode("utf-8")),
+              "js": _write_hashed(out, "assets", "site", "js", JS.encode("utf-8"))}
+    previous, state = {}, {}
+    manifest_path = os.path.join(out, MANIFEST)
+    if not full and os.path.exists(manifest_path):
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("version") == SITE_VERSION and state.get("assets") == assets:
+            previous = state.get("facets", {})
+
+    tasks, kept, fingerprints = [], {}, {}
+    for facet in model.facets:
+        payload = model.facet_payload(facet)
+        fingerprint = _digest(_json(payload))
+        cid = payload["facet"]
+        fingerprints[cid] = fingerprint
+        old = previous.get(cid)
+        if old and old["fingerprint"] == fingerprint and all(os.path.exists(os.path.join(out, p)) for p in old["files"]):
+            kept[cid] = old["files"]
+        else:
+            tasks.append((out, payload, assets))
+
+    rendered = {}
+    workers = min(workers or os.cpu_count() or 1, max(1, len(tasks)))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            rendered.update(pool.map(render_facet, tasks, chunksize=max(1, len(tasks) // (4 * workers))))
+    else:
+        rendered.update(map(render_facet, tasks))
+
+    facet_files = {**kept, **rendered}
+    # the search index only holds what the facet payloads hold: same facets, same index
+    search_files = state.get("search", []) if previous else []
+    if rendered or set(kept) != set(previous) or not search_files or \
+            not all(os.path.exists(os.path.join(out, p)) for p in search_files):
+        search_files = build_search(model, out)
+    items = "".join(
+        f'<li><a href="facets/{model.ids[f]}.html">{escape(model.label(f))}</a><br>'
+        f'<small>{len(model.members[f])} concepts</small></li>' for f in model.facets)
+    _write(out, "index.html", _page("Taxonomy", f'<main><section><h1>Taxonomy</h1>'
+                                    f'<p>{len(model.home)} concepts in {len(model.facets)} facets.</p>'
+                                    f'<ul class="facets">{items}</ul></section></main>', assets, ""))
+
+    state = {"version": SITE_VERSION, "assets": assets, "search": search_files,
+             "facets": {cid: {"fingerprint": fingerprints[cid], "files": files} for cid, files in facet_files.items()}}
+    _write(out, MANIFEST, json.dumps(state, ensure_ascii=False, indent=1).encode("utf-8"))
+
+    # files of earlier builds nobody links to any more
+    live = set(assets.values()) | set(search_files) | {p for files in facet_files.values() for p in files}
+    removed = 0
+    for folder in DIRS:
+        for name in os.listdir(os.path.join(out, folder)):
+            if f"{folder}/{name}" not in live:
+                os.remove(os.path.join(out, folder, name))
+                removed += 1
+    return {"facets": len(model.facets), "rendered": len(rendered), "kept": len(kept),
+            "concepts": len(model.home), "removed": removed, "cycles": model.cycles, "model": model}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Generate a static HTML site of the taxonomy")
+    ap.add_argument("sources", nargs="+", help="TTL/RDF sources (e.g. export12.ttl SSR.ttl)")
+    ap.add_argument("--out", default="site", help="Output directory")
+    ap.add_argument("--workers", type=int, help="Processes rendering facets (default: CPU count)")
+    ap.add_argument("--full", action="store_true", help="Re-render every facet")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    g = load_graph(args.sources, store="compact")
+    t1 = time.perf_counter()
+    report = build_site(g, args.out, args.workers, args.full)
+    if report["cycles"]:
+        print(report["cycles"].describe(report["model"].label))
+    print(f"[OK] {report['concepts']} concepts, {report['facets']} facets: {report['rendered']} rendered, "
+          f"{report['kept']} unchanged, {report['removed']} stale file(s) removed -> {args.out}/index.html "
+          f"(load {t1 - t0:.2f}s, build {time.perf_counter() - t1:.2f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
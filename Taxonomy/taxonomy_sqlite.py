@@ -0,0 +1,534 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Indexed SQLite export of the taxonomy
+-------------------------------------
+Writes the taxonomy into a normalised SQLite database so partner and
+internal systems can join instead of re-parsing TTL, e.g. "all concepts
+under facet X with a linked SSR and a French label" (see bench).
+
+Tables
+- concepts(id, uri, concept_id, label, is_top, facet, hash)
+- labels(concept, kind pref/alt/hidden, lang, text)
+- definitions(concept, lang, text)
+- edges(concept, parent)                 skos:broader (and inverted narrower)
+- related(concept, related)
+- closure(concept, ancestor)             ancestors-or-self (taxonomy_closure.py)
+- schemes(id, uri, label), concept_schemes(concept, scheme, top)
+- ssr_codes(id, uri, code, label, definition), ssr_links(concept, ssr)
+- concept_text                           FTS5 (pref, alt, definition; accents folded), rowid = concepts.id
+- meta(key, value)
+
+A full build loads everything in one transaction into a fresh file, builds
+the indexes after the load, then renames the file into place. On rerun
+every concept's hash (SHA-1 of its sorted triples) is compared with the
+stored one: only changed, added and removed concepts are rewritten, plus
+the closure rows of their descendants and the concepts whose links point at
+an added concept, scheme or SSR code, in one transaction. Concept ids stay
+stable across incremental runs. More than half the concepts changed, a
+schema change or --full rebuilds from scratch.
+
+Install:
+  pip install rdflib numpy
+
+Examples:
+  python taxonomy_sqlite.py export export12.ttl SSR.ttl --db taxonomy.sqlite
+  python taxonomy_sqlite.py export export12.ttl SSR.ttl --db taxonomy.sqlite --full
+  python taxonomy_sqlite.py check export12.ttl SSR.ttl --db taxonomy.sqlite   # same tables as --full?
+  python taxonomy_sqlite.py bench --db taxonomy.sqlite --facet Meal --lang fr --text vegetarian
+"""
+import os
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import argparse
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from rdflib import Literal
+from rdflib.namespace import RDF, RDFS, SKOS
+
+from taxonomy_loader import load_graph
+from taxonomy_closure import AncestorClosure, concept_id
+
+DB_FORMAT = "skos-sqlite"
+DB_VERSION = 1
+REBUILD_SHARE = 0.5        # changed share of concepts above which a full build is cheaper
+
+TABLES = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE concepts (id INTEGER PRIMARY KEY, uri TEXT NOT NULL, concept_id TEXT NOT NULL, label TEXT,
+                       is_top INTEGER NOT NULL, facet INTEGER, hash TEXT NOT NULL);
+CREATE TABLE labels (concept INTEGER NOT NULL, kind TEXT NOT NULL, lang TEXT NOT NULL, text TEXT NOT NULL);
+CREATE TABLE definitions (concept INTEGER NOT NULL, lang TEXT NOT NULL, text TEXT NOT NULL);
+CREATE TABLE edges (concept INTEGER NOT NULL, parent INTEGER NOT NULL);
+CREATE TABLE related (concept INTEGER NOT NULL, related INTEGER NOT NULL);
+CREATE TABLE closure (concept INTEGER NOT NULL, ancestor INTEGER NOT NULL);
+CREATE TABLE schemes (id INTEGER PRIMARY KEY, uri TEXT NOT NULL, label TEXT);
+CREATE TABLE concept_schemes (concept INTEGER NOT NULL, scheme INTEGER NOT NULL, top INTEGER NOT NULL);
+CREATE TABLE ssr_codes (id INTEGER PRIMARY KEY, uri TEXT NOT NULL, code TEXT NOT NULL, label TEXT, definition TEXT);
+CREATE TABLE ssr_links (concept INTEGER NOT NULL, ssr INTEGER NOT NULL);
+CREATE VIRTUAL TABLE concept_text USING fts5(pref, alt, definition, tokenize = 'unicode61 remove_diacritics 2');
+"""
+
+INDEXES = """
+CREATE UNIQUE INDEX concepts_uri ON concepts (uri);
+CREATE INDEX concepts_concept_id ON concepts (concept_id);
+CREATE INDEX concepts_label ON concepts (label COLLATE NOCASE);
+CREATE INDEX concepts_facet ON concepts (facet);
+CREATE INDEX labels_concept ON labels (concept);
+CREATE INDEX labels_lang ON labels (lang, kind, concept);
+CREATE INDEX definitions_concept ON definitions (concept);
+CREATE INDEX edges_concept ON edges (concept);
+CREATE INDEX edges_parent ON edges (parent);
+CREATE INDEX related_concept ON related (concept);
+CREATE UNIQUE INDEX closure_ancestor ON closure (ancestor, concept);
+CREATE INDEX closure_concept ON closure (concept);
+CREATE UNIQUE INDEX schemes_uri ON schemes (uri);
+CREATE INDEX concept_schemes_concept ON concept_schemes (concept);
+CREATE INDEX concept_schemes_scheme ON concept_schemes (scheme);
+CREATE UNIQUE INDEX ssr_codes_uri ON ssr_codes (uri);
+CREATE INDEX ssr_codes_code ON ssr_codes (code);
+CREATE INDEX ssr_links_concept ON ssr_links (concept);
+CREATE INDEX ssr_links_ssr ON ssr_links (ssr);
+"""
+
+# per-concept tables, rewritten for a changed concept
+CONCEPT_TABLES = ("labels", "definitions", "edges", "related", "concept_schemes", "ssr_links")
+
+LABEL_KINDS = {SKOS.prefLabel: "pref", SKOS.altLabel: "alt", SKOS.hiddenLabel: "hidden"}
+
+
+class Snapshot:
+    """Everything the export needs, collected in one pass over the triples."""
+
+    def __init__(self, graph):
+        self.closure = AncestorClosure(graph)
+        triples = defaultdict(list)            # subject -> ["p o", ...] (N3, inverse "^p s"), for the hashes
+        self.labels = defaultdict(list)        # uri -> [(kind, lang, text)]
+        self.definitions = defaultdict(list)   # uri -> [(lang, text)]
+        self.parents = defaultdict(set)
+        self.related = defaultdict(set)
+        self.ssr = defaultdict(set)
+        self.in_scheme = defaultdict(set)      # uri -> {scheme uri}
+        self.top_of = defaultdict(set)         # uri -> {scheme uri}
+        self.schemes: Dict = {}
+        self.ssr_types: Set = set()
+        rdfs_labels = {}
+        kind_of: Dict = {}
+        known = {RDF.type: "type", SKOS.definition: "definition", SKOS.broader: "broader",
+                 SKOS.narrower: "narrower", SKOS.related: "related", SKOS.inScheme: "in_scheme",
+                 SKOS.topConceptOf: "top_of", SKOS.hasTopConcept: "has_top", RDFS.label: "rdfs_label",
+                 **{p: "label" for p in LABEL_KINDS}}
+        for s, p, o in graph.triples((None, None, None)):
+            triples[s].append(f"{p.n3()} {o.n3()}")
+            kind = kind_of.get(p, "?")
+            if kind == "?":
+                kind = kind_of[p] = known.get(p) or ("ssr" if concept_id(p) == "linkedSSR" else None)
+            if kind is None:
+                continue
+            if kind == "type":
+                if o == SKOS.ConceptScheme:
+                    self.schemes.setdefault(s, None)
+                elif concept_id(o) == "SSR":
+                    self.ssr_types.add(s)
+            elif kind == "label":
+                if isinstance(o, Literal):
+                    self.labels[s].append((LABEL_KINDS[p], (o.language or "").lower(), str(o)))
+            elif kind == "definition":
+                self.definitions[s].append((((o.language or "") if isinstance(o, Literal) else "").lower(),
+                                            str(o).strip()))
+            elif kind == "broader":
+                self.parents[s].add(o)
+            elif kind == "narrower":
+                self.parents[o].add(s)
+                triples[o].append(f"^{p.n3()} {s.n3()}")  # the child's edges depend on it
+            elif kind == "related":
+                self.related[s].add(o)
+            elif kind == "in_scheme":
+                self.in_scheme[s].add(o)
+            elif kind == "top_of":
+                self.top_of[s].add(o)
+                self.in_scheme[s].add(o)
+            elif kind == "has_top":
+                self.top_of[o].add(s)
+                self.in_scheme[o].add(s)
+                triples[o].append(f"^{p.n3()} {s.n3()}")
+            elif kind == "rdfs_label":
+                rdfs_labels.setdefault(s, str(o))
+            else:
+                self.ssr[s].add(o)
+
+        self.uris = [str(u) for u in self.closure.uris]
+        self.is_top = np.zeros(len(self.uris), dtype=bool)
+        self.is_top[self.closure.tops] = True
+        self.hashes = [hashlib.sha1("\n".join(sorted(triples.get(u, ()))).encode("utf-8")).hexdigest()
+                       for u in self.closure.uris]
+        self.scheme_rows = [(str(s), self.label(s) or rdfs_labels.get(s)) for s in self.schemes]
+        codes = set(self.ssr_types)
+        for c in self.closure.uris:
+            codes.update(self.ssr.get(c, ()))
+        self.ssr_rows = sorted((str(c), concept_id(c), self.label(c) or rdfs_labels.get(c),
+                                "\n".join(t for _, t in self.definitions.get(c, ())) or None) for c in codes)
+
+    def label(self, uri) -> Optional[str]:
+        pref = [(lang, text) for kind, lang, text in self.labels.get(uri, ()) if kind == "pref"]
+        return next((t for lang, t in pref if lang == "en"), pref[0][1] if pref else None)
+
+
+class SQLiteExport:
+    """Full or incremental export of a Snapshot into one SQLite file."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    # ---------------- rows ----------------
+
+    def _concept_rows(self, snap: Snapshot, ids: List[int], indices: Sequence[int], scheme_ids: Dict[str, int],
+                      ssr_ids: Dict[str, int]) -> Dict[str, list]:
+        c = snap.closure
+        id_of = {uri: ids[i] for i, uri in enumerate(snap.uris)}
+        rows = defaultdict(list)
+        for i in indices:
+            uri = c.uris[i]
+            cid = ids[i]
+            facets = c.facet_ids[c.facet_ptr[i]:c.facet_ptr[i + 1]]
+            rows["concepts"].append((cid, snap.uris[i], c.ids[i], snap.label(uri) or c.ids[i],
+                                     int(snap.is_top[i]),
+                                     ids[facets[0]] if len(facets) else None, snap.hashes[i]))
+            labels = sorted(snap.labels.get(uri, ()))  # triple order differs between parses and snapshots
+            definitions = sorted(snap.definitions.get(uri, ()))
+            rows["labels"].extend((cid, kind, lang, text) for kind, lang, text in labels)
+            rows["definitions"].extend((cid, lang, text) for lang, text in definitions)
+            rows["edges"].extend((cid, id_of[str(p)]) for p in snap.parents.get(uri, ()) if str(p) in id_of)
+            rows["related"].extend((cid, id_of[str(r)]) for r in snap.related.get(uri, ()) if str(r) in id_of)
+            top_of = snap.top_of.get(uri, ())
+            rows["concept_schemes"].extend((cid, scheme_ids[str(s)], int(s in top_of))
+                                           for s in snap.in_scheme.get(uri, ()) if str(s) in scheme_ids)
+            rows["ssr_links"].extend((cid, ssr_ids[str(s)]) for s in snap.ssr.get(uri, ()) if str(s) in ssr_ids)
+            rows["concept_text"].append((cid, " ".join(t for k, _, t in labels if k == "pref"),
+                                         " ".join(t for k, _, t in labels if k != "pref"),
+                                         " ".join(t for _, t in definitions)))
+            rows["closure"].extend((cid, ids[a]) for a in c.up_ids[c.up_ptr[i]:c.up_ptr[i + 1]].tolist())
+        return rows
+
+    @staticmethod
+    def _insert(conn, rows: Dict[str, list]) -> None:
+        for table, values in rows.items():
+            if values:
+                marks = ", ".join("?" * len(values[0]))
+                column = "(rowid, pref, alt, definition)" if table == "concept_text" else ""
+                conn.executemany(f"INSERT INTO {table} {column} VALUES ({marks})", values)
+
+    @staticmethod
+    def _upsert_keyed(conn, table: str, rows: List[tuple], columns: str) -> Dict[str, int]:
+        """Rows keyed by uri keep their ids; rows no longer present are dropped. Returns {uri: id}."""
+        marks = ", ".join("?" * len(columns.split(",")))
+        updates = ", ".join(f"{col.strip()} = excluded.{col.strip()}" for col in columns.split(",")[1:])
+        conn.executemany(f"INSERT INTO {table} ({columns}) VALUES ({marks}) "
+                         f"ON CONFLICT (uri) DO UPDATE SET {updates}", rows)
+        keep = {r[0] for r in rows}
+        ids = {}
+        stale = []
+        for rid, uri in conn.execute(f"SELECT id, uri FROM {table}"):
+            if uri in keep:
+                ids[uri] = rid
+            else:
+                stale.append((rid,))
+        conn.executemany(f"DELETE FROM {table} WHERE id = ?", stale)
+        return ids
+
+    def _meta(self, conn, sources: Sequence[str], snap: Snapshot, mode: str) -> None:
+        meta = {"format": DB_FORMAT, "version": str(DB_VERSION), "sources": json.dumps(list(sources)),
+                "mode": mode, "concepts": str(len(snap.uris)),
+                "built_at": datetime.now(timezone.utc).isoformat(timespec="seconds")}
+        conn.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)", meta.items())
+
+    # ---------------- builds ----------------
+
+    def full(self, snap: Snapshot, sources: Sequence[str] = ()) -> dict:
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        conn = sqlite3.connect(tmp)
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        try:
+            conn.executescript(TABLES)
+            with conn:  # one transaction; indexes after the load
+                conn.executemany("INSERT INTO schemes (id, uri, label) VALUES (?, ?, ?)",
+                                 [(k + 1, *row) for k, row in enumerate(snap.scheme_rows)])
+                conn.executemany("INSERT INTO ssr_codes (id, uri, code, label, definition) VALUES (?, ?, ?, ?, ?)",
+                                 [(k + 1, *row) for k, row in enumerate(snap.ssr_rows)])
+                scheme_ids = {row[0]: k + 1 for k, row in enumerate(snap.scheme_rows)}
+                ssr_ids = {row[0]: k + 1 for k, row in enumerate(snap.ssr_rows)}
+                ids = list(range(1, len(snap.uris) + 1))
+                self._insert(conn, self._concept_rows(snap, ids, range(len(ids)), scheme_ids, ssr_ids))
+                conn.executescript(INDEXES)
+                self._meta(conn, sources, snap, "full")
+            conn.execute("ANALYZE")
+        finally:
+            conn.close()
+        os.replace(tmp, self.path)
+        return {"mode": "full", "concepts": len(snap.uris), "written": len(snap.uris), "removed": 0}
+
+    def stored_version(self) -> Optional[int]:
+        if not os.path.exists(self.path):
+            return None
+        try:
+            conn = sqlite3.connect(self.path)
+            try:
+                meta = dict(conn.execute("SELECT key, value FROM meta"))
+            finally:
+                conn.close()
+        except sqlite3.DatabaseError:
+            return None
+        return int(meta["version"]) if meta.get("format") == DB_FORMAT and meta.get("version") else None
+
+    def export(self, snap: Snapshot, sources: Sequence[str] = (), full: bool = False) -> dict:
+        """Incremental update when possible, else a full build."""
+        if full or self.stored_version() != DB_VERSION:
+            return self.full(snap, sources)
+        conn = sqlite3.connect(self.path)
+        try:
+            stored = {uri: (cid, h) for cid, uri, h in conn.execute("SELECT id, uri, hash FROM concepts")}
+            stored_schemes = set(conn.execute("SELECT uri, label FROM schemes"))
+            stored_ssr = set(conn.execute("SELECT uri, code, label, definition FROM ssr_codes"))
+            changed = {i for i, (uri, h) in enumerate(zip(snap.uris, snap.hashes))
+                       if stored.get(uri, (None, None))[1] != h}
+            # edges, related, scheme and SSR links are only written while their target exists:
+            # concepts pointing at an added target need their rows rewritten too
+            appeared = ({uri for uri in snap.uris if uri not in stored}
+                        | {r[0] for r in snap.scheme_rows} - {r[0] for r in stored_schemes}
+                        | {r[0] for r in snap.ssr_rows} - {r[0] for r in stored_ssr})
+            if appeared:
+                for i, uri in enumerate(snap.closure.uris):
+                    if i not in changed and any(str(t) in appeared for refs in (snap.parents, snap.related,
+                                                                                snap.in_scheme, snap.ssr)
+                                                for t in refs.get(uri, ())):
+                        changed.add(i)
+            changed = sorted(changed)
+            current = set(snap.uris)
+            removed = [cid for uri, (cid, _) in stored.items() if uri not in current]
+            if len(changed) + len(removed) > REBUILD_SHARE * max(1, len(snap.uris)):
+                conn.close()
+                return self.full(snap, sources)
+            if (not changed and not removed and stored_schemes == set(snap.scheme_rows)
+                    and stored_ssr == set(snap.ssr_rows)):
+                return {"mode": "unchanged", "concepts": len(snap.uris), "written": 0, "removed": 0}
+
+            next_id = max((cid for cid, _ in stored.values()), default=0) + 1
+            ids = []
+            for uri in snap.uris:
+                hit = stored.get(uri)
+                ids.append(hit[0] if hit else next_id)
+                next_id += hit is None
+            c = snap.closure
+            # closure rows change for every descendant of a changed concept (new hierarchy) and
+            # for the old descendants of changed or removed ones
+            rewrite_closure = set()
+            for i in changed:
+                rewrite_closure.update(c.down_ids[c.down_ptr[i]:c.down_ptr[i + 1]].tolist())
+            old_ids = [ids[i] for i in changed if snap.uris[i] in stored] + removed
+            position = {cid: i for i, cid in enumerate(ids)}
+            with conn:  # one transaction
+                conn.execute("CREATE TEMP TABLE touched (id INTEGER PRIMARY KEY)")
+                conn.executemany("INSERT INTO touched VALUES (?)", [(cid,) for cid in old_ids])
+                for cid, in conn.execute("SELECT DISTINCT concept FROM closure WHERE ancestor IN touched").fetchall():
+                    if cid in position:
+                        rewrite_closure.add(position[cid])
+                scheme_ids = self._upsert_keyed(conn, "schemes", snap.scheme_rows, "uri, label")
+                ssr_ids = self._upsert_keyed(conn, "ssr_codes", snap.ssr_rows, "uri, code, label, definition")
+                conn.execute("DELETE FROM concept_schemes WHERE scheme NOT IN (SELECT id FROM schemes)")
+                conn.execute("DELETE FROM ssr_links WHERE ssr NOT IN (SELECT id FROM ssr_codes)")
+                for table in CONCEPT_TABLES:
+                    conn.execute(f"DELETE FROM {table} WHERE concept IN touched")
+                conn.execute("DELETE FROM concept_text WHERE rowid IN touched")
+                conn.execute("DELETE FROM closure WHERE concept IN touched")
+                conn.executemany("DELETE FROM edges WHERE parent = ?", [(cid,) for cid in removed])
+                conn.executemany("DELETE FROM related WHERE related = ?", [(cid,) for cid in removed])
+                conn.execute("DELETE FROM concepts WHERE id IN touched")
+                conn.execute("DELETE FROM touched")
+                conn.executemany("INSERT INTO touched VALUES (?)", [(ids[i],) for i in rewrite_closure])
+                conn.execute("DELETE FROM closure WHERE concept IN touched")
+                # facet and top flag depend on the ancestors: rewrite the concept rows below changes too
+                rows = self._concept_rows(snap, ids, sorted(set(changed) | rewrite_closure), scheme_ids, ssr_ids)
+                below = rewrite_closure - set(changed)
+                conn.executemany("UPDATE concepts SET is_top = ?, facet = ? WHERE id = ?",
+                                 [(r[4], r[5], r[0]) for r in rows["concepts"] if position[r[0]] in below])
+                keep = {ids[i] for i in changed}
+                for table in CONCEPT_TABLES + ("concepts", "concept_text"):
+                    rows[table] = [r for r in rows[table] if r[0] in keep]
+                self._insert(conn, rows)
+                conn.execute("DROP TABLE touched")
+                self._meta(conn, sources, snap, "incremental")
+        finally:
+            conn.close()
+        return {"mode": "incremental", "concepts": len(snap.uris), "written": len(changed), "removed": len(removed),
+                "closure_rewritten": len(rewrite_closure)}
+
+
+# ---------------- consistency check ----------------
+
+# every table with ids replaced by URIs: comparable across builds with different id assignment
+CANONICAL_QUERIES = {
+    "concepts": "SELECT c.uri, c.concept_id, c.label, c.is_top, f.uri, c.hash FROM concepts c "
+                "LEFT JOIN concepts f ON f.id = c.facet",
+    "labels": "SELECT c.uri, l.kind, l.lang, l.text FROM labels l JOIN concepts c ON c.id = l.concept",
+    "definitions": "SELECT c.uri, d.lang, d.text FROM definitions d JOIN concepts c ON c.id = d.concept",
+    "edges": "SELECT c.uri, p.uri FROM edges e JOIN concepts c ON c.id = e.concept JOIN concepts p ON p.id = e.parent",
+    "related": "SELECT c.uri, r.uri FROM related x JOIN concepts c ON c.id = x.concept "
+               "JOIN concepts r ON r.id = x.related",
+    "closure": "SELECT c.uri, a.uri FROM closure x JOIN concepts c ON c.id = x.concept "
+               "JOIN concepts a ON a.id = x.ancestor",
+    "schemes": "SELECT uri, label FROM schemes",
+    "concept_schemes": "SELECT c.uri, s.uri, x.top FROM concept_schemes x JOIN concepts c ON c.id = x.concept "
+                       "JOIN schemes s ON s.id = x.scheme",
+    "ssr_codes": "SELECT uri, code, label, definition FROM ssr_codes",
+    "ssr_links": "SELECT c.uri, s.uri FROM ssr_links x JOIN concepts c ON c.id = x.concept "
+                 "JOIN ssr_codes s ON s.id = x.ssr",
+    "concept_text": "SELECT c.uri, t.pref, t.alt, t.definition FROM concept_text t JOIN concepts c ON c.id = t.rowid",
+}
+
+
+def canonical_tables(path: str) -> Dict[str, List[tuple]]:
+    """Sorted rows of every table, keyed by URI instead of id."""
+    conn = sqlite3.connect(path)
+    try:
+        return {table: sorted(conn.execute(sql).fetchall(), key=repr) for table, sql in CANONICAL_QUERIES.items()}
+    finally:
+        conn.close()
+
+
+def compare(path: str, snap: Snapshot) -> Dict[str, Tuple[int, int]]:
+    """
+    Tables of the database at `path` that differ from a full build of `snap`:
+    {table: (rows only in path, rows only in the full build)}.
+    """
+    reference = f"{path}.{os.getpid()}.check"
+    try:
+        SQLiteExport(reference).full(snap)
+        expected = canonical_tables(reference)
+    finally:
+        if os.path.exists(reference):
+            os.remove(reference)
+    actual = canonical_tables(path)
+    diffs = {}
+    for table in CANONICAL_QUERIES:
+        have, want = set(actual[table]), set(expected[table])
+        if have != want or len(actual[table]) != len(expected[table]):
+            diffs[table] = (len(have - want), len(want - have))
+    return diffs
+
+
+# ---------------- query benchmark ----------------
+
+BENCH_QUERIES = {
+    "facet_ssr_lang": (
+        "concepts under a facet with a linked SSR and a label in a language",
+        """SELECT c.uri, c.label FROM concepts f
+           JOIN closure cl ON cl.ancestor = f.id
+           JOIN concepts c ON c.id = cl.concept
+           WHERE f.label = :facet COLLATE NOCASE
+             AND EXISTS (SELECT 1 FROM ssr_links s WHERE s.concept = c.id)
+             AND EXISTS (SELECT 1 FROM labels l WHERE l.concept = c.id AND l.lang = :lang AND l.kind = 'pref')"""),
+    "facet_missing_lang": (
+        "concepts under a facet without a label in a language",
+        """SELECT c.uri, c.label FROM concepts f
+           JOIN closure cl ON cl.ancestor = f.id
+           JOIN concepts c ON c.id = cl.concept
+           WHERE f.label = :facet COLLATE NOCASE
+             AND NOT EXISTS (SELECT 1 FROM labels l WHERE l.concept = c.id AND l.lang = :lang AND l.kind = 'pref')"""),
+    "full_text": (
+        "full-text search, best 20",
+        """SELECT c.uri, c.label FROM concept_text
+           JOIN concepts c ON c.id = concept_text.rowid
+           WHERE concept_text MATCH :text ORDER BY rank LIMIT 20"""),
+    "ancestors": (
+        "ancestors of one concept",
+        """SELECT a.uri, a.label FROM concepts c
+           JOIN closure cl ON cl.concept = c.id
+           JOIN concepts a ON a.id = cl.ancestor
+           WHERE c.concept_id = :concept"""),
+    "facet_sizes": (
+        "concepts per facet",
+        """SELECT f.label, COUNT(*) FROM concepts f
+           JOIN closure cl ON cl.ancestor = f.id
+           WHERE f.is_top = 1 GROUP BY f.id"""),
+    "ssr_concepts": (
+        "concepts linked to an SSR code, with their facet",
+        """SELECT s.code, c.label, f.label FROM ssr_codes s
+           JOIN ssr_links l ON l.ssr = s.id
+           JOIN concepts c ON c.id = l.concept
+           LEFT JOIN concepts f ON f.id = c.facet"""),
+}
+
+
+def bench(path: str, params: dict, repeat: int = 20) -> List[Tuple[str, str, int, float]]:
+    """(name, description, rows, ms per run) of every BENCH_QUERIES query."""
+    conn = sqlite3.connect(path)
+    try:
+        if params.get("concept") is None:
+            params["concept"] = conn.execute("SELECT concept_id FROM concepts ORDER BY id DESC LIMIT 1").fetchone()[0]
+        if params.get("facet") is None:
+            params["facet"] = conn.execute("SELECT label FROM concepts WHERE is_top = 1 ORDER BY id LIMIT 1").fetchone()[0]
+        results = []
+        for name, (description, sql) in BENCH_QUERIES.items():
+            rows = len(conn.execute(sql, params).fetchall())
+            t0 = time.perf_counter()
+            for _ in range(repeat):
+                conn.execute(sql, params).fetchall()
+            results.append((name, description, rows, (time.perf_counter() - t0) * 1000 / repeat))
+        return results
+    finally:
+        conn.close()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Export the taxonomy into an indexed SQLite database")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p_export = sub.add_parser("export", help="Full or incremental export")
+    p_export.add_argument("sources", nargs="+", help="TTL/RDF sources (e.g. export12.ttl SSR.ttl)")
+    p_export.add_argument("--full", action="store_true", help="Rebuild from scratch")
+    p_check = sub.add_parser("check", help="Compare the database with a full build of the sources")
+    p_check.add_argument("sources", nargs="+", help="TTL/RDF sources the database was exported from")
+    p_bench = sub.add_parser("bench", help="Time the sample queries")
+    p_bench.add_argument("--facet", help="Facet label (default: the first facet)")
+    p_bench.add_argument("--lang", default="fr")
+    p_bench.add_argument("--text", default="vegetarian", help="FTS5 query")
+    p_bench.add_argument("--concept", help="ConceptID for the ancestors query (default: the last concept)")
+    p_bench.add_argument("--repeat", type=int, default=20)
+    for p in (p_export, p_check, p_bench):
+        p.add_argument("--db", required=True, help="SQLite file")
+    args = ap.parse_args()
+
+    if args.cmd == "bench":
+        params = {"facet": args.facet, "lang": args.lang, "text": args.text, "concept": args.concept}
+        for name, description, rows, ms in bench(args.db, params, args.repeat):
+            print(f"{name:20s} {ms:9.3f} ms  {rows:7d} rows  ({description})")
+        return 0
+
+    t0 = time.perf_counter()
+    snap = Snapshot(load_graph(args.sources, store="compact"))
+    t1 = time.perf_counter()
+    if args.cmd == "check":
+        diffs = compare(args.db, snap)
+        for table, (extra, missing) in diffs.items():
+            print(f"❌ {table}: {extra} row(s) not in a full build, {missing} missing")
+        if diffs:
+            return 1
+        print(f"[OK] {args.db} matches a full build of {', '.join(args.sources)}")
+        return 0
+    report = SQLiteExport(args.db).export(snap, args.sources, args.full)
+    t2 = time.perf_counter()
+    print(f"[OK] {report['mode']}: {report['written']} concept(s) written, {report['removed']} removed, "
+          f"{report['concepts']} in {args.db} (load {t1 - t0:.2f}s, export {t2 - t1:.2f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SSR code -> taxonomy concept resolver
+-------------------------------------
+Concepts point to IATA SSR codes with apmwg:linkedSSR (Asian Vegetarian ->
+apmwg:AVML); skos_md_and_ttl_update.py only renders that forward link
+(linked_ssr_pretty). Order flows see the SSR codes of every passenger and
+need the other direction: code -> concepts, with their ancestors and facets.
+
+The reverse index is built once from the graph (one pass over the triples,
+closure from taxonomy_closure.py) into a dict keyed by every spelling a
+code may arrive in (local name, URI, label, upper case). Every entry holds
+a precomputed, immutable Resolution including its JSON and CSV renderings,
+so a lookup is one dict probe and writing a result is a string copy.
+Python's dict is the table of choice here: its hash is cached on the key
+strings, and a hand-rolled perfect hash would run in interpreted code.
+
+Streaming (constant memory, line by line):
+- JSONL: every record's code field (a string or a list of codes) is
+  resolved and the record is written back with an added "ssrConcepts"
+  object ({code: {concepts, ancestors, facets} or null})
+- CSV: a code column (several codes per cell allowed, separated by
+  spaces, commas or semicolons) gets concepts/ancestors/facets columns
+- text: one code per line -> tab-separated code, concepts, ancestors, facets
+
+Install:
+  pip install rdflib numpy
+
+Examples:
+  python taxonomy_ssr.py resolve export12.ttl SSR.ttl --codes AVML KSML WCHR
+  python taxonomy_ssr.py stream export12.ttl SSR.ttl --input pax.jsonl --field ssr --out pax.resolved.jsonl
+  python taxonomy_ssr.py stream export12.ttl SSR.ttl --input pax.csv --field code --out -
+  python taxonomy_ssr.py bench export12.ttl SSR.ttl --lookups 10000000 --records 1000000
+"""
+import io
+import os
+import re
+import sys
+import csv
+import json
+import time
+import random
+import argparse
+from collections import defaultdict
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO
+
+from rdflib import Literal
+from rdflib.namespace import RDFS, SKOS
+
+from taxonomy_loader import load_graph
+from taxonomy_closure import AncestorClosure, concept_id
+
+OUTPUT_KEY = "ssrConcepts"
+_SPLIT = re.compile(r"[\s,;]+")
+
+
+class Resolution:
+    """Concepts linked to one SSR code, with the union of their ancestors and facets (ConceptIDs)."""
+
+    __slots__ = ("code", "concepts", "ancestors", "facets", "json", "csv", "tsv")
+
+    def __init__(self, code: str, concepts: tuple, ancestors: tuple, facets: tuple):
+        self.code = code
+        self.concepts = concepts
+        self.ancestors = ancestors
+        self.facets = facets
+        self.json = json.dumps(self.as_dict(), ensure_ascii=False)
+        self.csv = (";".join(concepts), ";".join(ancestors), ";".join(facets))
+        self.tsv = "\t".join(self.csv)
+
+    def as_dict(self) -> dict:
+        return {"concepts": list(self.concepts), "ancestors": list(self.ancestors), "facets": list(self.facets)}
+
+
+class SSRIndex:
+    """Reverse apmwg:linkedSSR index: SSR code -> Resolution."""
+
+    def __init__(self, graph, closure: Optional[AncestorClosure] = None):
+        closure = closure if closure is not None else AncestorClosure(graph)
+        links = defaultdict(dict)  # SSR uri -> {concept uri: None} (ordered set)
+        labels = defaultdict(list)
+        kind_of: Dict = {}
+        known = {RDFS.label: "label", SKOS.prefLabel: "label"}
+        for s, p, o in graph.triples((None, None, None)):
+            kind = kind_of.get(p, "?")
+            if kind == "?":
+                kind = kind_of[p] = known.get(p) or ("ssr" if concept_id(p) == "linkedSSR" else None)
+            if kind == "ssr":
+                links[o][s] = None
+            elif kind == "label" and isinstance(o, Literal):
+                labels[s].append(str(o).strip())
+
+        ids = closure.ids
+        self._table: Dict[str, Resolution] = {}
+        aliases = []
+        for ssr in sorted(links, key=str):
+            concepts, ancestors, facets = set(), set(), set()
+            for concept in links[ssr]:
+                i = closure.lookup(str(concept))
+                if i is None:  # not a concept (e.g. an SSR node linking to itself)
+                    continue
+                concepts.add(ids[i])
+                ancestors.update(closure.anc_ids[closure.anc_ptr[i]:closure.anc_ptr[i + 1]].tolist())
+                facets.update(closure.facet_ids[closure.facet_ptr[i]:closure.facet_ptr[i + 1]].tolist())
+            code = concept_id(ssr)
+            resolution = Resolution(code, tuple(sorted(concepts)), tuple(sorted(ids[a] for a in ancestors)),
+                                    tuple(sorted(ids[f] for f in facets)))
+            self._table[code] = resolution
+            aliases.append((resolution, [str(ssr), *labels.get(ssr, ())]))
+        # other spellings after every local name, so a label never shadows another code
+        for resolution, names in aliases:
+            for name in names:
+                self._table.setdefault(name, resolution)
+        for key in list(self._table):
+            for variant in (key.upper(), key.lower()):
+                self._table.setdefault(variant, self._table[key])
+        self.codes = sorted({r.code for r in self._table.values()})
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __contains__(self, code: str) -> bool:
+        return self.resolve(code) is not None
+
+    def resolve(self, code: str) -> Optional[Resolution]:
+        """Resolution of one code (None if no concept links to it)."""
+        hit = self._table.get(code)
+        if hit is None and code:
+            hit = self._table.get(code.strip().upper())
+        return hit
+
+    def resolve_many(self, codes: Iterable[str]) -> Iterator[Optional[Resolution]]:
+        """Resolutions of a stream of codes, in order (None for unknown codes)."""
+        table = self._table
+        for code in codes:
+            hit = table.get(code)
+            if hit is None and code:
+                hit = table.get(code.strip().upper())
+            yield hit
+
+
+# ---------------- streaming ----------------
+
+def _codes(value) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [c for c in _SPLIT.split(value) if c]
+    return [str(c) for c in value]
+
+
+def stream_jsonl(index: SSRIndex, lines: Iterable[str], out: TextIO, field: str) -> int:
+    """Resolve `field` of every JSONL record; writes the records with OUTPUT_KEY added. Returns records written."""
+    fragments: Dict[str, str] = {}  # code -> '"code": {...}', memoised
+    count = 0
+    for line in lines:
+        text = line.strip()
+        if not text:
+            continue
+        record = json.loads(text)
+        if not isinstance(record, dict):
+            raise ValueError(f"line {count + 1}: JSONL records must be objects")
+        parts = []
+        for code in dict.fromkeys(_codes(record.get(field))):  # repeated codes would repeat the key
+            part = fragments.get(code)
+            if part is None:
+                hit = index.resolve(code)
+                part = f"{json.dumps(code, ensure_ascii=False)}: {hit.json if hit else 'null'}"
+                if len(fragments) < 100_000:
+                    fragments[code] = part
+            parts.append(part)
+        resolved = f'{{{", ".join(parts)}}}'
+        if OUTPUT_KEY in record:  # replace it: splicing would add a second key
+            record[OUTPUT_KEY] = json.loads(resolved)
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        else:
+            # splice into the original text instead of re-serialising the record
+            sep = ", " if record else ""
+            out.write(f'{text[:-1]}{sep}"{OUTPUT_KEY}": {resolved}}}\n')
+        count += 1
+    return count
+
+
+def _csv_cells(index: SSRIndex, cell: str) -> tuple:
+    hit = index.resolve(cell)
+    if hit is not None:
+        return hit.csv
+    merged = ({}, {}, {})
+    for code in _codes(cell):
+        hit = index.resolve(code)
+        if hit is not None:
+            for column, values in zip(merged, (hit.concepts, hit.ancestors, hit.facets)):
+                column.update(dict.fromkeys(values))
+    return tuple(";".join(column) for column in merged)
+
+
+def stream_csv(index: SSRIndex, lines: Iterable[str], out: TextIO, field: str) -> int:
+    """Add concepts/ancestors/facets columns for the code column `field` of a CSV with a header row."""
+    reader = csv.reader(lines)
+    writer = csv.writer(out, lineterminator="\n")
+    header = next(reader, None)
+    if header is None:
+        return 0
+    if field not in header:
+        raise ValueError(f"CSV has no column {field!r} (columns: {', '.join(header)})")
+    column = header.index(field)
+    writer.writerow(header + ["concepts", "ancestors", "facets"])
+    cache: Dict[str, tuple] = {}
+    count = 0
+    for row in reader:
+        cell = row[column] if column < len(row) else ""
+        cells = cache.get(cell)
+        if cells is None:
+            cells = _csv_cells(index, cell)
+            if len(cache) < 100_000:
+                cache[cell] = cells
+        writer.writerow(row + list(cells))
+        count += 1
+    return count
+
+
+def stream_text(index: SSRIndex, lines: Iterable[str], out: TextIO) -> int:
+    """One code per line -> code, concepts, ancestors, facets (tab-separated)."""
+    count = 0
+    for line in lines:
+        code = line.strip()
+        if not code:
+            continue
+        hit = index.resolve(code)
+        out.write(f"{code}\t{hit.tsv}\n" if hit is not None else f"{code}\t\t\t\n")
+        count += 1
+    return count
+
+
+def _format(path: str, fmt: str) -> str:
+    if fmt != "auto":
+        return fmt
+    ext = os.path.splitext(path)[1].lower()
+    return {".jsonl": "jsonl", ".ndjson": "jsonl", ".csv": "csv"}.get(ext, "text")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Resolve SSR codes to taxonomy concepts (reverse apmwg:linkedSSR)")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p_resolve = sub.add_parser("resolve", help="Resolve codes given on the command line")
+    p_resolve.add_argument("sources", nargs="+")
+    p_resolve.add_argument("--codes", nargs="+", required=True)
+    p_stream = sub.add_parser("stream", help="Resolve a JSONL, CSV or text file line by line")
+    p_stream.add_argument("sources", nargs="+")
+    p_stream.add_argument("--input", required=True, help="Input file ('-' for stdin)")
+    p_stream.add_argument("--out", default="-", help="Output file (default: stdout)")
+    p_stream.add_argument("--format", choices=("auto", "jsonl", "csv", "text"), default="auto",
+                          help="Input format (auto: by extension, else text)")
+    p_stream.add_argument("--field", default="ssr", help="JSONL field / CSV column holding the codes")
+    p_bench = sub.add_parser("bench", help="Lookups and streamed records per second")
+    p_bench.add_argument("sources", nargs="+")
+    p_bench.add_argument("--lookups", type=int, default=10_000_000)
+    p_bench.add_argument("--records", type=int, default=1_000_000)
+    p_bench.add_argument("--unknown", type=float, default=0.2, help="Share of codes not linked to any concept")
+    p_bench.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    index = SSRIndex(load_graph(args.sources, store="compact"))
+    print(f"[ssr] {len(index)} SSR codes indexed ({time.perf_counter() - t0:.2f}s)", file=sys.stderr)
+
+    if args.cmd == "resolve":
+        result = {}
+        for code, hit in zip(args.codes, index.resolve_many(args.codes)):
+            result[code] = hit.as_dict() if hit else None
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        return 0
+
+    if args.cmd == "stream":
+        fmt = _format(args.input, args.format)
+        src = sys.stdin if args.input == "-" else open(args.input, "r", encoding="utf-8", newline="")
+        dst = sys.stdout if args.out == "-" else open(args.out, "w", encoding="utf-8", newline="")
+        t0 = time.perf_counter()
+        try:
+            if fmt == "jsonl":
+                count = stream_jsonl(index, src, dst, args.field)
+            elif fmt == "csv":
+                count = stream_csv(index, src, dst, args.field)
+            else:
+                count = stream_text(index, src, dst)
+        finally:
+            if src is not sys.stdin:
+                src.close()
+            if dst is not sys.stdout:
+                dst.close()
+        elapsed = time.perf_counter() - t0
+        print(f"[OK] {count} {fmt} records resolved in {elapsed:.2f}s ({count / max(elapsed, 1e-9):,.0f}/s)",
+              file=sys.stderr)
+        return 0
+
+    if not len(index):
+        raise SystemExit("no apmwg:linkedSSR links in the sources")
+    rnd = random.Random(args.seed)
+    pool = index.codes + [f"X{i:03d}" for i in range(max(1, int(len(index.codes) * args.unknown /
+                                                               max(1e-9, 1 - args.unknown))))]
+    codes = [rnd.choice(pool) for _ in range(args.lookups)]
+    t0 = time.perf_counter()
+    found = sum(1 for hit in index.resolve_many(codes) if hit is not None)
+    elapsed = time.perf_counter() - t0
+    print(f"resolve_many {args.lookups:,} codes: {elapsed:.2f}s  {args.lookups / elapsed:,.0f} lookups/s  "
+          f"({found / args.lookups:.0%} known)")
+    records = [{"pax": f"P{i}", "ssr": [rnd.choice(pool) for _ in range(rnd.randint(1, 3))]}
+               for i in range(args.records)]
+    for fmt in ("jsonl", "csv", "text"):
+        if fmt == "jsonl":
+            text = "".join(json.dumps(r) + "\n" for r in records)
+            run = lambda lines, out: stream_jsonl(index, lines, out, "ssr")
+        elif fmt == "csv":
+            text = "pax,ssr\n" + "".join(f"{r['pax']},{' '.join(r['ssr'])}\n" for r in records)
+            run = lambda lines, out: stream_csv(index, lines, out, "ssr")
+        else:
+            text = "".join(f"{c}\n" for r in records for c in r["ssr"])
+            run = lambda lines, out: stream_text(index, lines, out)
+        out = io.StringIO()
+        t0 = time.perf_counter()
+        count = run(io.StringIO(text), out)
+        elapsed = time.perf_counter() - t0
+        print(f"stream {fmt:5s} {count:,} records: {elapsed:.2f}s  {count / elapsed:,.0f} records/s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
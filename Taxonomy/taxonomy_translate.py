@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Batched label and definition translation backfill
+-------------------------------------------------
+Fills the missing prefLabel / definition translations of a SKOS vocabulary
+(the fr/de/es literals of taxonomywtranslation.ttl) with the OpenAI chat
+API, in the manner of the definition fallback of skos_md_and_ttl_update.py
+but in batches instead of one call per concept:
+
+- work items are (concept, field, target language) whose source-language
+  (--source, default en) text exists and whose target literal is missing
+- identical (text, language) pairs are translated once; translations are
+  cached in SQLite per (text, target language, model), so a rerun or a
+  second vocabulary only sends new texts
+- up to --batch items of one target language go into one request as a JSON
+  document (id, kind, text, facet, parent); the model answers with JSON
+  {"translations": [{"id", "text"}]}. Items missing from an answer are
+  retried in a later batch
+- batches run on --concurrency threads under a shared requests-per-minute
+  limit (--rpm); failed calls are retried with exponential backoff
+
+So a full vocabulary costs about (texts / batch) calls per language, not
+one call per concept.
+
+The stub subcommand serves an OpenAI-compatible /v1/chat/completions
+endpoint that "translates" by tagging the text with the language
+("Meal [fr]"), so the pipeline can be exercised without an API key:
+  python taxonomy_translate.py stub --port 8765
+  python taxonomy_translate.py fill export12.ttl --langs it --base-url http://127.0.0.1:8765/v1 --out it.ttl
+bench runs fill against an in-process stub and reports calls and timing.
+
+Configuration: OPENAI_API_KEY, OPENAI_MODEL (default gpt-4o) and
+OPENAI_BASE_URL as for skos_md_and_ttl_update.py; the cache file is
+SKOS_TRANSLATION_CACHE (default translation_cache.sqlite).
+
+Install:
+  pip install rdflib numpy openai
+
+Examples:
+  python taxonomy_translate.py fill taxonomywtranslation.ttl --langs fr,de,es --out translated.ttl
+  python taxonomy_translate.py fill export12.ttl --langs it --fields label --batch 80 --concurrency 8 --rpm 500
+  python taxonomy_translate.py bench big.ttl --langs it --batch 100
+"""
+import os
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from rdflib import URIRef, Literal
+from rdflib.namespace import RDF, SKOS
+
+from taxonomy_loader import load_graph
+from taxonomy_closure import AncestorClosure
+
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o")
+DEFAULT_CACHE = os.getenv("SKOS_TRANSLATION_CACHE", "translation_cache.sqlite")
+BATCH = 50                 # items per request
+MAX_CHARS = 12000          # source characters per request
+CONCURRENCY = 4
+RPM = 120                  # requests per minute, all threads together
+RETRIES = 4
+FIELDS = {"label": SKOS.prefLabel, "definition": SKOS.definition}
+LANGUAGES = {"en": "English", "fr": "French", "de": "German", "es": "Spanish", "it": "Italian",
+             "pt": "Portuguese", "nl": "Dutch", "pl": "Polish", "sv": "Swedish", "da": "Danish",
+             "fi": "Finnish", "cs": "Czech", "tr": "Turkish", "ar": "Arabic", "zh": "Chinese",
+             "ja": "Japanese", "ko": "Korean", "ru": "Russian"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS translations (
+    text        TEXT NOT NULL,
+    lang        TEXT NOT NULL,
+    model       TEXT NOT NULL,
+    translation TEXT NOT NULL,
+    created_at  TEXT NOT NULL,
+    PRIMARY KEY (text, lang, model)
+);
+"""
+
+SYSTEM_PROMPT = (
+    "You are helping to maintain a controlled vocabulary (taxonomy) used for refining the description of products.\n"
+    "This taxonomy follows ISO 25964 principles and contains multiple facets (top-level categories).\n"
+    "You translate its preferred labels and definitions. The user sends JSON: {\"target_language\", \"items\": "
+    "[{\"id\", \"kind\", \"text\", \"facet\", \"parent\"}]}. Use facet and parent only as context. "
+    "Labels are short preferred terms: translate them as a term, not a sentence, with the capitalisation "
+    "conventions of the target language. Definitions stay concise and keep their meaning.\n"
+    "Answer with JSON only: {\"translations\": [{\"id\": <id>, \"text\": <translation>}]}, one entry per item."
+)
+
+Item = Tuple[str, str]  # (source text, kind)
+
+
+class TranslationCache:
+    """(text, target language, model) -> translation, persisted in SQLite, cached in memory."""
+
+    def __init__(self, path: str = DEFAULT_CACHE):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+        self._entries: Dict[Tuple[str, str, str], str] = {}
+        for text, lang, model, translation in self.conn.execute(
+                "SELECT text, lang, model, translation FROM translations"):
+            self._entries[(text, lang, model)] = translation
+
+    def get(self, text: str, lang: str, model: str) -> Optional[str]:
+        return self._entries.get((text, lang, model))
+
+    def put_many(self, rows: Sequence[Tuple[str, str, str, str]]) -> None:
+        """Store (text, lang, model, translation) rows in one transaction."""
+        now = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?)",
+                                  [(*row, now) for row in rows])
+        for text, lang, model, translation in rows:
+            self._entries[(text, lang, model)] = translation
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __enter__(self) -> "TranslationCache":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class RateLimiter:
+    """Spaces calls evenly to at most `per_minute` per minute across threads."""
+
+    def __init__(self, per_minute: float):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+# ---------------- work items ----------------
+
+def missing_translations(graph, langs: Sequence[str], fields: Sequence[str] = tuple(FIELDS),
+                         source: str = "en") -> Tuple[Dict[str, Dict[Item, list]], Dict[Item, dict]]:
+    """
+    ({lang: {(text, kind): [(concept, predicate), ...]}}, {(text, kind): context}) for every
+    missing target literal whose source-language text exists. One pass over the triples.
+    """
+    wanted = {FIELDS[f]: f for f in fields}
+    texts = defaultdict(dict)      # (uri, predicate) -> {lang: text}
+    parents = defaultdict(list)
+    concepts = []
+    kind_of = {RDF.type: "type", SKOS.prefLabel: "text", SKOS.definition: "text",
+               SKOS.broader: "broader", SKOS.narrower: "narrower"}
+    for s, p, o in graph.triples((None, None, None)):
+        kind = kind_of.get(p)
+        if kind == "type":
+            if o == SKOS.Concept and isinstance(s, URIRef):
+                concepts.append(s)
+        elif kind == "text":
+            if isinstance(o, Literal):
+                texts[(s, p)].setdefault((o.language or "").lower(), str(o))
+        elif kind == "broader":
+            parents[s].append(o)
+        elif kind == "narrower":
+            parents[o].append(s)
+
+    def label(uri) -> str:
+        labels = texts.get((uri, SKOS.prefLabel), {})
+        return labels.get(source) or next(iter(labels.values()), "")
+
+    closure = AncestorClosure(graph)
+    work: Dict[str, Dict[Item, list]] = {lang: defaultdict(list) for lang in langs}
+    context: Dict[Item, dict] = {}
+    for uri in dict.fromkeys(concepts):
+        idx = closure.lookup(str(uri))
+        tops = closure.facet_ids[closure.facet_ptr[idx]:closure.facet_ptr[idx + 1]] if idx is not None else []
+        facet = label(closure.uris[tops[0]]) if len(tops) and tops[0] != idx else ""
+        parent = label(parents[uri][0]) if parents.get(uri) else ""
+        for predicate, field in wanted.items():
+            present = texts.get((uri, predicate), {})
+            text = present.get(source)
+            if not text:
+                continue
+            item = (text, field)
+            context.setdefault(item, {"facet": facet, "parent": parent})
+            for lang in langs:
+                if lang not in present:
+                    work[lang][item].append((uri, predicate))
+    return work, context
+
+
+def batches(items: Sequence[Item], size: int = BATCH, max_chars: int = MAX_CHARS) -> List[List[Item]]:
+    """Consecutive groups of at most `size` items and `max_chars` source characters."""
+    out, current, chars = [], [], 0
+    for item in items:
+        if current and (len(current) >= size or chars + len(item[0]) > max_chars):
+            out.append(current)
+            current, chars = [], 0
+        current.append(item)
+        chars += len(item[0])
+    if current:
+        out.append(current)
+    return out
+
+
+# ---------------- API calls ----------------
+
+def _make_client(base_url: Optional[str] = None):
+    from openai import OpenAI
+    # retries are handled here, with the rate limiter in the loop
+    return OpenAI(base_url=base_url, max_retries=0) if base_url else OpenAI(max_retries=0)
+
+
+def translate_batch(client, model: str, lang: str, batch: Sequence[Item], context: Dict[Item, dict]) -> Dict[Item, str]:
+    """One chat completion for a batch; returns the items the answer covers."""
+    payload = {"target_language": LANGUAGES.get(lang, lang),
+               "items": [{"id": i, "kind": kind, "text": text, **context.get((text, kind), {})}
+                         for i, (text, kind) in enumerate(batch)]}
+    resp = client.chat.completions.create(
+        model=model,
+        messages=[{"role": "system", "content": SYSTEM_PROMPT},
+                  {"role": "user", "content": json.dumps(payload, ensure_ascii=False)}],
+        response_format={"type": "json_object"},
+        temperature=0.2,
+    )
+    answer = json.loads(resp.choices[0].message.content)
+    out = {}
+    for entry in answer.get("translations", []) if isinstance(answer, dict) else []:
+        if not isinstance(entry, dict):
+            continue
+        i, text = entry.get("id"), entry.get("text")
+        if isinstance(i, int) and 0 <= i < len(batch) and isinstance(text, str) and text.strip():
+            out[batch[i]] = text.strip()
+    return out
+
+
+class Backfill:
+    """Translate work items in concurrent, rate-limited batches through the cache."""
+
+    def __init__(self, client, cache: TranslationCache, model: str = OPENAI_MODEL, batch: int = BATCH,
+                 concurrency: int = CONCURRENCY, rpm: float = RPM):
+        self.client = client
+        self.cache = cache
+        self.model = model
+        self.batch = batch
+        self.concurrency = concurrency
+        self.limiter = RateLimiter(rpm)
+        self.calls = self.failed_calls = self.cached = 0
+        self._lock = threading.Lock()
+
+    def _call(self, lang: str, batch: List[Item], context: Dict[Item, dict]) -> Dict[Item, str]:
+        for attempt in range(RETRIES):
+            self.limiter.wait()
+            with self._lock:
+                self.calls += 1
+            try:
+                return translate_batch(self.client, self.model, lang, batch, context)
+            except Exception as e:  # API, network or JSON errors: back off and retry the batch
+                with self._lock:
+                    self.failed_calls += 1
+                if attempt == RETRIES - 1:
+                    print(f"⚠️ translation batch ({lang}, {len(batch)} items) failed: {e}")
+                    return {}
+                time.sleep(min(30.0, 2.0 ** attempt))
+        return {}
+
+    def translate(self, lang: str, items: Sequence[Item], context: Dict[Item, dict]) -> Dict[Item, str]:
+        """Translations of the items (cache first); items still missing after the retries are left out."""
+        done: Dict[Item, str] = {}
+        pending = []
+        for item in items:
+            hit = self.cache.get(item[0], lang, self.model)
+            if hit is None:
+                pending.append(item)
+            else:
+                done[item] = hit
+        self.cached += len(done)
+        # facet then kind order: a batch shares context and the answers stay uniform
+        pending.sort(key=lambda it: (context.get(it, {}).get("facet", ""), it[1], it[0]))
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            for _ in range(RETRIES):
+                if not pending:
+                    break
+                futures = [pool.submit(self._call, lang, b, context) for b in batches(pending, self.batch)]
+                for future in as_completed(futures):
+                    found = future.result()
+                    self.cache.put_many([(text, lang, self.model, t) for (text, _), t in found.items()])
+                    done.update(found)
+                pending = [item for item in pending if item not in done]
+        return done
+
+
+def fill(graph, backfill: Backfill, langs: Sequence[str], fields: Sequence[str] = tuple(FIELDS),
+         source: str = "en") -> Dict[str, dict]:
+    """Add the missing literals to the graph; per language {"needed", "translated", "literals"}."""
+    work, context = missing_translations(graph, langs, fields, source)
+    report = {}
+    for lang in langs:
+        needed = work[lang]
+        found = backfill.translate(lang, list(needed), context)
+        added = 0
+        for item, translation in found.items():
+            for uri, predicate in needed[item]:
+                graph.add((uri, predicate, Literal(translation, lang=lang)))
+                added += 1
+        report[lang] = {"needed": len(needed), "translated": len(found), "literals": added}
+    return report
+
+
+# ---------------- stub server ----------------
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """OpenAI-compatible chat completions answering with "<text> [<lang>]"."""
+
+    latency = 0.0
+    requests = 0
+    _lock = threading.Lock()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        with _StubHandler._lock:
+            _StubHandler.requests += 1
+        payload = json.loads(body["messages"][-1]["content"])
+        tag = next((code for code, name in LANGUAGES.items() if name == payload["target_language"]),
+                   payload["target_language"])
+        answer = {"translations": [{"id": it["id"], "text": f"{it['text']} [{tag}]"} for it in payload["items"]]}
+        if self.latency:
+            time.sleep(self.latency)
+        data = json.dumps({
+            "id": f"stub-{_StubHandler.requests}", "object": "chat.completion", "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": json.dumps(answer, ensure_ascii=False)}}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }, ensure_ascii=False).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub(port: int = 0, latency: float = 0.0) -> ThreadingHTTPServer:
+    """Serve the stub on 127.0.0.1 in a daemon thread; port 0 picks a free port."""
+    _StubHandler.latency = latency
+    server = ThreadingHTTPServer(("127.0.0.1", port), _StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Backfill missing label/definition translations in batches")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p_fill = sub.add_parser("fill", help="Translate the missing literals and write the updated TTL")
+    p_fill.add_argument("--out", required=True, help="Output TTL")
+    p_fill.add_argument("--cache", default=DEFAULT_CACHE, help="SQLite translation cache")
+    p_fill.add_argument("--base-url", help="OpenAI-compatible endpoint (default: OPENAI_BASE_URL or the OpenAI API)")
+    p_bench = sub.add_parser("bench", help="fill against an in-process stub server (nothing written)")
+    p_bench.add_argument("--latency", type=float, default=0.2, help="Stub seconds per call")
+    for p in (p_fill, p_bench):
+        p.add_argument("sources", nargs="+", help="TTL/RDF sources")
+        p.add_argument("--langs", required=True, help="Target languages, comma-separated (e.g. fr,de,es)")
+        p.add_argument("--source", default="en", help="Source language")
+        p.add_argument("--fields", default="label,definition", help="label and/or definition")
+        p.add_argument("--model", default=OPENAI_MODEL)
+        p.add_argument("--batch", type=int, default=BATCH, help="Items per request")
+        p.add_argument("--concurrency", type=int, default=CONCURRENCY, help="Requests in flight")
+        p.add_argument("--rpm", type=float, default=RPM, help="Requests per minute (0: unlimited)")
+    p_stub = sub.add_parser("stub", help="Serve the OpenAI-compatible stub")
+    p_stub.add_argument("--port", type=int, default=8765)
+    p_stub.add_argument("--latency", type=float, default=0.0, help="Seconds per call")
+    args = ap.parse_args()
+
+    if args.cmd == "stub":
+        server = start_stub(args.port, args.latency)
+        print(f"[OK] stub at http://127.0.0.1:{server.server_address[1]}/v1 (Ctrl-C to stop)")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            server.shutdown()
+        return 0
+
+    langs = [l.strip().lower() for l in args.langs.split(",") if l.strip()]
+    fields = [f.strip() for f in args.fields.split(",") if f.strip()]
+    unknown = [f for f in fields if f not in FIELDS]
+    if unknown:
+        ap.error(f"unknown field(s) {unknown}, expected {list(FIELDS)}")
+    g = load_graph(args.sources)  # rdflib store: literals are added
+
+    server = None
+    if args.cmd == "bench":
+        server = start_stub(0, args.latency)
+        base_url, cache_path = f"http://127.0.0.1:{server.server_address[1]}/v1", ":memory:"
+        os.environ.setdefault("OPENAI_API_KEY", "stub")
+    else:
+        base_url, cache_path = args.base_url, args.cache
+
+    t0 = time.perf_counter()
+    with TranslationCache(cache_path) as cache:
+        backfill = Backfill(_make_client(base_url), cache, args.model, args.batch, args.concurrency, args.rpm)
+        report = fill(g, backfill, langs, fields, args.source)
+    elapsed = time.perf_counter() - t0
+    for lang, r in report.items():
+        print(f"[{lang}] {r['needed']} texts to translate, {r['translated']} translated, {r['literals']} literals added")
+    print(f"[OK] {backfill.calls} calls ({backfill.failed_calls} failed), {backfill.cached} from cache, "
+          f"{elapsed:.2f}s")
+    if server is not None:
+        server.shutdown()
+        return 0
+    g.serialize(destination=args.out, format="turtle")
+    print(f"[OK] wrote {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,15 +1,19 @@
 import rdflib
 from rdflib.namespace import SKOS, RDF, RDFS
 import jinja2
-import uuid
 import openai
 
+from concept_registry import ConceptRegistry, DEFAULT_REGISTRY, source_key
+from taxonomy_loader import load_graph
+from skos_traversal import CycleReport, traverse, top_ancestor
+
 # -----------------------------
 # CONFIG
 # -----------------------------
 SKOS_INPUT_TTL = "./taxonomy.ttl"
 MD_OUTPUT = "taxonomy.md"
 UPDATED_TTL_OUTPUT = "taxonomy_updated.ttl"
+CONCEPT_REGISTRY = DEFAULT_REGISTRY  # persistent URI -> ConceptID map (env SKOS_CONCEPT_REGISTRY)
 USE_GPT = True  # set to False to disable GPT definition lookup
 openai.api_key = "YOUR_OPENAI_API_KEY"
 
@@ -17,23 +21,14 @@ openai.api_key = "YOUR_OPENAI_API_KEY"
 # HELPER FUNCTIONS
 # -----------------------------
 
-def generate_concept_id():
-    """Random 8-character uppercase alphanumeric concept ID"""
-    return uuid.uuid4().hex[:8].upper()
-
 def get_facet_label(graph, concept_uri):
     """
     Walk up the skos:broader chain to find the top-level term (facet)
-    Returns its prefLabel as string.
+    Returns its prefLabel as string. A broader cycle stops the walk.
     """
-    current = concept_uri
-    while True:
-        broader_terms = list(graph.objects(current, SKOS.broader))
-        if not broader_terms:
-            # Top term
-            labels = list(graph.objects(current, SKOS.prefLabel))
-            return str(labels[0]) if labels else "Unknown Facet"
-        current = broader_terms[0]
+    top = top_ancestor(concept_uri, lambda u: graph.value(u, SKOS.broader))
+    labels = list(graph.objects(top, SKOS.prefLabel))
+    return str(labels[0]) if labels else "Unknown Facet"
 
 def fetch_definition_with_context(label, concept_uri, graph, use_gpt=True):
     if not use_gpt:
@@ -71,40 +66,39 @@ def collect_all_concepts(graph):
                         "comment": list(graph.objects(s, RDFS.comment))}
     return concepts, ssr_codes
 
-def generate_markdown(concepts, ssr_codes, graph):
+def generate_markdown(concepts, ssr_codes, graph, concept_ids):
     """Produce markdown with index, tables and top-term sections"""
     md_lines = ["# Taxonomy Index\n"]
+    # Children per concept, in concept order (one pass instead of a scan per node)
+    children = {s: [] for s in concepts}
+    for s, c in concepts.items():
+        for b in c["broader"]:
+            if b in children:
+                children[b].append(s)
+    cycles = CycleReport()
     # Index
     top_terms = [s for s, c in concepts.items() if not c["broader"]]
-    def render_index(concept, level=0):
-        label = str(concepts[concept]["prefLabel"])
-        md_lines.append("  " * level + f"- {label}")
-        children = [s for s in concepts if concept in concepts[s]["broader"]]
-        for child in sorted(children, key=lambda x: str(concepts[x]["prefLabel"])):
-            render_index(child, level + 1)
-    for top in sorted(top_terms, key=lambda x: str(concepts[x]["prefLabel"])):
-        render_index(top)
+    by_label = lambda x: str(concepts[x]["prefLabel"])
+    traverse(sorted(top_terms, key=by_label), lambda c: sorted(children[c], key=by_label),
+             pre=lambda c, level, parent: md_lines.append("  " * level + f"- {concepts[c]['prefLabel']}"),
+             unique=False, report=cycles)
     md_lines.append("\n---\n")
 
     # Tables per facet
     for top in sorted(top_terms, key=lambda x: str(concepts[x]["prefLabel"])):
         top_label = str(concepts[top]["prefLabel"])
         md_lines.append(f"## {top_label}\n")
-        # Collect all descendants recursively
-        def collect_descendants(uri):
-            result = [uri]
-            children = [s for s in concepts if uri in concepts[s]["broader"]]
-            for c in children:
-                result.extend(collect_descendants(c))
-            return result
-        all_concepts = collect_descendants(top)
+        # Collect all descendants (depth-first, each once per facet)
+        all_concepts = []
+        traverse([top], children.__getitem__, pre=lambda c, level, parent: all_concepts.append(c), report=cycles)
         for c in all_concepts:
             data = concepts[c]
             # Ensure single definition cell with line breaks
             definition = " ".join([str(d) for d in data["definition"]]) if data["definition"] else fetch_definition_with_context(str(data["prefLabel"]), c, graph, USE_GPT)
             md_lines.append(f"| PT | Definition | ConceptID |")
             md_lines.append(f"|----|-----------|-----------|")
-            md_lines.append(f"| {data['prefLabel']} | {definition.replace('\n','<br>')} | {generate_concept_id()} |")
+            definition_cell = definition.replace("\n", "<br>")  # no backslash in f-strings before Python 3.12
+            md_lines.append(f"| {data['prefLabel']} | {definition_cell} | {concept_ids[c]} |")
             # ISO 25964 table
             md_lines.append(f"\n| BT | NT | UF | Top Term |")
             broader_label = [str(concepts[b]["prefLabel"]) for b in data["broader"]] if data["broader"] else []
@@ -114,25 +108,26 @@ def generate_markdown(concepts, ssr_codes, graph):
             md_lines.append(f"\n| Language | {', '.join([str(l) for l in graph.objects(c, RDFS.label)])} |")
             md_lines.append(f"| Metadata | |")
             md_lines.append("\n---\n")
+    if cycles:
+        print(cycles.describe(lambda c: str(concepts[c]["prefLabel"])))
     return "\n".join(md_lines)
 
-def update_ttl(concepts, graph):
-    """Update TTL with new definitions and concept IDs"""
-    mapping = {}
+def update_ttl(concepts, graph, concept_ids):
+    """Update TTL with new definitions and the registry's concept IDs"""
     new_graph = rdflib.Graph()
     new_graph.bind("skos", SKOS)
     new_graph.bind("rdfs", RDFS)
     for c, data in concepts.items():
-        cid = generate_concept_id()
-        mapping[c] = cid
+        cid = concept_ids[c]
         new_graph.add((rdflib.URIRef(f"http://example.org/apmwg#{cid}"), RDF.type, SKOS.Concept))
         new_graph.add((rdflib.URIRef(f"http://example.org/apmwg#{cid}"), SKOS.prefLabel, data["prefLabel"]))
         if data["definition"]:
             for d in data["definition"]:
                 new_graph.add((rdflib.URIRef(f"http://example.org/apmwg#{cid}"), SKOS.definition, d))
         for b in data["broader"]:
-            new_graph.add((rdflib.URIRef(f"http://example.org/apmwg#{cid}"), SKOS.broader,
-                           rdflib.URIRef(f"http://example.org/apmwg#{mapping.get(b, generate_concept_id())}")))
+            # broader targets that are not concepts keep their original URI
+            target = rdflib.URIRef(f"http://example.org/apmwg#{concept_ids[b]}") if b in concept_ids else b
+            new_graph.add((rdflib.URIRef(f"http://example.org/apmwg#{cid}"), SKOS.broader, target))
         # SSR
         for ssr in data["ssr"]:
             new_graph.add((rdflib.URIRef(f"http://example.org/apmwg#{cid}"), rdflib.URIRef("http://example.org/apmwg#linkedSSR"), ssr))
@@ -141,16 +136,17 @@ def update_ttl(concepts, graph):
 # -----------------------------
 # MAIN SCRIPT
 # -----------------------------
-graph = rdflib.Graph()
-graph.parse(SKOS_INPUT_TTL, format="turtle")
+graph = load_graph(SKOS_INPUT_TTL)
 
 concepts, ssr_codes = collect_all_concepts(graph)
+with ConceptRegistry(CONCEPT_REGISTRY) as registry:
+    concept_ids = registry.assign(concepts, retire_missing=True, source=source_key([SKOS_INPUT_TTL]))
 
-md_content = generate_markdown(concepts, ssr_codes, graph)
+md_content = generate_markdown(concepts, ssr_codes, graph, concept_ids)
 with open(MD_OUTPUT, "w", encoding="utf-8") as f:
     f.write(md_content)
 
-updated_graph = update_ttl(concepts, graph)
+updated_graph = update_ttl(concepts, graph, concept_ids)
 updated_graph.serialize(UPDATED_TTL_OUTPUT, format="turtle")
 
 print(f"Markdown written to {MD_OUTPUT}")